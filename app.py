@@ -19,15 +19,28 @@ from sanic import (
     Unauthorized,
     empty,
     redirect,
+    text,
 )
 
 from ntpu_linebot import (
+    EVENT_DEDUP,
+    HANDLER_SCHEDULER,
+    HEALTH,
+    HTTP_CLIENTS,
     LINE_API_UTIL,
+    METRICS,
+    PARSER,
+    SNAPSHOT,
     STICKER,
+    TRACER,
+    Priority,
     handle_follow_join_event,
+    handle_overloaded_event,
     handle_postback_event,
     handle_sticker_message,
     handle_text_message,
+    monitor_event_loop_lag,
+    needs_loading_animation,
     ntpu_contact,
     ntpu_course,
     ntpu_id,
@@ -35,6 +48,10 @@ from ntpu_linebot import (
 
 app = Sanic(__name__)
 
+HEALTH.register("id", ntpu_id.healthz)
+HEALTH.register("contact", ntpu_contact.healthz)
+HEALTH.register("course", ntpu_course.healthz)
+
 
 @app.before_server_start
 async def before_server_start(sanic: Sanic):
@@ -45,17 +62,57 @@ async def before_server_start(sanic: Sanic):
         sanic (Sanic): The Sanic application instance.
     """
 
-    while not all(
-        await gather(
-            STICKER.load_stickers(),
-            ntpu_id.healthz(sanic),
-            ntpu_contact.healthz(sanic),
-            ntpu_course.healthz(sanic),
-        )
-    ):
+    # The workers must exist before the first webhook is accepted
+    HANDLER_SCHEDULER.start()
+    await gather(SNAPSHOT.load(), PARSER.start())
+
+    while not all(await gather(STICKER.load_stickers(), HEALTH.probe(sanic))):
         await sleep(1)
 
 
+@app.after_server_start
+async def after_server_start(sanic: Sanic):
+    """
+    Async function called after the server starts.
+
+    Args:
+        sanic (Sanic): The Sanic application instance.
+    """
+
+    sanic.add_task(SNAPSHOT.dump_periodically(), name="dump_snapshot")
+    sanic.add_task(HEALTH.probe_periodically(sanic), name="probe_health")
+    sanic.add_task(monitor_event_loop_lag(), name="monitor_loop_lag")
+    if TRACER.enabled:
+        sanic.add_task(TRACER.flush_periodically(), name="flush_traces")
+
+
+@app.before_server_stop
+async def before_server_stop(sanic: Sanic):
+    """
+    Async function called before the server stops.
+
+    Args:
+        sanic (Sanic): The Sanic application instance.
+    """
+
+    await HANDLER_SCHEDULER.stop()
+    await sanic.cancel_task("probe_health", raise_exception=False)
+    await sanic.cancel_task("monitor_loop_lag", raise_exception=False)
+    await sanic.cancel_task("dump_snapshot", raise_exception=False)
+    await SNAPSHOT.dump()
+    if TRACER.enabled:
+        await sanic.cancel_task("flush_traces", raise_exception=False)
+        await TRACER.flush()
+
+
+@app.after_server_stop
+async def after_server_stop(_: Sanic):
+    """Async function called after the server stops."""
+
+    await HTTP_CLIENTS.aclose()
+    PARSER.shutdown()
+
+
 @app.route("/", methods=["HEAD", "GET"])
 async def index(_: Request) -> HTTPResponse:
     """Redirects to the project GitHub page"""
@@ -71,29 +128,40 @@ async def healthz(_: Request) -> HTTPResponse:
 
 
 @app.route("/healthy", methods=["HEAD", "GET"])
-async def healthy(request: Request) -> HTTPResponse:
+async def healthy(_: Request) -> HTTPResponse:
     """
-    Asynchronous function for checking the health status of various services.
-
-    Args:
-        request (Request): The request object.
+    Asynchronous function for checking the cached health status of various services.
 
     Returns:
         HTTPResponse: Response object indicating the health status.
     """
 
-    if not await ntpu_id.healthz(request.app):
+    if not HEALTH.is_healthy("id"):
         raise ServiceUnavailable("ID Service Unavailable")
 
-    if not await ntpu_contact.healthz(request.app):
+    if not HEALTH.is_healthy("contact"):
         raise ServiceUnavailable("Contact Service Unavailable")
 
-    if not await ntpu_course.healthz(request.app):
+    if not HEALTH.is_healthy("course"):
         raise ServiceUnavailable("Course Service Unavailable")
 
     return empty()
 
 
+@app.route("/metrics", methods=["GET"])
+async def metrics(_: Request) -> HTTPResponse:
+    """
+    Expose the metrics in the Prometheus text exposition format.
+
+    Returns:
+        HTTPResponse: Response object containing the metrics.
+    """
+
+    return text(
+        METRICS.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.route("/callback", methods=["POST"])
 async def callback(request: Request) -> HTTPResponse:
     """
@@ -106,44 +174,60 @@ async def callback(request: Request) -> HTTPResponse:
         HTTPResponse: The response object indicating the success of the callback function.
 
     Raises:
-        ServiceUnavailable: If any of the services (ID, Contact, Course) are unavailable.
+        ServiceUnavailable: If all of the services (ID, Contact, Course) are unavailable.
         Unauthorized: If the request signature is invalid.
     """
 
-    if not all(
-        await gather(
-            *[
-                ntpu_id.healthz(request.app),
-                ntpu_contact.healthz(request.app),
-                ntpu_course.healthz(request.app),
-            ]
-        )
-    ):
+    # Each bot degrades on its own when only its upstream is unavailable
+    if not HEALTH.is_any_healthy():
         raise ServiceUnavailable("Service Unavailable")
 
-    try:
-        events = LINE_API_UTIL.parser.parse(
-            request.body.decode(),
-            request.headers.get("X-Line-Signature"),
-        )
+    with TRACER.trace("callback"):
+        try:
+            with TRACER.span("parse"):
+                events = LINE_API_UTIL.parser.parse(
+                    request.body.decode(),
+                    request.headers.get("X-Line-Signature"),
+                )
+
+            for event in events:
+                # LINE redelivers events when the acknowledgement is slow
+                if EVENT_DEDUP.is_duplicate(
+                    event.webhook_event_id, event.delivery_context.is_redelivery
+                ):
+                    continue
+
+                if isinstance(event, MessageEvent):
+                    if isinstance(event.message, TextMessageContent):
+                        handler = handle_text_message
+
+                    elif isinstance(event.message, StickerMessageContent):
+                        handler = handle_sticker_message
+
+                    else:
+                        continue
+
+                elif isinstance(event, PostbackEvent):
+                    handler = handle_postback_event
 
-        for event in events:
-            await LINE_API_UTIL.loading_message(event.source.user_id)
+                elif isinstance(event, (FollowEvent, JoinEvent, MemberJoinedEvent)):
+                    handler = handle_follow_join_event
 
-            if isinstance(event, MessageEvent):
-                if isinstance(event.message, TextMessageContent):
-                    request.app.add_task(handle_text_message(event))
+                else:
+                    continue
 
-                elif isinstance(event.message, StickerMessageContent):
-                    request.app.add_task(handle_sticker_message(event))
+                # Events answered from memory are cheap, the others wait on upstream requests
+                is_expensive = needs_loading_animation(event)
+                priority = Priority.EXPENSIVE if is_expensive else Priority.CHEAP
 
-            elif isinstance(event, PostbackEvent):
-                request.app.add_task(handle_postback_event(event))
+                # Started before the handler is queued, the reply waits for it
+                if is_expensive and event.source.user_id:
+                    LINE_API_UTIL.start_loading(event.source.user_id, event.reply_token)
 
-            elif isinstance(event, (FollowEvent, JoinEvent, MemberJoinedEvent)):
-                request.app.add_task(handle_follow_join_event(event))
+                if not HANDLER_SCHEDULER.submit(priority, handler, event):
+                    request.app.add_task(handle_overloaded_event(event))
 
-        return empty()
+            return empty()
 
-    except InvalidSignatureError as exc:
-        raise Unauthorized("Invalid signature") from exc
+        except InvalidSignatureError as exc:
+            raise Unauthorized("Invalid signature") from exc
@@ -0,0 +1,184 @@
+# -*- coding:utf-8 -*-
+"""
+Compare the course searches of the course store with the scan and sort they replaced.
+
+    python benchmark/course_search_bench.py --years 5 --courses 2000 --queries 300
+
+Five years of synthetic courses are added to the course store one by one, as the course
+crawl does. Without a limit, every search must match the courses the scan matches; a
+course with two matching teachers is only listed once now. With the limit of the bot,
+a search must return the first of those courses, newest year first, then by term and
+course number, as sorting every match did, also while the crawl keeps adding courses.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+LIMIT = 30
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from upstream_sim import COURSE_WORDS, SURNAMES, Dataset, build_parser  # noqa: E402
+
+os.environ.setdefault("LINE_CHANNEL_SECRET", "bench")
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench")
+
+from ntpu_linebot.course.course import ALL_EDU_CODE, SimpleCourse  # noqa: E402
+from ntpu_linebot.course.store import CourseStore  # noqa: E402
+
+
+def scan(
+    courses: dict[str, SimpleCourse], criteria: str, kind: str
+) -> list[SimpleCourse]:
+    """The matching of search_simple_courses_by_criteria_and_kind before the index."""
+
+    criteria_set = set(criteria.lower())
+    match kind:
+        case "no":
+            matches = [course for course in courses.values() if criteria in course.no]
+
+        case "title":
+            matches = [
+                course
+                for course in courses.values()
+                if criteria_set.issubset(course.title.lower())
+            ]
+
+        case "teacher":
+            matches = [
+                course
+                for course in courses.values()
+                for teacher in course.teachers
+                if criteria_set.issubset(teacher.lower())
+            ]
+
+        case _:
+            matches = [
+                course for course in courses.values() if criteria in course.teachers
+            ]
+
+    return list({course.uid: course for course in matches}.values())
+
+
+def scan_top(
+    courses: dict[str, SimpleCourse], criteria: str, kind: str
+) -> list[SimpleCourse]:
+    """The search before the ranked store, sorting every match to keep the first."""
+
+    matches = scan(courses, criteria, kind)
+    return sorted(matches, key=lambda c: (-c.year, c.term, c.no))[:LIMIT]
+
+
+def timed(fn: Callable[[str], list], queries: list[str]) -> float:
+    """Run the search for every query, return the mean latency."""
+
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    dataset = Dataset(build_parser().parse_args([f"--courses-per-code={args.courses}"]))
+    courses: dict[str, SimpleCourse] = {}
+    for year in range(112, 112 - args.years, -1):
+        for code in ALL_EDU_CODE:
+            for row in dataset.courses(year, code):
+                course = SimpleCourse(
+                    year=year,
+                    term=int(row["term"]),
+                    no=row["no"],
+                    title=row["title"],
+                    teachers=[teacher["teacher"] for teacher in row["teacher"]],
+                    times=[slot["slot"] for slot in row["time"]],
+                )
+                courses[course.uid] = course
+
+    start = time.perf_counter()
+    store = CourseStore()
+    for uid, course in courses.items():
+        store[uid] = course
+    build = time.perf_counter() - start
+
+    teachers = sorted({t for course in courses.values() for t in course.teachers})
+    rng = random.Random(args.seed)
+    nos = sorted({course.no for course in courses.values()})
+    queries = {
+        "no": [rng.choice(nos)[: rng.randint(1, 4)] for _ in range(args.queries)],
+        "title": [
+            rng.choice(COURSE_WORDS)[: rng.randint(1, 3)] for _ in range(args.queries)
+        ],
+        "teacher": [
+            rng.choice([rng.choice(SURNAMES), rng.choice(teachers)[1:]])
+            for _ in range(args.queries)
+        ],
+        "strict": [rng.choice(teachers) for _ in range(args.queries)],
+    }
+    searches = {
+        "no": store.search_no,
+        "title": store.search_title,
+        "teacher": store.search_teacher,
+        "strict": store.search_strict_teacher,
+    }
+
+    print(f"{len(courses)} courses indexed in {build * 1000:.0f} ms")
+    for kind, search in searches.items():
+        for query in queries[kind]:
+            expected = scan(courses, query, kind)
+            found = search(query, len(courses))
+            assert sorted(c.uid for c in found) == sorted(c.uid for c in expected)
+            assert search(query, LIMIT) == scan_top(courses, query, kind), query
+
+        matches = sum(len(search(q, len(courses))) for q in queries[kind])
+        before = timed(lambda q: scan_top(courses, q, kind), queries[kind])
+        after = timed(lambda q: search(q, LIMIT), queries[kind])
+        print(
+            f"{kind:<8} {matches / args.queries:>7.1f} matches,"
+            f" scan and sort {before * 1000:.2f} ms,"
+            f" store top {LIMIT} {after * 1000:.3f} ms ({before / after:.0f}x)"
+        )
+
+    # Broad queries match thousands of courses, all of which were sorted to keep 30
+    broad = {"title": "程式", "teacher": SURNAMES[0], "no": "1"}
+    for kind, query in broad.items():
+        search = searches[kind]
+        assert search(query, LIMIT) == scan_top(courses, query, kind), query
+        matches = len(search(query, len(courses)))
+        before = timed(lambda q: scan_top(courses, q, kind), [query] * 20)
+        after = timed(lambda q: search(q, LIMIT), [query] * 20)
+        print(
+            f"{kind:<8} {query!r} {matches} matches,"
+            f" scan and sort {before * 1000:.2f} ms,"
+            f" store top {LIMIT} {after * 1000:.3f} ms ({before / after:.0f}x)"
+        )
+
+    # The crawl adds courses between searches, which must not sort the whole store
+    arrivals = rng.sample(list(courses.values()), args.queries)
+    for course in arrivals:
+        del store[course.uid]
+
+    store.search_no("1", LIMIT)
+    start = time.perf_counter()
+    for course in arrivals:
+        store[course.uid] = course
+        store.search_no("1", LIMIT)
+    after = (time.perf_counter() - start) / len(arrivals)
+    assert store.search_no("1", LIMIT) == scan_top(courses, "1", "no")
+    print(f"crawling {len(arrivals)} new courses, add and search {after * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--courses", type=int, default=2000, help="per edu code")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,101 @@
+# -*- coding:utf-8 -*-
+"""
+Time the student crawl against the upstream simulator, with a slow upstream phase.
+
+    python benchmark/crawl_bench.py --max-rps 1 --concurrency 2 --slow-from 60 --slow-for 30
+
+The crawl runs in process against an embedded simulator, so no bot or network is
+needed. Every few seconds it prints the request rate the simulator saw and the rate
+budget of the crawler, which should halve while the upstream is slow and recover
+afterwards. The serial loop it replaced slept 15-25 s before every department.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from upstream_sim import UpstreamSimulator, build_parser  # noqa: E402
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    sim_args = build_parser().parse_args(
+        [
+            f"--port={args.port}",
+            f"--latency={args.latency}",
+            f"--jitter={args.latency / 2}",
+            f"--students-per-department={args.students_per_department}",
+        ]
+    )
+    os.environ.update(
+        {
+            "NTPU_LMS_URLS": f"http://127.0.0.1:{args.port}",
+            "CRAWL_MAX_RPS": str(args.max_rps),
+            "CRAWL_CONCURRENCY": str(args.concurrency),
+            "CRAWL_TARGET_LATENCY": str(args.target_latency),
+        }
+    )
+    os.environ.setdefault("LINE_CHANNEL_SECRET", "bench")
+    os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench")
+
+    from ntpu_linebot.crawl_util import CRAWLER
+    from ntpu_linebot.id.request import ID_REQUEST
+    from ntpu_linebot.id.util import load_student_dict
+    from ntpu_linebot.metrics_util import CRAWL_TOTAL
+
+    sim = UpstreamSimulator(sim_args)
+    server = await asyncio.start_server(sim.handle, "127.0.0.1", args.port)
+    assert await ID_REQUEST.change_base_url()
+
+    limiter = CRAWLER.get_limiter("id")
+    crawl = asyncio.create_task(load_student_dict())
+    start, last, peak = time.perf_counter(), sim.requests, 0.0
+    while not crawl.done():
+        await asyncio.wait([crawl], timeout=args.report)
+        elapsed = time.perf_counter() - start
+        slow = args.slow_from <= elapsed < args.slow_from + args.slow_for
+        sim_args.latency = args.slow_latency if slow else args.latency
+
+        rps, last = (sim.requests - last) / args.report, sim.requests
+        peak = max(peak, rps)
+        print(
+            f"{elapsed:5.0f}s  {rps:5.2f} req/s  budget {limiter.rate:5.2f} req/s"
+            f"  {len(ID_REQUEST.STUDENT_DICT):6d} students{'  (slow)' if slow else ''}"
+        )
+
+    crawl.result()
+    elapsed = time.perf_counter() - start
+    server.close()
+
+    jobs = CRAWL_TOTAL.labels("student").get()
+    print(f"warm-up       {elapsed:.0f} s for {len(ID_REQUEST.STUDENT_DICT)} students")
+    print(
+        f"requests      {sim.requests} ({sim.requests / elapsed:.2f} req/s mean,"
+        f" {peak:.2f} req/s peak per {args.report:.0f} s)"
+    )
+    print(
+        f"serial loop   {jobs * 20 / 60:.0f} min of sleeps alone"
+        f" ({jobs:.0f} year and department pairs, 20 s each on average)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=18091)
+    parser.add_argument("--max-rps", type=float, default=1)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--target-latency", type=float, default=1, help="seconds")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds")
+    parser.add_argument("--slow-latency", type=float, default=2, help="seconds")
+    parser.add_argument("--slow-from", type=float, default=60, help="seconds")
+    parser.add_argument("--slow-for", type=float, default=30, help="seconds")
+    parser.add_argument("--students-per-department", type=int, default=60)
+    parser.add_argument("--report", type=float, default=5, help="seconds")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,166 @@
+# -*- coding:utf-8 -*-
+"""
+Compare the student name index with the linear subset scan it replaced.
+
+    python benchmark/name_search_bench.py --years 14 --departments 21 --students 60
+
+The ranked top-k search is compared with sorting the full result list, as the student
+search reply did before it showed only the best matches. Its order is first checked
+against a brute-force ranking over mixed degrees and ID lengths, with students deleted,
+added and renamed (some twice) since the last merge.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ntpu_linebot.id.store import StudentStore  # noqa: E402
+
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝洪郭邱曾廖賴徐周葉蘇莊呂江何蕭羅高潘簡朱鍾游彭詹胡施沈余盧梁趙顏柯翁魏孫戴"
+GIVEN_NAMES = "家怡宇翔志明雅婷冠廷承恩佳穎宗翰詩涵俊傑欣妤柏宏子晴品妍彥廷思妤建宏淑芬美玲文彬嘉豪昱辰"
+
+
+def linear_search(students: dict[str, str], name: str) -> list[str]:
+    """The scan search_students_by_name used before the index."""
+
+    return [uid for uid, value in students.items() if set(name).issubset(value)]
+
+
+def sorted_search(store: StudentStore, name: str, k: int) -> list[tuple[str, str]]:
+    """The full result list the student search reply used to sort and trim."""
+
+    return sorted(store.search_name(name), key=lambda s: int(s[0]))[-k:]
+
+
+def brute_rank(
+    students: dict[str, str], name: str, k: int
+) -> tuple[list[tuple[str, str]], int]:
+    """The ranking rank_name must return, from sorting every match."""
+
+    def key(student: tuple[str, str]) -> tuple[int, int, int]:
+        uid, value = student
+        score = 3 if value == name else 2 if value.startswith(name) else 1
+        packed = int(uid)
+        return score, packed // 100000 % (1000 if packed >= 100000000 else 100), packed
+
+    matches = [
+        (uid, value) for uid, value in students.items() if set(name).issubset(value)
+    ]
+    return sorted(matches, key=key, reverse=True)[:k], len(matches)
+
+
+def random_name(rng: random.Random) -> str:
+    """A random student name."""
+
+    return rng.choice(SURNAMES) + "".join(rng.choices(GIVEN_NAMES, k=rng.randint(1, 2)))
+
+
+def check_ranking(rng: random.Random, queries: int) -> None:
+    """Check the order of rank_name against the brute-force ranking."""
+
+    # Bachelor, master and doctoral IDs, 8 digits before year 100 and 9 digits after
+    students = {
+        f"{degree}{year:02d}{dep:02d}{seq:03d}": random_name(rng)
+        for degree in "478"
+        for year in range(95, 113)
+        for dep in rng.sample(range(71, 88), 3)
+        for seq in range(rng.randint(1, 12))
+    }
+    store = StudentStore()
+    store.update_many(students.items())
+
+    # Deletions merge the pending students, so they come before the pending changes
+    for uid in rng.sample(sorted(students), 50):
+        del store[uid], students[uid]
+
+    uids = sorted(students)
+    changes = [
+        *rng.sample(uids, 150),
+        *rng.sample(uids, 50),
+        *(f"4{rng.randint(95, 112):02d}99{seq:03d}" for seq in range(50)),
+    ]
+    for uid in changes:
+        store[uid] = students[uid] = random_name(rng)
+
+    names = list(students.values())
+    cases = ["", "不存在", *rng.sample(names, 20)]
+    cases += [rng.choice(names)[: rng.randint(1, 3)] for _ in range(queries)]
+    for name in cases:
+        for k in (1, 10, 100, len(students)):
+            assert store.rank_name(name, k) == brute_rank(students, name, k), (name, k)
+
+
+def timed(fn, queries: list[str]) -> tuple[float, list[list[str]]]:
+    """Run the search for every query, return the mean latency and the results."""
+
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    rng = random.Random(args.seed)
+    check_ranking(rng, args.queries)
+
+    students = {}
+    for year in range(113 - args.years, 113):
+        for dep in range(args.departments):
+            for seq in range(args.students):
+                students[f"4{year}{71 + dep:02d}{seq:03d}"] = random_name(rng)
+
+    start = time.perf_counter()
+    store = StudentStore()
+    store.update_many(students.items())
+    build = time.perf_counter() - start
+
+    names = list(students.values())
+    queries = [rng.choice(names)[: rng.randint(1, 3)] for _ in range(args.queries)]
+    queries.append("不存在")
+
+    scan, expected = timed(lambda q: linear_search(students, q), queries)
+    indexed, actual = timed(store.search_name, queries)
+
+    assert all(
+        sorted(uid for uid, _ in a) == sorted(e) for a, e in zip(actual, expected)
+    )
+    print("ranked order  matches the brute-force ranking")
+    print(f"students      {len(students)} (index built in {build * 1000:.1f} ms)")
+    print(f"linear scan   {scan * 1000:.3f} ms per query")
+    print(f"name index    {indexed * 1000:.3f} ms per query ({scan / indexed:.0f}x)")
+
+    # Single characters are the worst case, they match the most students
+    chars = [rng.choice(name) for name in rng.sample(names, args.queries)]
+    totals = [len(store.search_name(q)) for q in chars]
+    print(f"single char   {sum(totals) / len(chars):.0f} matches on average")
+
+    for k in args.k:
+        full, expected = timed(lambda q: sorted_search(store, q, k), chars)
+        ranked, actual = timed(lambda q: store.rank_name(q, k), chars)
+
+        assert all(
+            len(a) == len(e) and total == t
+            for (a, total), e, t in zip(actual, expected, totals)
+        )
+        print(
+            f"top {k:<9} {full * 1000:.3f} ms sorting every match,"
+            f" {ranked * 1000:.3f} ms ranked ({full / ranked:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=14)
+    parser.add_argument("--departments", type=int, default=21)
+    parser.add_argument("--students", type=int, default=60, help="per department")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument(
+        "--k", type=int, nargs="+", default=[10, 100, 500], help="ranked results"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,345 @@
+# -*- coding:utf-8 -*-
+"""
+Check the lxml parsers against the BeautifulSoup code they replaced, and time both.
+
+    python benchmark/parser_bench.py --courses 2000 --students 300 --rounds 20
+
+The course, student and contact requests run against an embedded upstream simulator,
+and every SimpleCourse, Course, student, Individual and Organization they build must
+equal the one built by the BeautifulSoup code from the same page. Then the largest
+page of each kind is parsed by both.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from re import search, sub
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from bs4 import BeautifulSoup as Bs4
+from bs4 import NavigableString
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from upstream_sim import UpstreamSimulator, build_parser  # noqa: E402
+
+CLASSROOM_REGEX = r"(?<=((?<=教室)|(?<=上課地點))[:：為]).*?(?=$|[ .，。；【])"
+
+
+def bs4_title_field(data: Bs4) -> tuple[str, str, str, str]:
+    """prase_title_field as it was before the lxml parser."""
+
+    title = data.find("a").text.strip()
+    detail_url = "?" + data.find("a").get("href").split("?")[1]
+
+    note = ""
+    location = ""
+    if note := data.find("font").text[3:].strip():
+        if l := search(CLASSROOM_REGEX, note):
+            location = sub(r"\s", " ", l.group())
+
+    return title, detail_url, note, location
+
+
+def bs4_teacher_field(data: Bs4) -> tuple[list[str], list[str]]:
+    """prase_teacher_field as it was before the lxml parser."""
+
+    teachers: list[str] = []
+    teachers_url: list[str] = []
+    for teacher in data.find_all("a"):
+        teachers.append(teacher.text)
+        teachers_url.append("?" + teacher.get("href").split("?")[1])
+
+    return teachers, teachers_url
+
+
+def bs4_time_location_field(data: Bs4) -> tuple[list[str], list[str]]:
+    """prase_time_location_filed as it was before the lxml parser."""
+
+    times: list[str] = []
+    locations: list[str] = []
+    for line_info in (str(line.text) for line in data.find_all("a")):
+        if line_info.find("每週未維護") > -1:
+            continue
+
+        infos = line_info.split("\t", maxsplit=1)
+        times.append(infos[0])
+        if len(infos) > 1:
+            locations.append(infos[1])
+
+    return times, locations
+
+
+def bs4_simple_courses(page: str, year: int) -> list[Any]:
+    """The course listing loop of get_simple_courses_by_year before the lxml parser."""
+
+    from ntpu_linebot.course.course import SimpleCourse
+
+    courses = []
+    if table := Bs4(page, "lxml").find("table"):
+        for course_info in table.find("tbody").find_all("tr"):
+            course_field = course_info.find_all("td")
+            courses.append(
+                SimpleCourse(
+                    year=year,
+                    term=int(course_field[2].text),
+                    no=course_field[3].text,
+                    title=bs4_title_field(course_field[7])[0],
+                    teachers=bs4_teacher_field(course_field[8])[0],
+                    times=bs4_time_location_field(course_field[13])[0],
+                )
+            )
+
+    return courses
+
+
+def bs4_course(page: str, year: int, term: int, no: str) -> Any:
+    """The course parsing of get_course_by_uid before the lxml parser."""
+
+    from ntpu_linebot.course.course import Course
+
+    if table := Bs4(page, "lxml").find("table"):
+        course_field = table.find("tbody").find("tr").find_all("td")
+        title, detail_url, note, location = bs4_title_field(course_field[7])
+        teachers, teachers_url = bs4_teacher_field(course_field[8])
+        times, locations = bs4_time_location_field(course_field[13])
+        if location:
+            locations.append(location)
+
+        return Course(
+            year=year,
+            term=term,
+            no=no,
+            title=title,
+            teachers=teachers,
+            times=times,
+            teachers_url=teachers_url,
+            locations=locations,
+            detail_url=detail_url,
+            note=note,
+        )
+
+    return None
+
+
+def bs4_students(page: str) -> tuple[list[tuple[str, str]], int]:
+    """The student page parsing before the lxml parser."""
+
+    data = Bs4(page, "lxml")
+    students = [
+        (item.find("a").get("href").split("/")[-1], item.find("a").text)
+        for item in data.find_all("div", {"class": "bloglistTitle"})
+    ]
+
+    return students, len(data.find_all("span", {"class": "item"})) - 1
+
+
+def bs4_contacts(page: str) -> list[Any]:
+    """The contact parsing of get_contacts_by_url before the lxml parser."""
+
+    from ntpu_linebot.contact.contact import Individual, Organization
+
+    contacts: list[Any] = []
+    soup = Bs4(page, "lxml")
+    for organization in soup.find_all("div", {"class": "alert alert-info mt-0 mb-0"}):
+        org_names = organization.find_all("a", {"class": "lang lang-zh-Hant mx-2"})
+        if len(org_names) == 1:
+            superior = ""
+            org_name = org_names[0].text
+        else:
+            superior = org_names[0].text
+            org_name = org_names[1].text
+
+        org_datas = organization.find_all("li")
+        location = org_datas[2].text.split("：")[1]
+        website = org_datas[3].find("a").text
+
+        members = []
+        member_data = organization.next_sibling.next_sibling
+        if member_data.get("class") == ["w100"]:
+            for data in member_data.find("tbody").find_all("tr"):
+                member_datas = data.find_all("td")
+                email = ""
+                for child in member_datas[4].find("span").children:
+                    if isinstance(child, NavigableString):
+                        email += child
+                    elif child.name == "img":
+                        email += "@"
+
+                contact = Individual(
+                    name=member_datas[0].find("span").text,
+                    organization=org_name,
+                    title=member_datas[1].text.strip(),
+                    extension=member_datas[2].find("span").text,
+                    email=email,
+                )
+                members.append(contact)
+                contacts.append(contact)
+
+        contacts.append(
+            Organization(
+                name=org_name,
+                superior=superior,
+                location=location,
+                website=website,
+                members=members,
+            )
+        )
+
+    return contacts
+
+
+def state(value: Any) -> Any:
+    """The attributes of an object, recursively, to compare objects without __eq__."""
+
+    if isinstance(value, (list, tuple)):
+        return [state(item) for item in value]
+
+    if hasattr(value, "__dict__"):
+        return type(value).__name__, {k: state(v) for k, v in vars(value).items()}
+
+    return value
+
+
+def timed(fn: Callable[[], Any], rounds: int) -> float:
+    """Run a parse the given rounds, return the mean latency."""
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    sim_args = build_parser().parse_args(
+        [
+            f"--port={args.port}",
+            "--latency=0",
+            f"--students-per-department={args.students}",
+            f"--page-size={args.students}",
+            f"--courses-per-code={args.courses}",
+        ]
+    )
+    os.environ["NTPU_LMS_URLS"] = f"http://127.0.0.1:{args.port}"
+    os.environ["NTPU_SEA_URLS"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("LINE_CHANNEL_SECRET", "bench")
+    os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench")
+
+    from ntpu_linebot.contact.contact import Individual, Organization
+    from ntpu_linebot.contact.parser import parse_organizations
+    from ntpu_linebot.contact.request import CONTACT_REQUEST
+    from ntpu_linebot.course.course import ALL_EDU_CODE, SimpleCourse
+    from ntpu_linebot.course.parser import parse_simple_courses
+    from ntpu_linebot.course.request import COURSE_REQUEST
+    from ntpu_linebot.id.parser import parse_students
+    from ntpu_linebot.id.request import ID_REQUEST
+
+    sim = UpstreamSimulator(sim_args)
+    server = await asyncio.start_server(sim.handle, "127.0.0.1", args.port)
+    assert await COURSE_REQUEST.change_base_url()
+    assert await ID_REQUEST.change_base_url()
+    assert await CONTACT_REQUEST.change_base_url()
+
+    def page(url: str, **query: str) -> str:
+        split = urlsplit(url)
+        page = sim.page(
+            split.path, parse_qs(split.query) | {k: [v] for k, v in query.items()}
+        )
+        assert page is not None
+        return page
+
+    course_url = "/pls/dev_stud/course_query_all.queryByKeyword"
+    student_url = "/portfolio/search.php"
+    unit_url = "/pls/ld/CAMPUS_DIR_M.p2?unit=1000"
+
+    # Equivalence of everything the requests build
+    courses = await COURSE_REQUEST.get_simple_courses_by_year(112)
+    expected = [
+        course
+        for code in ALL_EDU_CODE
+        for course in bs4_simple_courses(
+            page(course_url, qYear="112", courseno=code), 112
+        )
+    ]
+    assert state(list(courses.values())) == state(expected)
+
+    for course in expected[:: max(len(expected) // 20, 1)]:
+        actual = await COURSE_REQUEST.get_course_by_uid(course.uid)
+        query = {"qYear": "112", "qTerm": str(course.term), "courseno": course.no}
+        assert state(actual) == state(
+            bs4_course(page(course_url, **query), 112, course.term, course.no)
+        )
+
+    students = await ID_REQUEST.get_students_by_year_and_department(112, "85")
+    assert (
+        list(students.items()) == bs4_students(page(student_url, fmKeyword="411285"))[0]
+    )
+
+    contacts = await CONTACT_REQUEST.get_administrative_contacts()
+    expected = [
+        contact
+        for unit in range(sim_args.units)
+        for contact in bs4_contacts(page(f"/pls/ld/CAMPUS_DIR_M.p2?unit=1{unit:03d}"))
+    ]
+    assert state(contacts) == state(expected)
+    server.close()
+
+    print(
+        f"equivalent    {len(courses)} courses, {len(students)} students,"
+        f" {len(contacts)} contacts"
+    )
+
+    # Parse time of the largest page of each kind, building the same objects
+    def lxml_simple_courses(content: bytes, encoding: str) -> list[SimpleCourse]:
+        return [
+            SimpleCourse(112, *row) for row in parse_simple_courses(content, encoding)
+        ]
+
+    def lxml_contacts(content: bytes, encoding: str) -> list[Any]:
+        contacts: list[Any] = []
+        for name, superior, location, website, rows in parse_organizations(
+            content, encoding
+        ):
+            members = [Individual(row[0], name, *row[1:]) for row in rows]
+            contacts += members
+            contacts.append(Organization(name, superior, location, website, members))
+
+        return contacts
+
+    pages = {
+        "course list": (
+            page(course_url, qYear="112", courseno=ALL_EDU_CODE[0]),
+            lambda text: bs4_simple_courses(text, 112),
+            lxml_simple_courses,
+        ),
+        "students": (
+            page(student_url, fmKeyword="411285"),
+            bs4_students,
+            parse_students,
+        ),
+        "contacts": (page(unit_url), bs4_contacts, lxml_contacts),
+    }
+    for kind, (text, old, new) in pages.items():
+        content = text.encode()
+        before = timed(lambda: old(text), args.rounds)
+        after = timed(lambda: new(content, "utf-8"), args.rounds)
+        print(
+            f"{kind:<13} {len(content) / 1024:.0f} KiB, bs4 {before * 1000:.2f} ms,"
+            f" lxml {after * 1000:.2f} ms ({before / after:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=18096)
+    parser.add_argument("--courses", type=int, default=2000, help="per edu code")
+    parser.add_argument("--students", type=int, default=300, help="per department")
+    parser.add_argument("--rounds", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,186 @@
+# -*- coding:utf-8 -*-
+"""
+Measure the event loop lag while a course year is crawled, for each parser executor.
+
+    python benchmark/parser_executor_bench.py --courses 4000 --students 300
+
+Each mode runs in a fresh process against the upstream simulator, itself run in another
+process so rendering the pages does not hold up the measured loop. A ticker records how
+late the event loop wakes it up every millisecond, summing the lags above 10 ms, while
+the course listings of a whole year are fetched and parsed, and student department
+listings are looked up as users would. A first run warms the page caches of the
+simulator up. Every mode must build the same courses.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from statistics import median, quantiles
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from upstream_sim import DEPARTMENTS  # noqa: E402
+
+# PARSER_EXECUTOR, COURSE_STREAMING
+MODES = {
+    "inline": ("inline", "false"),
+    "process": ("process", "false"),
+    "thread": ("thread", "false"),
+    "streaming inline": ("inline", "true"),
+    "streaming thread": ("thread", "true"),
+    "default": ("auto", "true"),
+}
+
+
+def p99(values: list[float]) -> float:
+    """The 99th percentile of the values."""
+
+    return (
+        quantiles(values, n=100, method="inclusive")[98]
+        if len(values) > 1
+        else values[0]
+    )
+
+
+async def child(args: argparse.Namespace) -> None:
+    """Crawl a course year in this process, print the lags and latencies as JSON."""
+
+    os.environ["NTPU_LMS_URLS"] = f"http://127.0.0.1:{args.port}"
+    os.environ["NTPU_SEA_URLS"] = f"http://127.0.0.1:{args.port}"
+
+    from ntpu_linebot.course.request import COURSE_REQUEST
+    from ntpu_linebot.id.request import ID_REQUEST
+    from ntpu_linebot.parse_util import PARSER
+
+    assert await COURSE_REQUEST.change_base_url()
+    assert await ID_REQUEST.change_base_url()
+    await PARSER.start()
+
+    lags: list[float] = []
+    lookups: list[float] = []
+    crawling = True
+
+    async def tick() -> None:
+        while crawling:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(max(time.perf_counter() - start - 0.001, 0))
+
+    async def look_up() -> None:
+        keys = ((year, dep) for year in range(101, 113) for dep in DEPARTMENTS)
+        while crawling:
+            start = time.perf_counter()
+            await ID_REQUEST.get_students_by_year_and_department(*next(keys))
+            lookups.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    looker = asyncio.create_task(look_up())
+    start = time.perf_counter()
+    courses = await COURSE_REQUEST.get_simple_courses_by_year(112)
+    crawl = time.perf_counter() - start
+    crawling = False
+    await asyncio.gather(ticker, looker)
+
+    PARSER.shutdown()
+    print(
+        json.dumps(
+            {
+                "courses": len(courses),
+                "digest": hash(
+                    tuple(
+                        (uid, c.title, tuple(c.teachers), tuple(c.times))
+                        for uid, c in courses.items()
+                    )
+                ),
+                "crawl": crawl,
+                "stalled": sum(lag for lag in lags if lag > 0.01),
+                "lag_max": max(lags),
+                "lookup_median": median(lookups),
+                "lookup_p99": p99(lookups),
+                "lookups": len(lookups),
+            }
+        )
+    )
+
+
+def run(mode: str) -> dict[str, Any]:
+    """Run a mode in a fresh process, return its results."""
+
+    executor, streaming = MODES[mode]
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", *sys.argv[1:]],
+        capture_output=True,
+        check=True,
+        text=True,
+        env=os.environ
+        | {
+            "PARSER_EXECUTOR": executor,
+            "COURSE_STREAMING": streaming,
+            "PYTHONHASHSEED": "0",
+            "LINE_CHANNEL_SECRET": "bench",
+            "LINE_CHANNEL_ACCESS_TOKEN": "bench",
+        },
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def main(args: argparse.Namespace) -> None:
+    """Run every mode against a simulator process and compare them."""
+
+    sim = subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(__file__).resolve().parent / "upstream_sim.py"),
+            f"--port={args.port}",
+            f"--latency={args.latency}",
+            f"--courses-per-code={args.courses}",
+            f"--students-per-department={args.students}",
+            f"--page-size={args.students}",
+            "--report=3600",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+
+    try:
+        assert "(up)" in sim.stdout.readline()
+        run("inline")
+
+        results = {}
+        for mode in MODES:
+            results[mode] = result = run(mode)
+            print(
+                f"{mode:<16} {result['courses']} courses in {result['crawl']:.2f}s,"
+                f" loop stalled {result['stalled'] * 1000:.0f} ms,"
+                f" max lag {result['lag_max'] * 1000:.0f} ms,"
+                f" {result['lookups']} student listings median"
+                f" {result['lookup_median'] * 1000:.1f} ms"
+                f" p99 {result['lookup_p99'] * 1000:.1f} ms"
+            )
+
+    finally:
+        sim.terminate()
+
+    assert len({result["digest"] for result in results.values()}) == 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=18098)
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds")
+    parser.add_argument("--courses", type=int, default=4000, help="per edu code")
+    parser.add_argument("--students", type=int, default=300, help="per department")
+    parsed = parser.parse_args()
+    if parsed.child:
+        asyncio.run(child(parsed))
+    else:
+        main(parsed)
@@ -0,0 +1,213 @@
+# -*- coding:utf-8 -*-
+"""
+Compare parsing a course listing as it streams in with parsing the whole page.
+
+    python benchmark/stream_bench.py --courses 500 2000 8000 --chunk 16384
+
+Every SimpleCourseStream must return the same rows as parse_simple_courses, however the
+page is chunked, splitting multibyte characters included. The peak memory of parsing a
+page either way is measured in a fresh process, as the growth of its peak RSS (Linux only),
+since the lxml trees live outside the Python allocator. Then the course requests fetch a page
+dripped by the embedded upstream simulator, to time the first and the last row.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from upstream_sim import UpstreamSimulator, build_parser  # noqa: E402
+
+COURSE_URL = "/pls/dev_stud/course_query_all.queryByKeyword"
+
+
+def course_page(courses: int, code: str = "U") -> bytes:
+    """A course listing of the given size, as the upstream simulator renders it."""
+
+    sim = UpstreamSimulator(
+        build_parser().parse_args([f"--courses-per-code={courses}"])
+    )
+    page = sim.page(COURSE_URL, {"qYear": ["112"], "courseno": [code]})
+    assert page is not None
+    return page.encode()
+
+
+def peak_rss() -> int:
+    """The peak RSS of this process since its last reset, in KiB."""
+
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1])
+
+    raise RuntimeError("VmHWM is not reported")
+
+
+def child(mode: str, path: str, chunk: int) -> None:
+    """Parse a page in this fresh process, print the growth of the peak RSS in KiB."""
+
+    from ntpu_linebot.course.parser import SimpleCourseStream, parse_simple_courses
+
+    # Reset the peak to the current RSS, so the imports do not hide the parse
+    Path("/proc/self/clear_refs").write_text("5")
+    baseline = peak_rss()
+    rows = 0
+    with open(path, "rb") as file:
+        if mode == "whole":
+            rows = len(parse_simple_courses(file.read(), "utf-8"))
+        else:
+            stream = SimpleCourseStream("utf-8")
+            while data := file.read(chunk):
+                rows += len(stream.feed(data))
+            rows += len(stream.close())
+
+    print(peak_rss() - baseline, rows)
+
+
+def peak_memory(page: bytes, chunk: int) -> dict[str, tuple[int, int]]:
+    """The peak RSS growth and row count of parsing a page either way."""
+
+    with tempfile.NamedTemporaryFile(suffix=".html") as file:
+        file.write(page)
+        file.flush()
+
+        result = {}
+        for mode in ("whole", "stream"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, file.name, str(chunk)],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout.split()
+            result[mode] = int(out[0]), int(out[1])
+
+    return result
+
+
+def check_equivalence(page: bytes) -> int:
+    """Check every chunking of a page against the whole-page parser."""
+
+    from ntpu_linebot.course.parser import SimpleCourseStream, parse_simple_courses
+
+    expected = parse_simple_courses(page, "utf-8")
+    for chunk in (1, 7, 4096, 65536, len(page)):
+        stream = SimpleCourseStream("utf-8")
+        rows = []
+        for i in range(0, len(page), chunk):
+            rows += stream.feed(page[i : i + chunk])
+        rows += stream.close()
+        assert rows == expected, chunk
+
+    assert SimpleCourseStream("utf-8").close() == []
+
+    # A table after the listing ends it, even where the stream restarts its parser
+    listing_end = page.rindex(b"</tr>") + len(b"</tr>")
+    row = page[page.index(b"<tr", page.index(b"<tbody")) : listing_end]
+    row = row[: row.index(b"</tr>") + len(b"</tr>")]
+    end = page.rindex(b"</table>") + len(b"</table>")
+    trailed = page[:end] + b"<table><tbody>" + row + b"</tbody></table>" + page[end:]
+    assert parse_simple_courses(trailed, "utf-8") == expected
+    for chunks in (
+        (trailed[:listing_end], trailed[listing_end:]),
+        (trailed[i : i + 4096] for i in range(0, len(trailed), 4096)),
+    ):
+        stream = SimpleCourseStream("utf-8")
+        rows = [row for chunk in chunks for row in stream.feed(chunk)]
+        assert rows + stream.close() == expected
+
+    return len(expected)
+
+
+async def timings(args: argparse.Namespace, courses: int) -> dict[str, tuple]:
+    """Time the first and the last row of a dripped page, streaming or not."""
+
+    from ntpu_linebot.course.request import COURSE_REQUEST
+    from ntpu_linebot.http_util import HTTP_CLIENTS
+
+    sim_args = build_parser().parse_args(
+        [
+            f"--port={args.port}",
+            "--latency=0",
+            "--drip-rate=1",
+            f"--drip-chunk={args.chunk}",
+            f"--drip-delay={args.drip_delay}",
+            f"--courses-per-code={courses}",
+        ]
+    )
+    sim = UpstreamSimulator(sim_args)
+    server = await asyncio.start_server(sim.handle, "127.0.0.1", args.port)
+    assert await COURSE_REQUEST.change_base_url()
+
+    url = f"http://127.0.0.1:{args.port}{COURSE_URL}"
+    params = {"qYear": "112", "seq1": "A", "seq2": "M", "courseno": "U"}
+
+    result = {}
+    for streaming in (False, True):
+        setattr(COURSE_REQUEST, "_CourseRequest__streaming", streaming)
+        rows = []
+        first = 0.0
+        start = time.perf_counter()
+        async for row in COURSE_REQUEST.iter_simple_courses(url, params, {}):
+            if not rows:
+                first = time.perf_counter() - start
+            rows.append(row)
+
+        result["stream" if streaming else "whole"] = (
+            first,
+            time.perf_counter() - start,
+            rows,
+        )
+
+    # The pooled connections would otherwise reach the next simulator
+    await HTTP_CLIENTS.aclose()
+    server.close()
+    assert result["whole"][2] == result["stream"][2]
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    os.environ["NTPU_SEA_URLS"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("LINE_CHANNEL_SECRET", "bench")
+    os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench")
+
+    for courses in args.courses:
+        page = course_page(courses)
+        rows = check_equivalence(page)
+        memory = peak_memory(page, args.chunk)
+        assert memory["whole"][1] == memory["stream"][1] == rows
+        print(
+            f"{rows:>6} rows, {len(page) / 1024:>6.0f} KiB:"
+            f" peak RSS growth whole {memory['whole'][0] / 1024:.1f} MiB,"
+            f" stream {memory['stream'][0] / 1024:.1f} MiB"
+        )
+
+        result = await timings(args, courses)
+        print(
+            f"{'':>25} dripped, first row whole {result['whole'][0] * 1000:.0f} ms,"
+            f" stream {result['stream'][0] * 1000:.0f} ms;"
+            f" last row whole {result['whole'][1] * 1000:.0f} ms,"
+            f" stream {result['stream'][1] * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=18097)
+    parser.add_argument("--courses", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--chunk", type=int, default=16384, help="bytes per chunk")
+    parser.add_argument(
+        "--drip-delay", type=float, default=0.002, help="seconds per dripped chunk"
+    )
+    asyncio.run(main(parser.parse_args()))
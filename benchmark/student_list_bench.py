@@ -0,0 +1,146 @@
+# -*- coding:utf-8 -*-
+"""
+Compare the table-driven student listing format with the per-student format it replaced.
+
+    python benchmark/student_list_bench.py --students 600
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LINE_CHANNEL_SECRET", "bench")
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench")
+
+from ntpu_linebot.id.util import (  # noqa: E402
+    DEPARTMENT_CODE,
+    DEPARTMENT_NAME,
+    FULL_MASTER_DEPARTMENT_NAME,
+    FULL_PHD_DEPARTMENT_NAME,
+    MASTER_DEPARTMENT_NAME,
+    PHD_DEPARTMENT_NAME,
+    Order,
+    student_list_format,
+)
+
+
+def old_format(
+    student_id: str,
+    name: str,
+    order: list[Order],
+    space: int,
+) -> str:
+    """The per-student format search_students_by_year_and_department used before the table."""
+
+    message = []
+    is_over_99 = len(student_id) == 9
+    is_master = student_id[0] == "7"
+    is_phd = student_id[0] == "8"
+
+    for o in order:
+        match o:
+            case Order.ID:
+                message.append(student_id)
+
+            case Order.NAME:
+                message.append(name)
+
+            case Order.YEAR:
+                message.append(student_id[1 : is_over_99 + 3])
+
+            case Order.DEPARTMENT:
+                department = student_id[is_over_99 + 3 : is_over_99 + 5]
+                if is_master:
+                    message.append(MASTER_DEPARTMENT_NAME[department])
+                    continue
+
+                if is_phd:
+                    message.append(PHD_DEPARTMENT_NAME[department])
+                    continue
+
+                if department == DEPARTMENT_CODE["社學"][0:2]:
+                    department += student_id[is_over_99 + 5]
+
+                message.append(DEPARTMENT_NAME[department] + "系")
+
+            case Order.FULL_DEPARTMENT:
+                department = student_id[is_over_99 + 3 : is_over_99 + 5]
+                if is_master:
+                    message.append(FULL_MASTER_DEPARTMENT_NAME[department])
+                    continue
+
+                if is_phd:
+                    message.append(FULL_PHD_DEPARTMENT_NAME[department])
+                    continue
+
+                if department in [DEPARTMENT_CODE["法律"], DEPARTMENT_CODE["社學"][:2]]:
+                    department += student_id[is_over_99 + 5]
+
+                if department[0:2] == DEPARTMENT_CODE["法律"]:
+                    message.append("法律系")
+                    message.append(DEPARTMENT_NAME[department] + "組")
+
+                else:
+                    message.append(DEPARTMENT_NAME[department] + "系")
+
+    return (" " * space).join(message)
+
+
+def timed(fn, rounds: int) -> tuple[float, str]:
+    """Run the format the given rounds, return the mean latency and the result."""
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - start) / rounds, result
+
+
+def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    listings = {
+        "bachelor": [(f"411285{i:03d}", "王小明") for i in range(args.students)],
+        # The law groups leave two digits for the serial number
+        "law": [
+            (f"411271{2 + i % 3 * 2}{i // 3 % 100:02d}", "王小明")
+            for i in range(args.students)
+        ],
+        "master": [(f"711283{i:03d}", "王小明") for i in range(args.students)],
+    }
+    orders = {
+        "listing": ([Order.ID, Order.NAME], 3),
+        "search": ([Order.YEAR, Order.DEPARTMENT, Order.ID, Order.NAME], 1),
+        "full": ([Order.YEAR, Order.FULL_DEPARTMENT, Order.NAME], 2),
+    }
+
+    print(f"students      {args.students} per listing")
+    for listing, students in listings.items():
+        for name, (order, space) in orders.items():
+            before, expected = timed(
+                lambda: "\n".join(
+                    [
+                        old_format(uid, student, order, space)
+                        for uid, student in students
+                    ]
+                ),
+                args.rounds,
+            )
+            after, actual = timed(
+                lambda: student_list_format(students, order, space), args.rounds
+            )
+
+            assert actual == expected
+            print(
+                f"{listing:<10} {name:<8} {before * 1000:.3f} ms ->"
+                f" {after * 1000:.3f} ms ({before / after:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=600, help="per listing")
+    parser.add_argument("--rounds", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,69 @@
+# -*- coding:utf-8 -*-
+"""
+Time paged department listings of the student search against the upstream simulator.
+
+    python benchmark/student_pages_bench.py --students 300 --page-size 20 --latency 0.1
+
+Each listing needs the first page to learn the page count, then fetches the rest at
+once, so it should take about two round trips however many pages it has.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from upstream_sim import UpstreamSimulator, build_parser  # noqa: E402
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    sim_args = build_parser().parse_args(
+        [
+            f"--port={args.port}",
+            f"--latency={args.latency}",
+            f"--students-per-department={args.students}",
+            f"--page-size={args.page_size}",
+        ]
+    )
+    os.environ["NTPU_LMS_URLS"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("LINE_CHANNEL_SECRET", "bench")
+    os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench")
+
+    from ntpu_linebot.id.request import ID_REQUEST
+
+    sim = UpstreamSimulator(sim_args)
+    server = await asyncio.start_server(sim.handle, "127.0.0.1", args.port)
+    assert await ID_REQUEST.change_base_url()
+
+    pages = -(-args.students // args.page_size)
+    for department in ("85", "86", "87"):
+        requests = sim.requests
+        start = time.perf_counter()
+        students = await ID_REQUEST.get_students_by_year_and_department(112, department)
+        elapsed = time.perf_counter() - start
+
+        assert len(students) == args.students
+        assert list(students) == sorted(students)
+        print(
+            f"4112{department}  {len(students)} students on {pages} pages"
+            f" in {elapsed * 1000:.0f} ms ({elapsed / args.latency:.1f} round trips,"
+            f" {sim.requests - requests} requests)"
+        )
+
+    server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=18092)
+    parser.add_argument("--students", type=int, default=300, help="per department")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds")
+    asyncio.run(main(parser.parse_args()))
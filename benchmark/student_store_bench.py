@@ -0,0 +1,142 @@
+# -*- coding:utf-8 -*-
+"""
+Compare the memory and lookup cost of the student store with the dict it replaced.
+
+    python benchmark/student_store_bench.py --years 14 --departments 21 --students 60
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ntpu_linebot.id.index import StudentNameIndex  # noqa: E402
+from ntpu_linebot.id.store import StudentStore  # noqa: E402
+
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝洪郭邱曾廖賴徐周葉蘇莊呂江何蕭羅高潘簡朱鍾游彭詹胡施沈余盧梁趙顏柯翁魏孫戴"
+GIVEN_NAMES = "家怡宇翔志明雅婷冠廷承恩佳穎宗翰詩涵俊傑欣妤柏宏子晴品妍彥廷思妤建宏淑芬美玲文彬嘉豪昱辰"
+
+
+def students_of(args: argparse.Namespace) -> list[tuple[bytes, bytes]]:
+    """
+    Create synthetic students, encoded so the source data is not shared with the
+    structures being measured, as crawled data would not be.
+    """
+
+    rng = random.Random(args.seed)
+    students = []
+    for year in range(113 - args.years, 113):
+        for dep in range(args.departments):
+            for seq in range(args.students):
+                name = rng.choice(SURNAMES) + "".join(
+                    rng.choices(GIVEN_NAMES, k=rng.randint(1, 2))
+                )
+                students.append(
+                    (f"4{year}{71 + dep:02d}{seq:03d}".encode(), name.encode())
+                )
+
+    return students
+
+
+def measure(build) -> tuple[object, int]:
+    """Build a structure and return it with the bytes it allocated."""
+
+    gc.collect()
+    tracemalloc.start()
+    structure = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return structure, size
+
+
+def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    students = students_of(args)
+
+    def build_dict() -> dict[str, str]:
+        return {uid.decode(): name.decode() for uid, name in students}
+
+    def build_set_index() -> dict[str, set[str]]:
+        # The postings of student IDs the name index kept next to the dict before
+        postings: dict[str, set[str]] = {}
+        for uid, name in students:
+            for char in set(name.decode()):
+                postings.setdefault(char, set()).add(uid.decode())
+
+        return postings
+
+    def build_row_index() -> StudentNameIndex:
+        index = StudentNameIndex()
+        for row, (_, name) in enumerate(sorted(students)):
+            index.add(row, name.decode())
+
+        return index
+
+    def build_store() -> StudentStore:
+        store = StudentStore()
+        for uid, name in students:
+            store[uid.decode()] = name.decode()
+
+        store.compact()
+        return store
+
+    plain, dict_size = measure(build_dict)
+    _, set_index_size = measure(build_set_index)
+    store, store_size = measure(build_store)
+    _, row_index_size = measure(build_row_index)
+    before, after = dict_size + set_index_size, store_size
+    assert dict(store.items()) == plain
+
+    rng = random.Random(args.seed)
+    keys = [uid.decode() for uid, _ in rng.choices(students, k=args.lookups)]
+    timings = {}
+    for name, structure in (("dict", plain), ("store", store)):
+        start = time.perf_counter()
+        for key in keys:
+            structure[key]
+        timings[name] = (time.perf_counter() - start) / len(keys)
+
+    prefix = keys[0][:6]
+    start = time.perf_counter()
+    listed = store.prefix_items(prefix)
+    prefix_time = time.perf_counter() - start
+    assert listed == sorted((k, v) for k, v in plain.items() if k.startswith(prefix))
+
+    count = len(students)
+    print(f"students      {count}")
+    print(
+        f"before        {before / 2**20:.2f} MiB ({before / count:.0f} B each):"
+        f" dict {dict_size / count:.0f} B + name index {set_index_size / count:.0f} B"
+    )
+    print(
+        f"after         {after / 2**20:.2f} MiB ({after / count:.0f} B each):"
+        f" store {(after - row_index_size) / count:.0f} B"
+        f" + name index {row_index_size / count:.0f} B"
+    )
+    print(
+        f"reduction     {before / after:.1f}x overall,"
+        f" {dict_size / (after - row_index_size):.1f}x for the ID to name mapping"
+    )
+    print(
+        f"lookup        dict {timings['dict'] * 1e6:.2f} us, store {timings['store'] * 1e6:.2f} us"
+    )
+    print(
+        f"prefix        {len(listed)} students of {prefix} in {prefix_time * 1e6:.0f} us"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=14)
+    parser.add_argument("--departments", type=int, default=21)
+    parser.add_argument("--students", type=int, default=60, help="per department")
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+# -*- coding:utf-8 -*-
+"""
+Count the upstream requests of student ID lookups against the upstream simulator.
+
+    python benchmark/uid_lookup_bench.py --lookups 5000 --crawled 0.5 --typos 0.1
+
+A part of the year and department listings is crawled first, then a skewed stream of
+ID lookups (popular students are looked up more often, and some IDs are typos) goes
+through the local-first lookup path. The old path, a 9 entry cache in front of the
+upstream that never kept "not found", is replayed over the same stream for comparison.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from cachetools import TTLCache
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from upstream_sim import (  # noqa: E402
+    DEPARTMENTS,
+    Dataset,
+    UpstreamSimulator,
+    build_parser,
+)
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    sim_args = build_parser().parse_args(
+        [
+            f"--port={args.port}",
+            f"--latency={args.latency}",
+            f"--students-per-department={args.students}",
+        ]
+    )
+    os.environ["NTPU_LMS_URLS"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("LINE_CHANNEL_SECRET", "bench")
+    os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench")
+
+    from ntpu_linebot.id.request import ID_REQUEST
+    from ntpu_linebot.id.util import search_student_by_uid
+
+    sim = UpstreamSimulator(sim_args)
+    server = await asyncio.start_server(sim.handle, "127.0.0.1", args.port)
+    assert await ID_REQUEST.change_base_url()
+
+    rng = random.Random(args.seed)
+    listings = [(year, dep) for year in range(101, 113) for dep in DEPARTMENTS]
+    for year, dep in rng.sample(listings, int(len(listings) * args.crawled)):
+        await ID_REQUEST.get_students_by_year_and_department(year, dep)
+
+    dataset = Dataset(sim_args)
+    students = [uid for year, dep in listings for uid, _ in dataset.students(year, dep)]
+    existing = set(students)
+    rng.shuffle(students)
+    weights = [1 / (rank + 1) ** args.skew for rank in range(len(students))]
+    stream = [
+        # A typo keeps the listing but points past its last student
+        uid[:-2] + "99" if rng.random() < args.typos else uid
+        for uid in rng.choices(students, weights, k=args.lookups)
+    ]
+
+    requests, start = sim.requests, time.perf_counter()
+    for uid in stream:
+        await search_student_by_uid(uid)
+    elapsed, requests = time.perf_counter() - start, sim.requests - requests
+    server.close()
+
+    old_cache, old_requests = TTLCache(maxsize=9, ttl=60 * 60 * 24 * 7), 0
+    for uid in stream:
+        if uid not in old_cache:
+            old_requests += 1
+            if uid in existing:
+                old_cache[uid] = True
+
+    print(f"lookups       {len(stream)} ({args.typos:.0%} typos)")
+    print(f"old path      {old_requests} upstream requests")
+    print(
+        f"local-first   {requests} upstream requests"
+        f" ({old_requests / max(requests, 1):.0f}x fewer),"
+        f" {elapsed / len(stream) * 1000:.2f} ms per lookup"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=18095)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--students", type=int, default=60, help="per department")
+    parser.add_argument("--crawled", type=float, default=0.5, help="fraction")
+    parser.add_argument("--typos", type=float, default=0.1, help="fraction")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,439 @@
+# -*- coding:utf-8 -*-
+"""
+Serve a local stand-in for the NTPU websites with synthetic data and injected faults.
+
+One server answers both the lms (student search) and sea (course query, campus
+directory) paths, so point the bot at it with:
+
+    NTPU_LMS_URLS=http://127.0.0.1:18081,http://127.0.0.1:18082 \\
+    NTPU_SEA_URLS=http://127.0.0.1:18081,http://127.0.0.1:18082 \\
+    python -m sanic app:app
+
+and start the simulator with e.g.:
+
+    python benchmark/upstream_sim.py --mirrors 2 --dead-mirrors 1 \\
+        --latency 0.05 --jitter 0.02 --error-rate 0.01 --drip-rate 0.05
+
+The pages are rendered from the templates in benchmark/fixtures, which keep the
+markup the parsers read. Every `<!-- repeat:name -->` region is repeated for the
+synthetic rows, so the page sizes scale with --students-per-department,
+--courses-per-code and the contact options. The data and the fault sequence are
+deterministic for a given --seed and request order.
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = Path(__file__).parent / "fixtures"
+REPEAT_REGEX = re.compile(r"<!-- repeat:(\w+) -->(.*?)<!-- /repeat:\1 -->", re.S)
+
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝洪郭邱曾廖賴徐周葉蘇莊呂江何蕭羅高潘簡朱鍾游彭詹胡施沈余盧梁趙顏柯翁魏孫戴"
+GIVEN_NAMES = "家怡宇翔志明雅婷冠廷承恩佳穎宗翰詩涵俊傑欣妤柏宏子晴品妍彥廷思妤建宏淑芬美玲文彬嘉豪昱辰"
+DEPARTMENTS = [
+    "71", "72", "73", "74", "75", "76", "77", "78", "79",
+    "80", "81", "82", "83", "84", "85", "86", "87",
+]  # fmt: skip
+LAW_GROUPS = "246"
+EDU_CODES = "UMNP"
+COURSE_WORDS = [
+    "微積分", "經濟學", "統計學", "會計學", "程式設計", "資料結構", "演算法",
+    "民法總則", "刑法總則", "憲法", "社會學", "心理學", "線性代數", "機率",
+    "作業系統", "計算機網路", "財務管理", "行銷管理", "英文", "體育",
+]  # fmt: skip
+COURSE_SUFFIXES = ["", "（一）", "（二）", "導論", "專題", "實務"]
+WEEKDAYS = "一二三四五六"
+BUILDINGS = ["F", "B", "C", "L", "PE"]
+UNIT_WORDS = [
+    "教務處", "學生事務處", "總務處", "研究發展處", "國際事務處", "圖書館",
+    "資訊中心", "人事室", "主計室", "秘書室", "體育室", "通識教育中心",
+]  # fmt: skip
+ACADEMIC_WORDS = [
+    "法律學系", "經濟學系", "社會學系", "統計學系", "會計學系", "企業管理學系",
+    "資訊工程學系", "通訊工程學系", "電機工程學系", "中國文學系", "應用外語學系", "歷史學系",
+]  # fmt: skip
+TITLES = ["組長", "專員", "組員", "辦事員", "約用人員", "教授", "副教授", "助理教授"]
+
+
+@lru_cache
+def load_fixture(name: str) -> str:
+    """Read a page template from the fixtures directory."""
+
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def render(template: str, context: dict[str, Any]) -> str:
+    """
+    Render a page template.
+
+    Every repeat region is rendered once for each mapping in the list stored under
+    its name, with the mapping merged over the outer context.
+    """
+
+    def repeat(m: re.Match) -> str:
+        return "".join(
+            render(m[2], {**context, **item}) for item in context.get(m[1], [])
+        )
+
+    return Template(REPEAT_REGEX.sub(repeat, template)).safe_substitute(context)
+
+
+def name_of(rng: random.Random) -> str:
+    """Create a synthetic Chinese name."""
+
+    return rng.choice(SURNAMES) + "".join(rng.choices(GIVEN_NAMES, k=rng.randint(1, 2)))
+
+
+class Dataset:
+    """Deterministic synthetic students, courses and contacts."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.__args = args
+
+    @lru_cache(maxsize=512)
+    def students(self, year: int, department: str) -> list[tuple[str, str]]:
+        """The (uid, name) of the students of a year and department."""
+
+        rng = random.Random(f"{self.__args.seed}-student-{year}-{department}")
+        students = []
+        for i in range(self.__args.students_per_department):
+            seq = f"{i % 100:02d}"
+            group = LAW_GROUPS[i % 3] if department == "71" else str(i // 100)
+            students.append((f"4{year}{department}{group}{seq}", name_of(rng)))
+
+        return students
+
+    def search_students(self, keyword: str) -> list[tuple[str, str]]:
+        """The students whose uid starts with the keyword."""
+
+        # Years after 99 have 3 digits, so their student IDs have 9 digits
+        year_digits = 3 if keyword[1:2] == "1" else 2
+        if not re.fullmatch(r"4\d{%d}\d{2}\d*" % year_digits, keyword):
+            return []
+
+        year = int(keyword[1 : 1 + year_digits])
+        department = keyword[1 + year_digits : 3 + year_digits]
+        if department not in DEPARTMENTS:
+            return []
+
+        return [s for s in self.students(year, department) if s[0].startswith(keyword)]
+
+    @lru_cache(maxsize=64)
+    def courses(self, year: int, code: str) -> list[dict[str, Any]]:
+        """The courses of a year with the given education code."""
+
+        rng = random.Random(f"{self.__args.seed}-course-{year}-{code}")
+        courses = []
+        for i in range(self.__args.courses_per_code):
+            term = 1 + i % 2
+            teachers = [name_of(rng) for _ in range(rng.choice((1, 1, 1, 2)))]
+            slots = [
+                f"每週{rng.choice(WEEKDAYS)}{(s := rng.randint(1, 10))}~{s + rng.randint(0, 2)}"
+                for _ in range(rng.randint(1, 2))
+            ]
+            room = f"{rng.choice(BUILDINGS)}{rng.randint(1, 5)}{rng.randint(1, 20):02d}"
+            note = rng.choice(["", "", f"教室：{room}", "全英語授課"])
+            courses.append(
+                {
+                    "index": str(i + 1),
+                    "year": str(year),
+                    "term": str(term),
+                    "no": f"{code}{i // 2 + 1:04d}",
+                    "department": "資訊工程學系",
+                    "grade": str(rng.randint(1, 4)),
+                    "required": rng.choice(["必", "選"]),
+                    "title": rng.choice(COURSE_WORDS) + rng.choice(COURSE_SUFFIXES),
+                    "note": note,
+                    "teacher": [
+                        {"teacher": t, "teacher_id": f"{year}{code}{i}{j}"}
+                        for j, t in enumerate(teachers)
+                    ],
+                    "time": [{"slot": s, "room": room} for s in slots],
+                    "credits": str(rng.randint(0, 3)),
+                    "enrolled": str(rng.randint(0, 80)),
+                    "capacity": "80",
+                }
+            )
+
+        return courses
+
+    @lru_cache(maxsize=4)
+    def units(self, kind: str) -> list[dict[str, Any]]:
+        """The units of the campus directory, 1 for administrative, 2 for academic."""
+
+        rng = random.Random(f"{self.__args.seed}-unit-{kind}")
+        units = []
+        for u in range(self.__args.units):
+            words = UNIT_WORDS if kind == "1" else ACADEMIC_WORDS
+            unit = f"{words[u % len(words)]}{'' if u < len(words) else u}"
+            unit_id = f"{kind}{u:03d}"
+            orgs = []
+            for o in range(self.__args.organizations_per_unit):
+                name = unit if o == 0 else f"{unit}第{o}組"
+                orgs.append(
+                    {
+                        "heading": [{"heading": unit, "heading_id": unit_id}]
+                        + (
+                            [{"heading": name, "heading_id": f"{unit_id}{o}"}]
+                            if o
+                            else []
+                        ),
+                        "phone": f"02-8674-{rng.randint(1000, 9999)}",
+                        "fax": f"02-8671-{rng.randint(1000, 9999)}",
+                        "location": f"行政大樓{rng.randint(1, 5)}樓",
+                        "website": f"https://www.ntpu.edu.tw/{unit_id}{o}",
+                        "name": name,
+                        "member": [
+                            {
+                                "member": name_of(rng),
+                                "title": rng.choice(TITLES),
+                                "extension": str(rng.randint(10000, 99999)),
+                                "mailbox": f"u{rng.getrandbits(24):06x}",
+                                "domain": "gm.ntpu.edu.tw",
+                            }
+                            for _ in range(self.__args.members_per_organization)
+                        ],
+                    }
+                )
+
+            units.append({"unit": unit, "unit_id": unit_id, "org": orgs})
+
+        return units
+
+    def organizations(self, unit_id: str) -> list[dict[str, Any]]:
+        """The organizations of a unit."""
+
+        for unit in self.units(unit_id[:1]):
+            if unit["unit_id"] == unit_id:
+                return unit["org"]
+
+        return []
+
+    def search_organizations(self, criteria: str) -> list[dict[str, Any]]:
+        """The organizations or members whose name contains the criteria."""
+
+        results = []
+        for kind in "12":
+            for unit in self.units(kind):
+                for org in unit["org"]:
+                    if criteria in org["name"]:
+                        results.append(org)
+
+                    elif members := [
+                        m for m in org["member"] if criteria in m["member"]
+                    ]:
+                        results.append({**org, "member": members})
+
+        return results
+
+
+class UpstreamSimulator:
+    """An HTTP server answering the NTPU pages with injected faults."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.__args = args
+        self.__data = Dataset(args)
+        self.__rng = random.Random(args.seed)
+        self.requests = 0
+
+    def page(self, path: str, query: dict[str, list[str]]) -> Optional[str]:
+        """Render the page of a path, or None if the path is unknown."""
+
+        def arg(name: str) -> str:
+            return query.get(name, [""])[0]
+
+        if path.endswith("/portfolio/search.php"):
+            keyword = arg("fmKeyword")
+            students = self.__data.search_students(keyword)
+            size = self.__args.page_size
+            pages = -(-len(students) // size)
+            page = max(int(arg("page") or 1), 1)
+            rows = students[(page - 1) * size : page * size]
+            return render(
+                load_fixture("lms_search.html"),
+                {
+                    "keyword": keyword,
+                    "row": [{"uid": uid, "name": name} for uid, name in rows],
+                    # The last link is "next page", as on the live site
+                    "page": [
+                        {"page": str(p), "label": str(p)} for p in range(1, pages + 1)
+                    ]
+                    + ([{"page": str(pages), "label": "下一頁"}] if pages else []),
+                },
+            )
+
+        if path.endswith("/course_query_all.queryByKeyword"):
+            year, no, term = int(arg("qYear") or 0), arg("courseno"), arg("qTerm")
+            courses = self.__data.courses(year, no[:1]) if no[:1] in EDU_CODES else []
+            if term:
+                courses = [c for c in courses if c["no"] == no and c["term"] == term]
+
+            return render(load_fixture("sea_course_query.html"), {"row": courses})
+
+        if path.endswith("/CAMPUS_DIR_M.p1"):
+            units = self.__data.units(arg("kind") or "1")
+            return render(load_fixture("sea_campus_dir_list.html"), {"unit": units})
+
+        if path.endswith("/CAMPUS_DIR_M.p2"):
+            orgs = self.__data.organizations(arg("unit"))
+            return render(load_fixture("sea_campus_dir_unit.html"), {"org": orgs})
+
+        if path.endswith("/CAMPUS_DIR_M.pq"):
+            orgs = self.__data.search_organizations(arg("q"))
+            return render(load_fixture("sea_campus_dir_unit.html"), {"org": orgs})
+
+        if path == "/":
+            return "<html><body>NTPU upstream simulator</body></html>"
+
+        return None
+
+    async def respond(
+        self, writer: asyncio.StreamWriter, method: str, target: str
+    ) -> None:
+        """Answer a request, injecting the configured faults."""
+
+        args, rng = self.__args, self.__rng
+        self.requests += 1
+        await asyncio.sleep(
+            max(args.latency + rng.uniform(-args.jitter, args.jitter), 0)
+        )
+
+        if rng.random() < args.timeout_rate:
+            await asyncio.sleep(args.hang)
+            raise ConnectionResetError
+
+        u = urlsplit(target)
+        page = self.page(u.path, parse_qs(u.query, encoding="big5"))
+
+        if rng.random() < args.error_rate:
+            status, page = "503 Service Unavailable", "<html><body>503</body></html>"
+
+        elif page is None:
+            status, page = "404 Not Found", "<html><body>404</body></html>"
+
+        else:
+            status = "200 OK"
+
+        body = page.encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/html; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode()
+        )
+
+        if method == "HEAD":
+            await writer.drain()
+
+        elif rng.random() < args.drip_rate:
+            for i in range(0, len(body), args.drip_chunk):
+                writer.write(body[i : i + args.drip_chunk])
+                await writer.drain()
+                await asyncio.sleep(args.drip_delay)
+
+        else:
+            writer.write(body)
+            await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve the requests of a keep-alive connection."""
+
+        try:
+            while request_line := await reader.readline():
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    pass
+
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                await self.respond(writer, method, target)
+
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass
+
+        finally:
+            writer.close()
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Start the simulated mirrors and print the request counts."""
+
+    sims, servers = [], []
+    for i in range(args.mirrors):
+        # Dead mirrors refuse connections, like an unreachable host
+        if i < args.dead_mirrors:
+            print(f"mirror http://{args.host}:{args.port + i} (down)", flush=True)
+            continue
+
+        sim = UpstreamSimulator(args)
+        sims.append(sim)
+        servers.append(await asyncio.start_server(sim.handle, args.host, args.port + i))
+        print(f"mirror http://{args.host}:{args.port + i} (up)", flush=True)
+
+    start = time.perf_counter()
+    try:
+        while True:
+            await asyncio.sleep(args.report)
+            print(
+                f"{time.perf_counter() - start:.0f}s requests per mirror: "
+                + ", ".join(str(sim.requests) for sim in sims)
+            )
+
+    finally:
+        for server in servers:
+            server.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """The command line options, also used to embed the simulator in benchmarks."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument(
+        "--port", type=int, default=18081, help="port of the first mirror"
+    )
+    parser.add_argument("--mirrors", type=int, default=1)
+    parser.add_argument(
+        "--dead-mirrors", type=int, default=0, help="mirrors refusing connections"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of 503s"
+    )
+    parser.add_argument(
+        "--timeout-rate", type=float, default=0.0, help="fraction hanging up"
+    )
+    parser.add_argument(
+        "--hang", type=float, default=30, help="seconds before hanging up"
+    )
+    parser.add_argument("--drip-rate", type=float, default=0.0, help="fraction dripped")
+    parser.add_argument("--drip-chunk", type=int, default=512, help="bytes per chunk")
+    parser.add_argument(
+        "--drip-delay", type=float, default=0.05, help="seconds per chunk"
+    )
+    parser.add_argument("--students-per-department", type=int, default=60)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--courses-per-code", type=int, default=500)
+    parser.add_argument("--units", type=int, default=12)
+    parser.add_argument("--organizations-per-unit", type=int, default=3)
+    parser.add_argument("--members-per-organization", type=int, default=8)
+    parser.add_argument(
+        "--report", type=float, default=10, help="seconds between reports"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_parser()
+
+    try:
+        asyncio.run(main(parser.parse_args()))
+
+    except KeyboardInterrupt:
+        pass
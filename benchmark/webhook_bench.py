@@ -0,0 +1,329 @@
+# -*- coding:utf-8 -*-
+"""
+Drive the webhook endpoint with signed synthetic LINE events and report the latency.
+
+Start the bot against the stand-in LINE Messaging API served by this script:
+
+    LINE_CHANNEL_SECRET=bench LINE_CHANNEL_ACCESS_TOKEN=bench \\
+    LINE_API_ENDPOINT=http://127.0.0.1:18080 python -m sanic app:app --port 8000
+
+then run:
+
+    python benchmark/webhook_bench.py --rate 200 --duration 30 \\
+        --mix text=0.6,postback=0.2,sticker=0.1,follow=0.1
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import httpx
+
+TEXT_QUERIES = [
+    "學號 412345678",
+    "學號 41234567",
+    "學生 王小明",
+    "姓名 陳",
+    "系代碼 85",
+    "系 資工",
+    "學年 112",
+    "所有系代碼",
+    "課程 微積分",
+    "課 1121U1234",
+    "老師 王",
+    "聯繫 資工系",
+    "聯絡 圖書館",
+    "緊急",
+    "使用說明",
+    "hello",
+]
+POSTBACK_DATA = [
+    "兇",
+    "搜尋全系$112",
+    "112$85",
+    "查看更多$王小明",
+    "查看成員$資訊工程學系",
+    "授課課程$王小明",
+    "使用說明",
+]
+
+
+@dataclass
+class Stats:
+    """Latencies and counters collected during a run."""
+
+    ack: list[float] = field(default_factory=list)
+    reply: list[float] = field(default_factory=list)
+    status: dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    loading: int = 0
+    sent_at: dict[str, float] = field(default_factory=dict)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of the values, 0 if there is none."""
+
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parse an event mix like `text=0.6,postback=0.4`."""
+
+    weights = {}
+    for item in mix.split(","):
+        kind, weight = item.split("=")
+        if kind not in ("text", "postback", "sticker", "follow"):
+            raise ValueError(f"Unknown event type {kind}")
+
+        weights[kind] = float(weight)
+
+    return weights
+
+
+def make_event(kind: str, stats: Stats) -> dict[str, Any]:
+    """Create a synthetic webhook event of the given type."""
+
+    reply_token = uuid.uuid4().hex
+    stats.sent_at[reply_token] = time.perf_counter()
+    event: dict[str, Any] = {
+        "type": kind,
+        "mode": "active",
+        "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": f"U{random.getrandbits(128):032x}"},
+        "webhookEventId": uuid.uuid4().hex.upper()[:26],
+        "deliveryContext": {"isRedelivery": False},
+        "replyToken": reply_token,
+    }
+
+    if kind == "text":
+        event["type"] = "message"
+        event["message"] = {
+            "id": str(random.getrandbits(60)),
+            "type": "text",
+            "text": random.choice(TEXT_QUERIES),
+            "quoteToken": uuid.uuid4().hex,
+        }
+
+    elif kind == "sticker":
+        event["type"] = "message"
+        event["message"] = {
+            "id": str(random.getrandbits(60)),
+            "type": "sticker",
+            "packageId": "446",
+            "stickerId": "1988",
+            "stickerResourceType": "STATIC",
+            "quoteToken": uuid.uuid4().hex,
+        }
+
+    elif kind == "postback":
+        event["postback"] = {"data": random.choice(POSTBACK_DATA)}
+
+    elif kind == "follow":
+        event["follow"] = {"isUnblocked": False}
+
+    return event
+
+
+def sign(secret: str, body: bytes) -> str:
+    """Compute the X-Line-Signature header of a body."""
+
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+async def serve_line_api(port: int, stats: Stats) -> asyncio.AbstractServer:
+    """Serve a stand-in for the LINE Messaging API answering every request."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while request_line := await reader.readline():
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+
+                body = await reader.readexactly(length) if length else b""
+                path = request_line.split()[1].decode()
+
+                if path.endswith("/message/reply"):
+                    token = json.loads(body).get("replyToken")
+                    if (sent := stats.sent_at.pop(token, None)) is not None:
+                        stats.reply.append(time.perf_counter() - sent)
+                    payload = b'{"sentMessages":[{"id":"1","quoteToken":"q"}]}'
+
+                else:
+                    stats.loading += path.endswith("/chat/loading/start")
+                    payload = b"{}"
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", port)
+
+
+async def scrape_loop_lag(client: httpx.AsyncClient, url: str) -> Optional[dict]:
+    """Read the event loop lag histogram of the bot from /metrics."""
+
+    try:
+        res = await client.get(f"{url}/metrics")
+
+    except httpx.HTTPError:
+        return None
+
+    buckets, total, count = {}, 0.0, 0.0
+    for line in res.text.splitlines():
+        if m := re.match(
+            r'ntpu_event_loop_lag_seconds_bucket\{le="([^"]+)"\} (\S+)', line
+        ):
+            buckets[float(m[1])] = float(m[2])
+        elif line.startswith("ntpu_event_loop_lag_seconds_sum"):
+            total = float(line.split()[1])
+        elif line.startswith("ntpu_event_loop_lag_seconds_count"):
+            count = float(line.split()[1])
+
+    return {"buckets": buckets, "sum": total, "count": count}
+
+
+def lag_summary(before: Optional[dict], after: Optional[dict]) -> str:
+    """Summarize the event loop lag observed between two scrapes."""
+
+    if not before or not after or after["count"] <= before["count"]:
+        return "n/a (is /metrics reachable?)"
+
+    count = after["count"] - before["count"]
+    mean = (after["sum"] - before["sum"]) / count
+    quantiles = {}
+    for q in (0.5, 0.99):
+        for bound in sorted(after["buckets"]):
+            if after["buckets"][bound] - before["buckets"].get(bound, 0) >= q * count:
+                quantiles[q] = bound
+                break
+
+    return (
+        f"mean {mean * 1000:.2f} ms, "
+        f"p50 <= {quantiles[0.5] * 1000:g} ms, p99 <= {quantiles[0.99] * 1000:g} ms"
+    )
+
+
+async def send(
+    client: httpx.AsyncClient,
+    url: str,
+    secret: str,
+    events: list[dict[str, Any]],
+    stats: Stats,
+) -> None:
+    """Send one signed webhook request."""
+
+    body = json.dumps(
+        {"destination": "Ubench", "events": events}, ensure_ascii=False
+    ).encode()
+    start = time.perf_counter()
+
+    try:
+        res = await client.post(
+            f"{url}/callback",
+            content=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Line-Signature": sign(secret, body),
+            },
+        )
+        stats.ack.append(time.perf_counter() - start)
+        stats.status[res.status_code] = stats.status.get(res.status_code, 0) + 1
+
+    except httpx.HTTPError:
+        stats.errors += 1
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+
+    random.seed(args.seed)
+    stats = Stats()
+    mix = parse_mix(args.mix)
+    kinds, weights = list(mix), list(mix.values())
+    server = await serve_line_api(args.line_api_port, stats)
+
+    limits = httpx.Limits(max_connections=args.connections)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        lag_before = await scrape_loop_lag(client, args.url)
+
+        total = int(args.rate * args.duration)
+        tasks = []
+        start = time.perf_counter()
+        for i in range(total):
+            # Open loop: keep the target rate even when the bot falls behind
+            if (delay := start + i / args.rate - time.perf_counter()) > 0:
+                await asyncio.sleep(delay)
+
+            events = [
+                make_event(random.choices(kinds, weights)[0], stats)
+                for _ in range(args.events_per_request)
+            ]
+            tasks.append(
+                asyncio.create_task(send(client, args.url, args.secret, events, stats))
+            )
+
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+        # Give the queued handlers time to reply
+        await asyncio.sleep(args.drain)
+        lag_after = await scrape_loop_lag(client, args.url)
+
+    server.close()
+
+    print(
+        f"requests      {len(stats.ack)} ok, {stats.errors} failed in {elapsed:.1f} s"
+    )
+    print(f"throughput    {len(stats.ack) / elapsed:.1f} req/s (target {args.rate:g})")
+    print(f"status        {dict(sorted(stats.status.items()))}")
+    for name, values in (("ack", stats.ack), ("reply", stats.reply)):
+        print(
+            f"{name:<13} p50 {percentile(values, 0.5) * 1000:.1f} ms, "
+            f"p95 {percentile(values, 0.95) * 1000:.1f} ms, "
+            f"p99 {percentile(values, 0.99) * 1000:.1f} ms ({len(values)} samples)"
+        )
+    print(f"loading       {stats.loading} animations")
+    print(f"loop lag      {lag_summary(lag_before, lag_after)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--secret", default="bench")
+    parser.add_argument("--rate", type=float, default=100, help="requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--mix", default="text=0.6,postback=0.2,sticker=0.1,follow=0.1")
+    parser.add_argument("--events-per-request", type=int, default=1)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--line-api-port", type=int, default=18080)
+    parser.add_argument(
+        "--drain", type=float, default=2, help="seconds to wait for replies"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
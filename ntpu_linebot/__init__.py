@@ -2,23 +2,47 @@
 from . import contact as ntpu_contact
 from . import course as ntpu_course
 from . import id as ntpu_id
+from .crawl_util import CRAWLER
+from .dedup_util import EVENT_DEDUP
+from .health_util import HEALTH
+from .http_util import HTTP_CLIENTS
 from .line_api_util import LINE_API_UTIL
+from .metrics_util import METRICS, monitor_event_loop_lag
+from .parse_util import PARSER
 from .route_util import (
     handle_follow_join_event,
+    handle_overloaded_event,
     handle_postback_event,
     handle_sticker_message,
     handle_text_message,
+    needs_loading_animation,
 )
+from .scheduler_util import HANDLER_SCHEDULER, Priority
+from .snapshot_util import SNAPSHOT
 from .sticker_util import STICKER
+from .trace_util import TRACER
 
 __all__ = [
     "ntpu_contact",
     "ntpu_course",
     "ntpu_id",
+    "CRAWLER",
+    "EVENT_DEDUP",
+    "HANDLER_SCHEDULER",
+    "HEALTH",
+    "HTTP_CLIENTS",
     "LINE_API_UTIL",
+    "METRICS",
     "handle_follow_join_event",
+    "handle_overloaded_event",
     "handle_postback_event",
     "handle_sticker_message",
     "handle_text_message",
+    "monitor_event_loop_lag",
+    "needs_loading_animation",
+    "PARSER",
+    "Priority",
+    "SNAPSHOT",
     "STICKER",
+    "TRACER",
 ]
@@ -14,6 +14,38 @@ class Bot(ABC):
 
         return "$"
 
+    @property
+    def keywords(self) -> list[str]:
+        """Leading keywords of the text messages handled by the bot"""
+
+        return []
+
+    def is_local_text_message(self, payload: str) -> bool:
+        """
+        Check whether a text message is answered from memory without any upstream request.
+
+        Args:
+            payload (str): The text message payload received by the bot.
+
+        Returns:
+            bool: True if the bot answers the text message from memory, False otherwise.
+        """
+
+        return False
+
+    def is_local_postback_event(self, payload: str) -> bool:
+        """
+        Check whether a postback event is answered from memory without any upstream request.
+
+        Args:
+            payload (str): The postback payload received by the bot.
+
+        Returns:
+            bool: True if the bot answers the postback event from memory, False otherwise.
+        """
+
+        return False
+
     @abstractmethod
     async def handle_text_message(
         self,
@@ -16,7 +16,8 @@ from linebot.v3.messaging.models import (
 )
 
 from ..abs_bot import Bot
-from ..line_bot_util import EMPTY_POSTBACK_ACTION, get_sender
+from ..health_util import HEALTH
+from ..line_bot_util import EMPTY_POSTBACK_ACTION, get_sender, service_unavailable
 from ..normal_util import list_to_regex, partition
 from .contact import Contact, Individual, Organization
 from .util import search_contacts_by_criteria, search_contacts_by_name
@@ -38,6 +39,7 @@ class ContactBot(Bot):
         "連絡方式",
     ]
     __CONTACT_REGEX = list_to_regex(__VALID_CONTACT_STR)
+    __EMERGENCY_STR = "緊急"
 
     @property
     def __sender_name(self) -> str:
@@ -47,6 +49,24 @@ class ContactBot(Bot):
     def __contact_regex(self):
         return self.__CONTACT_REGEX
 
+    @property
+    def keywords(self) -> list[str]:
+        """Leading keywords of the text messages handled by the bot"""
+
+        return [*self.__VALID_CONTACT_STR, self.__EMERGENCY_STR]
+
+    def is_local_text_message(self, payload: str) -> bool:
+        """Contact searches may go to the upstream"""
+
+        return payload.startswith(self.__EMERGENCY_STR) or not search(
+            self.__contact_regex, payload, IGNORECASE
+        )
+
+    def is_local_postback_event(self, payload: str) -> bool:
+        """Contact postbacks are answered from the contact dict"""
+
+        return True
+
     async def handle_text_message(
         self,
         payload: str,
@@ -54,7 +74,7 @@ class ContactBot(Bot):
     ) -> list[Message]:
         """處理文字訊息"""
 
-        if payload.startswith("緊急"):
+        if payload.startswith(self.__EMERGENCY_STR):
             return [
                 TemplateMessage(
                     altText="緊急電話",
@@ -117,6 +137,9 @@ class ContactBot(Bot):
                     for template in self.__generate_contact_templates(contacts)
                 ]
 
+            if not HEALTH.is_healthy("contact"):
+                return [service_unavailable(self.__sender_name, quote_token)]
+
             if contacts := await search_contacts_by_criteria(criteria):
                 return [
                     TemplateMessage(
@@ -0,0 +1,128 @@
+# -*- coding:utf-8 -*-
+from lxml.etree import HTML, XPath, _Element
+
+# name, title, extension, email
+IndividualRow = tuple[str, str, str, str]
+
+# name, superior, location, website, members
+OrganizationRow = tuple[str, str, str, str, list[IndividualRow]]
+
+__ORGANIZATIONS = XPath("//div[normalize-space(@class) = 'alert alert-info mt-0 mb-0']")
+__ORGANIZATION_NAMES = XPath(
+    "descendant::a[normalize-space(@class) = 'lang lang-zh-Hant mx-2']"
+)
+__ITEMS = XPath("descendant::li")
+__MEMBERS = XPath("descendant::tbody[1]/descendant::tr")
+__CELLS = XPath("descendant::td")
+__DEPARTMENT_LINKS = XPath(
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' card-header ')]"
+    "/descendant::a[1]/@href"
+)
+__TEXT = XPath("string()")
+
+
+def parse_email(data: _Element) -> str:
+    """
+    Parse an email address whose "@" is shown as an image.
+
+    Args:
+        data (_Element): The element holding the address.
+
+    Returns:
+        str: The email address.
+    """
+
+    email = data.text or ""
+    for child in data:
+        if child.tag == "img":
+            email += "@"
+
+        email += child.tail or ""
+
+    return email
+
+
+def parse_members(data: _Element) -> list[IndividualRow]:
+    """
+    Parse the member table of an organization.
+
+    Args:
+        data (_Element): The member table.
+
+    Returns:
+        list[IndividualRow]: The name, title, extension and email of each member.
+    """
+
+    members: list[IndividualRow] = []
+    for member in __MEMBERS(data):
+        fields = __CELLS(member)
+        members.append(
+            (
+                __TEXT(fields[0].find(".//span")),
+                __TEXT(fields[1]).strip(),
+                __TEXT(fields[2].find(".//span")),
+                parse_email(fields[4].find(".//span")),
+            )
+        )
+
+    return members
+
+
+def parse_organizations(content: bytes, encoding: str) -> list[OrganizationRow]:
+    """
+    Parse the organizations and their members listed on a campus directory page.
+
+    Args:
+        content (bytes): The page.
+        encoding (str): The encoding of the page.
+
+    Returns:
+        list[OrganizationRow]: The name, superior, location, website and members of
+            each organization.
+    """
+
+    if (root := HTML(content.decode(encoding, "replace"))) is None:
+        return []
+
+    organizations: list[OrganizationRow] = []
+    for organization in __ORGANIZATIONS(root):
+        org_names = [__TEXT(name) for name in __ORGANIZATION_NAMES(organization)]
+        if len(org_names) == 1:
+            superior, org_name = "", org_names[0]
+        else:
+            superior, org_name = org_names[0], org_names[1]
+
+        org_datas = __ITEMS(organization)
+        location = __TEXT(org_datas[2]).split("：")[1]
+        website = __TEXT(org_datas[3].find(".//a"))
+
+        # The member table follows its organization, if it has members
+        member_data = organization.getnext()
+        members = (
+            parse_members(member_data)
+            if member_data is not None
+            and (member_data.get("class") or "").split() == ["w100"]
+            else []
+        )
+
+        organizations.append((org_name, superior, location, website, members))
+
+    return organizations
+
+
+def parse_department_links(content: bytes, encoding: str) -> list[str]:
+    """
+    Parse the links to the department pages listed on a campus directory page.
+
+    Args:
+        content (bytes): The page.
+        encoding (str): The encoding of the page.
+
+    Returns:
+        list[str]: The relative links of the department pages.
+    """
+
+    if (root := HTML(content.decode(encoding, "replace"))) is None:
+        return []
+
+    return [str(href) for href in __DEPARTMENT_LINKS(root)]
@@ -1,24 +1,27 @@
 # -*- coding:utf-8 -*-
+from os import getenv
 from typing import Optional
 from urllib.parse import quote
 
-from httpx import AsyncClient, HTTPError
 from asyncache import cached
-from bs4 import BeautifulSoup as Bs4
-from bs4 import NavigableString
-from cachetools import TTLCache
 from fake_useragent import UserAgent
+from httpx import HTTPError
 
+from ..http_util import HTTP_CLIENTS
+from ..metrics_util import DICT_ENTRIES, MetricsTTLCache
+from ..parse_util import PARSER
+from ..singleflight_util import singleflight
+from ..trace_util import TRACER
 from .contact import Contact, Individual, Organization
+from .parser import parse_department_links, parse_organizations
 
 
 class ContactRequest:
     __base_url = ""
-    __URLS = [
-        "http://120.126.197.7",
-        "https://120.126.197.7",
-        "https://sea.cc.ntpu.edu.tw",
-    ]
+    __URLS = getenv(
+        "NTPU_SEA_URLS",
+        "http://120.126.197.7,https://120.126.197.7,https://sea.cc.ntpu.edu.tw",
+    ).split(",")
     __UA = UserAgent(min_percentage=0.01)
     __ALL_ADMINISTATIVE_URL = "/pls/ld/CAMPUS_DIR_M.p1?kind=1"
     __ALL_ACADEMIC_URL = "/pls/ld/CAMPUS_DIR_M.p1?kind=2"
@@ -43,10 +46,9 @@ class ContactRequest:
             return False
 
         try:
-            async with AsyncClient(
-                headers={"User-Agent": self.__UA.random}
-            ) as client:
-                await client.head(url)
+            await HTTP_CLIENTS.get_client(url).head(
+                url, headers={"User-Agent": self.__UA.random}
+            )
 
         except HTTPError:
             return False
@@ -81,71 +83,44 @@ class ContactRequest:
         contacts: list[Contact] = []
 
         try:
-            async with AsyncClient(
-                headers={"User-Agent": self.__UA.random}
-            ) as client:
-                res = await client.get(url)
-                soup = Bs4(res.text, "lxml")
-
-                for organization in soup.find_all(
-                    "div", {"class": "alert alert-info mt-0 mb-0"}
-                ):
-                    org_names = organization.find_all(
-                        "a", {"class": "lang lang-zh-Hant mx-2"}
-                    )
-                    if len(org_names) == 1:
-                        superior = ""
-                        org_name = org_names[0].text
-                    else:
-                        superior = org_names[0].text
-                        org_name = org_names[1].text
-
-                    org_datas = organization.find_all("li")
-                    location = org_datas[2].text.split("：")[1]
-                    website = org_datas[3].find("a").text
-
-                    members: list[Individual] = []
-                    member_data = organization.next_sibling.next_sibling
-                    if member_data.get("class") == ["w100"]:
-                        for data in member_data.find("tbody").find_all("tr"):
-                            member_datas = data.find_all("td")
-                            member_name = member_datas[0].find("span").text
-                            title = member_datas[1].text.strip()
-                            extension = member_datas[2].find("span").text
-                            email = ""
-                            for child in member_datas[4].find("span").children:
-                                if isinstance(child, NavigableString):
-                                    email += child
-                                elif child.name == "img":
-                                    email += "@"
-
-                            contact = Individual(
-                                name=member_name,
-                                organization=org_name,
-                                title=title,
-                                extension=extension,
-                                email=email,
-                            )
-
-                            members.append(contact)
-                            contacts.append(contact)
-                            self.CONTACT_DICT[contact.uid] = contact
-
-                    organization = Organization(
-                        name=org_name,
-                        superior=superior,
-                        location=location,
-                        website=website,
-                        members=members,
-                    )
-
-                    contacts.append(organization)
-                    self.CONTACT_DICT[organization.uid] = organization
+            res = await HTTP_CLIENTS.get_client(url).get(
+                url, headers={"User-Agent": self.__UA.random}
+            )
+            with TRACER.span("html", bytes=len(res.content)):
+                rows = await PARSER.parse(
+                    parse_organizations, res.content, res.encoding
+                )
 
         except HTTPError as exc:
             self.__base_url = ""
             raise ValueError("An error occurred while fetching contacts.") from exc
 
+        for org_name, superior, location, website, member_rows in rows:
+            members: list[Individual] = []
+            for member_name, title, extension, email in member_rows:
+                contact = Individual(
+                    name=member_name,
+                    organization=org_name,
+                    title=title,
+                    extension=extension,
+                    email=email,
+                )
+
+                members.append(contact)
+                contacts.append(contact)
+                self.CONTACT_DICT[contact.uid] = contact
+
+            organization = Organization(
+                name=org_name,
+                superior=superior,
+                location=location,
+                website=website,
+                members=members,
+            )
+
+            contacts.append(organization)
+            self.CONTACT_DICT[organization.uid] = organization
+
         return contacts
 
     async def get_contact_pages_by_url(self, url: str) -> list[Contact]:
@@ -162,15 +137,18 @@ class ContactRequest:
         contacts: list[Contact] = []
 
         try:
-            async with AsyncClient(
-                headers={"User-Agent": self.__UA.random}
-            ) as client:
-                res = await client.get(url)
-                soup = Bs4(res.text, "lxml")
-
-                for department in soup.find_all("div", {"class": "card-header"}):
-                    url = f"{self.__base_url}/pls/ld/{department.find("a")["href"]}"
-                    contacts += await self.get_contacts_by_url(url)
+            res = await HTTP_CLIENTS.get_client(url).get(
+                url, headers={"User-Agent": self.__UA.random}
+            )
+            with TRACER.span("html", bytes=len(res.content)):
+                links = await PARSER.parse(
+                    parse_department_links, res.content, res.encoding
+                )
+
+            for link in links:
+                contacts += await self.get_contacts_by_url(
+                    f"{self.__base_url}/pls/ld/{link}"
+                )
 
         except HTTPError as exc:
             self.__base_url = ""
@@ -200,7 +178,10 @@ class ContactRequest:
         url = self.__base_url + self.__ALL_ACADEMIC_URL
         return await self.get_contact_pages_by_url(url)
 
-    @cached(TTLCache(maxsize=9, ttl=60 * 60 * 24 * 7))
+    @cached(
+        MetricsTTLCache("get_contacts_by_criteria", maxsize=9, ttl=60 * 60 * 24 * 7)
+    )
+    @singleflight("get_contacts_by_criteria")
     async def get_contacts_by_criteria(self, criteria: str) -> list[Contact]:
         """
         Asynchronously retrieves contacts by the given criteria and returns a list of Contact objects.
@@ -218,3 +199,4 @@ class ContactRequest:
 
 
 CONTACT_REQUEST = ContactRequest()
+DICT_ENTRIES.labels("contact").set_function(lambda: len(CONTACT_REQUEST.CONTACT_DICT))
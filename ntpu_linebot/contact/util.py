@@ -7,6 +7,7 @@ from sanic import Sanic
 
 from ntpu_linebot.contact.contact import Contact, Individual, Organization
 
+from ..metrics_util import CRAWL_DONE, CRAWL_TOTAL
 from .request import CONTACT_REQUEST
 
 
@@ -37,10 +38,16 @@ async def healthz(app: Sanic, force: bool = False) -> bool:
 async def load_contact_dict() -> None:
     """Updates the contact dict for each year."""
 
+    done = CRAWL_DONE.labels("contact")
+    done.set(0)
+    CRAWL_TOTAL.labels("contact").set(2)
+
     await sleep(random.uniform(15, 25))
     await CONTACT_REQUEST.get_administrative_contacts()
+    done.inc()
     await sleep(random.uniform(15, 25))
     await CONTACT_REQUEST.get_academic_contacts()
+    done.inc()
 
 
 def search_contact_by_uid(uid: str) -> Optional[Contact]:
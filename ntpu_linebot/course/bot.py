@@ -16,11 +16,13 @@ from linebot.v3.messaging.models import (
 )
 
 from ..abs_bot import Bot
-from ..line_bot_util import EMPTY_POSTBACK_ACTION, get_sender
+from ..health_util import HEALTH
+from ..line_bot_util import EMPTY_POSTBACK_ACTION, get_sender, service_unavailable
 from ..normal_util import list_to_regex
 from .course import ALL_EDU_CODE, Course, SimpleCourse
 from .util import (
     SearchKind,
+    is_course_uid_local,
     search_course_by_uid,
     search_simple_courses_by_criteria_and_kind,
 )
@@ -66,6 +68,25 @@ class CourseBot(Bot):
     __CLASS_REGEX = list_to_regex(__VALID_CLASS_STR)
     __TEACHER_REGEX = list_to_regex(__VALID_TEACHER_STR)
 
+    @property
+    def keywords(self) -> list[str]:
+        """Leading keywords of the text messages handled by the bot"""
+
+        return [*self.__VALID_CLASS_STR, *self.__VALID_TEACHER_STR]
+
+    def is_local_text_message(self, payload: str) -> bool:
+        """Course searches are answered from the course dict, UID lookups may not be"""
+
+        if fullmatch(self.__UID_REGEX, payload, IGNORECASE):
+            return is_course_uid_local(payload)
+
+        return True
+
+    def is_local_postback_event(self, payload: str) -> bool:
+        """Teacher courses are answered from the course dict, UID lookups may not be"""
+
+        return self.is_local_text_message(payload)
+
     async def handle_text_message(
         self,
         payload: str,
@@ -142,6 +163,9 @@ class CourseBot(Bot):
             ]
 
         if fullmatch(self.__UID_REGEX, payload, IGNORECASE):
+            if not is_course_uid_local(payload) and not HEALTH.is_healthy("course"):
+                return [service_unavailable(self.__SENDER_NAME)]
+
             if course := await search_course_by_uid(payload):
                 return [
                     TemplateMessage(
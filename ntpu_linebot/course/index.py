@@ -0,0 +1,126 @@
+# -*- coding:utf-8 -*-
+from typing import Iterable
+
+
+class CourseIndex:
+    """
+    Inverted index from the characters of the course titles to course UIDs, and from
+    the characters of the teacher names to the names, with the courses of each name.
+
+    Teacher names are far fewer than courses, so a teacher search intersects the short
+    postings of the names, then collects the courses of the matching names.
+    """
+
+    def __init__(self) -> None:
+        self.__titles: dict[str, set[str]] = {}
+        self.__teacher_names: dict[str, set[str]] = {}
+        self.__teachers: dict[str, set[str]] = {}
+
+    def add(self, uid: str, title: str, teachers: Iterable[str]) -> None:
+        """
+        Add a course to the index.
+
+        Args:
+            uid (str): The UID of the course.
+            title (str): The title of the course.
+            teachers (Iterable[str]): The teachers of the course.
+        """
+
+        for char in set(title.lower()):
+            self.__titles.setdefault(char, set()).add(uid)
+
+        for teacher in teachers:
+            if (uids := self.__teachers.get(teacher)) is None:
+                uids = self.__teachers[teacher] = set()
+                for char in set(teacher.lower()):
+                    self.__teacher_names.setdefault(char, set()).add(teacher)
+
+            uids.add(uid)
+
+    def discard(self, uid: str, title: str, teachers: Iterable[str]) -> None:
+        """
+        Remove a course from the index.
+
+        Args:
+            uid (str): The UID the course was added with.
+            title (str): The title the course was added with.
+            teachers (Iterable[str]): The teachers the course was added with.
+        """
+
+        for char in set(title.lower()):
+            if (uids := self.__titles.get(char)) is not None:
+                uids.discard(uid)
+                if not uids:
+                    del self.__titles[char]
+
+        for teacher in teachers:
+            if (uids := self.__teachers.get(teacher)) is None:
+                continue
+
+            uids.discard(uid)
+            if uids:
+                continue
+
+            # The last course of a teacher is gone, so is the name
+            del self.__teachers[teacher]
+            for char in set(teacher.lower()):
+                names = self.__teacher_names[char]
+                names.discard(teacher)
+                if not names:
+                    del self.__teacher_names[char]
+
+    @staticmethod
+    def __intersect(postings: dict[str, set[str]], chars: set[str]) -> set[str]:
+        """Intersect the postings of every character, from the rarest one."""
+
+        sets: list[set[str]] = []
+        for char in chars:
+            if (posting := postings.get(char)) is None:
+                return set()
+
+            sets.append(posting)
+
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def titles(self, criteria: str) -> set[str]:
+        """
+        Get the courses whose titles contain every character of the criteria, ignoring
+        the case.
+
+        Args:
+            criteria (str): The (partial) title, with at least one character.
+
+        Returns:
+            set[str]: The UIDs of the matching courses.
+        """
+
+        return self.__intersect(self.__titles, set(criteria.lower()))
+
+    def teachers(self, criteria: str) -> set[str]:
+        """
+        Get the courses with a teacher whose name contains every character of the
+        criteria, ignoring the case.
+
+        Args:
+            criteria (str): The (partial) teacher name, with at least one character.
+
+        Returns:
+            set[str]: The UIDs of the matching courses.
+        """
+
+        names = self.__intersect(self.__teacher_names, set(criteria.lower()))
+        return set().union(*(self.__teachers[name] for name in names))
+
+    def teacher(self, name: str) -> set[str]:
+        """
+        Get the courses of a teacher by the exact name.
+
+        Args:
+            name (str): The name of the teacher.
+
+        Returns:
+            set[str]: The UIDs of the courses of the teacher.
+        """
+
+        return set(self.__teachers.get(name, ()))
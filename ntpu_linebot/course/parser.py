@@ -0,0 +1,293 @@
+# -*- coding:utf-8 -*-
+from codecs import getincrementaldecoder
+from re import IGNORECASE, compile, search, sub
+from typing import Optional
+
+from lxml.etree import HTML, HTMLPullParser, XMLSyntaxError, XPath, _Element
+
+# term, no, title, teachers, times
+SimpleCourseRow = tuple[int, str, str, list[str], list[str]]
+
+# title, detail url, note, teachers, teachers url, times, locations
+CourseRow = tuple[str, str, str, list[str], list[str], list[str], list[str]]
+
+__CLASSROOM_STR_LIST = ["教室", "上課地點"]
+__CLASSROOM_REGEX = (
+    r"(?<=("
+    + r"|".join(rf"(?<={name})" for name in __CLASSROOM_STR_LIST)
+    + r")[:：為]).*?(?=$|[ .，。；【])"
+)
+
+# The rows of the first table body of the first table, as the course query lists them
+__ROWS = XPath("(//table)[1]/descendant::tbody[1]/descendant::tr")
+__FIRST_ROW = XPath("(//table)[1]/descendant::tbody[1]/descendant::tr[1]")
+__CELLS = XPath("descendant::td")
+__LINKS = XPath("descendant::a")
+__TEXT = XPath("string()")
+
+
+def parse_title_field(data: _Element) -> tuple[str, str, str, str]:
+    """
+    Parse the title field from the given data.
+
+    Args:
+        data (_Element): The table cell to parse.
+
+    Returns:
+        tuple[str, str, str, str]: A tuple contain title, detail url, note, and location.
+    """
+
+    link = data.find(".//a")
+    title = __TEXT(link).strip()
+    detail_url = "?" + link.get("href").split("?")[1]
+
+    note = ""
+    location = ""
+    if note := __TEXT(data.find(".//font"))[3:].strip():
+        if l := search(__CLASSROOM_REGEX, note):
+            location = sub(r"\s", " ", l.group())
+
+    return title, detail_url, note, location
+
+
+def parse_teacher_field(data: _Element) -> tuple[list[str], list[str]]:
+    """
+    Parses the teacher field from the given data and returns two lists.
+
+    Args:
+        data (_Element): The table cell to parse.
+
+    Returns:
+        tuple[list[str], list[str]]: A tuple containing two lists,
+        the first being a list of teacher names, and the second being a list of teacher links.
+    """
+
+    teachers: list[str] = []
+    teachers_url: list[str] = []
+    for teacher in __LINKS(data):
+        teachers.append(__TEXT(teacher))
+        teachers_url.append("?" + teacher.get("href").split("?")[1])
+
+    return teachers, teachers_url
+
+
+def parse_time_location_field(data: _Element) -> tuple[list[str], list[str]]:
+    """
+    Parses the time and location fields from the given data.
+
+    Args:
+        data (_Element): The table cell to parse.
+
+    Returns:
+        tuple[list[str], list[str]]: A tuple containing two lists, the first list
+        containing the parsed times and the second list containing the parsed locations.
+    """
+
+    times: list[str] = []
+    locations: list[str] = []
+    for line_info in (__TEXT(line) for line in __LINKS(data)):
+        if line_info.find("每週未維護") > -1:
+            continue
+
+        infos = line_info.split("\t", maxsplit=1)
+        times.append(infos[0])
+        if len(infos) > 1:
+            locations.append(infos[1])
+
+    return times, locations
+
+
+def parse_simple_course_row(row: _Element) -> SimpleCourseRow:
+    """
+    Parse a row of a course query page.
+
+    Args:
+        row (_Element): The table row to parse.
+
+    Returns:
+        SimpleCourseRow: The term, no, title, teachers and times of the course.
+    """
+
+    fields = __CELLS(row)
+    return (
+        int(__TEXT(fields[2])),
+        __TEXT(fields[3]),
+        parse_title_field(fields[7])[0],
+        parse_teacher_field(fields[8])[0],
+        parse_time_location_field(fields[13])[0],
+    )
+
+
+def parse_simple_courses(content: bytes, encoding: str) -> list[SimpleCourseRow]:
+    """
+    Parse the courses listed on a course query page.
+
+    Args:
+        content (bytes): The page.
+        encoding (str): The encoding of the page.
+
+    Returns:
+        list[SimpleCourseRow]: The term, no, title, teachers and times of each course.
+    """
+
+    if (root := HTML(content.decode(encoding, "replace"))) is None:
+        return []
+
+    return [parse_simple_course_row(row) for row in __ROWS(root)]
+
+
+class SimpleCourseStream:
+    """
+    Incremental parser of a course query page, parsing each course as soon as its row
+    has arrived and dropping the row afterwards.
+
+    libxml2 keeps every byte a push parser was fed, so once the course rows begin, the
+    parser is replaced at a row boundary after every __RESTART_SIZE characters, by one
+    resuming inside a table body. The memory held stays flat however long the page is.
+    """
+
+    __RESTART_SIZE = 1 << 18
+    __ROW_START = compile(r"<tr[\s/>]", IGNORECASE)
+    __TABLE_END = compile(r"</t(?:able|body)[\s>]", IGNORECASE)
+
+    def __init__(self, encoding: str) -> None:
+        self.__decoder = getincrementaldecoder(encoding)("replace")
+        self.__parser = self.__new_parser()
+        self.__fed = 0
+        self.__table: Optional[_Element] = None
+        self.__body: Optional[_Element] = None
+        self.__done = False
+
+    @staticmethod
+    def __new_parser() -> HTMLPullParser:
+        """Create a push parser reporting the tables, table bodies and rows."""
+
+        return HTMLPullParser(events=("start", "end"), tag=("table", "tbody", "tr"))
+
+    def feed(self, chunk: bytes) -> list[SimpleCourseRow]:
+        """
+        Feed the next chunk of the page.
+
+        Args:
+            chunk (bytes): The chunk of the page.
+
+        Returns:
+            list[SimpleCourseRow]: The courses completed by the chunk.
+        """
+
+        if self.__done:
+            return []
+
+        text = self.__decoder.decode(chunk)
+        courses: list[SimpleCourseRow] = []
+        if (
+            self.__body is not None
+            and self.__fed >= self.__RESTART_SIZE
+            and (row_start := self.__ROW_START.search(text))
+            # A row after the end of the table body belongs to another table
+            and not self.__TABLE_END.search(text, 0, row_start.start())
+        ):
+            # End the old parser right before a row, and resume in a new one
+            self.__parser.feed(text[: row_start.start()])
+            courses += self.__read()
+            if self.__done:
+                return courses
+
+            self.__parser.close()
+            courses += self.__read(restarting=True)
+
+            self.__parser = self.__new_parser()
+            self.__parser.feed("<table><tbody>")
+            self.__fed = 0
+            self.__table = self.__body = None
+            text = text[row_start.start() :]
+
+        self.__parser.feed(text)
+        self.__fed += len(text)
+        courses += self.__read()
+
+        return courses
+
+    def close(self) -> list[SimpleCourseRow]:
+        """
+        Finish the page.
+
+        Returns:
+            list[SimpleCourseRow]: The courses left in the end of the page.
+        """
+
+        if self.__done:
+            return []
+
+        try:
+            self.__parser.feed(self.__decoder.decode(b"", final=True))
+            self.__parser.close()
+
+        # Nothing but whitespace was fed
+        except XMLSyntaxError:
+            return []
+
+        return self.__read()
+
+    def __read(self, restarting: bool = False) -> list[SimpleCourseRow]:
+        """Parse the rows of the first table body of the first table ended so far."""
+
+        courses: list[SimpleCourseRow] = []
+        for event, element in self.__parser.read_events():
+            if self.__done:
+                continue
+
+            if event == "start":
+                if element.tag == "table" and self.__table is None:
+                    self.__table = element
+                elif element.tag == "tbody" and self.__body is None:
+                    if self.__table is not None and any(
+                        ancestor is self.__table for ancestor in element.iterancestors()
+                    ):
+                        self.__body = element
+
+            elif element.tag == "tr":
+                if self.__body is not None and element.getparent() is self.__body:
+                    courses.append(parse_simple_course_row(element))
+
+                    # Drop the parsed rows, keeping the last one the parser may still
+                    # append the tail to
+                    element.clear(keep_tail=True)
+                    while element.getprevious() is not None:
+                        del self.__body[0]
+
+            # The table closed by a restart is not the end of the page
+            elif not restarting and (element is self.__body or element is self.__table):
+                self.__done = True
+
+        return courses
+
+
+def parse_course(content: bytes, encoding: str) -> Optional[CourseRow]:
+    """
+    Parse the first course listed on a course query page.
+
+    Args:
+        content (bytes): The page.
+        encoding (str): The encoding of the page.
+
+    Returns:
+        CourseRow | None: The title, detail url, note, teachers, teachers url, times and
+            locations of the course, or None if the page lists no course.
+    """
+
+    if (root := HTML(content.decode(encoding, "replace"))) is None:
+        return None
+
+    if not (rows := __FIRST_ROW(root)):
+        return None
+
+    fields = __CELLS(rows[0])
+    title, detail_url, note, location = parse_title_field(fields[7])
+    teachers, teachers_url = parse_teacher_field(fields[8])
+    times, locations = parse_time_location_field(fields[13])
+
+    if location:
+        locations.append(location)
+
+    return title, detail_url, note, teachers, teachers_url, times, locations
@@ -1,104 +1,39 @@
 # -*- coding:utf-8 -*-
-from re import search, sub
-from typing import Optional
+from os import getenv
+from typing import AsyncIterator, Optional
 
-from httpx import AsyncClient, HTTPError, Timeout
 from asyncache import cached
-from bs4 import BeautifulSoup as Bs4
-from cachetools import TTLCache
 from fake_useragent import UserAgent
-
+from httpx import HTTPError, Timeout
+
+from ..http_util import HTTP_CLIENTS
+from ..metrics_util import DICT_ENTRIES, LookupCache
+from ..normal_util import academic_year
+from ..parse_util import PARSER
+from ..singleflight_util import singleflight
+from ..trace_util import TRACER
 from .course import ALL_EDU_CODE, Course, SimpleCourse
-
-__CLASSROOM_STR_LIST = ["教室", "上課地點"]
-__CLASSROOM_REGEX = (
-    r"(?<=("
-    + r"|".join(rf"(?<={name})" for name in __CLASSROOM_STR_LIST)
-    + r")[:：為]).*?(?=$|[ .，。；【])"
+from .parser import (
+    SimpleCourseRow,
+    SimpleCourseStream,
+    parse_course,
+    parse_simple_courses,
 )
-
-
-def prase_title_field(data: Bs4) -> tuple[str, str, str, str]:
-    """
-    Parse the title field from the given data.
-
-    Args:
-        data (Bs4): The BeautifulSoup data to parse.
-
-    Returns:
-        tuple[str, str, str, str]: A tuple contain title, detail url, note, and location.
-    """
-
-    title = data.find("a").text.strip()
-    detail_url = data.find("a").get("href")
-    detail_url = "?" + detail_url.split("?")[1]
-
-    note = ""
-    location = ""
-    if note := data.find("font").text[3:].strip():
-        if l := search(__CLASSROOM_REGEX, note):
-            location = sub(r"\s", " ", l.group())
-
-    return title, detail_url, note, location
-
-
-def prase_teacher_field(data: Bs4) -> tuple[list[str], list[str]]:
-    """
-    Parses the teacher field from the given Bs4 data and returns two lists.
-
-    Args:
-        data (Bs4): The Bs4 data to parse.
-
-    Returns:
-        tuple[list[str], list[str]]: A tuple containing two lists,
-        the first being a list of teacher names, and the second being a list of teacher links.
-    """
-
-    teachers: list[str] = []
-    teachers_url: list[str] = []
-    for teacher in data.find_all("a"):
-        teachers.append(teacher.text)
-        teachers_url.append("?" + teacher.get("href").split("?")[1])
-
-    return teachers, teachers_url
-
-
-def prase_time_location_filed(data: Bs4) -> tuple[list[str], list[str]]:
-    """
-    Parses the time and location fields from the given data.
-
-    Args:
-        data (Bs4): The BeautifulSoup data to parse.
-
-    Returns:
-        tuple[list[str], list[str]]: A tuple containing two lists, the first list
-        containing the parsed times and the second list containing the parsed locations.
-    """
-
-    times: list[str] = []
-    locations: list[str] = []
-    for line_info in (str(line.text) for line in data.find_all("a")):
-        if line_info.find("每週未維護") > -1:
-            continue
-
-        infos = line_info.split("\t", maxsplit=1)
-        times.append(infos[0])
-        if len(infos) > 1:
-            locations.append(infos[1])
-
-    return times, locations
+from .store import CourseStore
 
 
 class CourseRequest:
     __base_url = ""
-    __URLS = [
-        "http://120.126.197.7",
-        "https://120.126.197.7",
-        "https://sea.cc.ntpu.edu.tw",
-    ]
+    __URLS = getenv(
+        "NTPU_SEA_URLS",
+        "http://120.126.197.7,https://120.126.197.7,https://sea.cc.ntpu.edu.tw",
+    ).split(",")
     __COURSE_QUERY_URL = "/pls/dev_stud/course_query_all.queryByKeyword"
     __UA = UserAgent(min_percentage=0.01)
-    COURSE_DICT = dict[str, SimpleCourse]()
+    __streaming = getenv("COURSE_STREAMING", "true").lower() == "true"
+    __CHUNK_SIZE = 1 << 16
+    COURSE_DICT = CourseStore()
+    FROZEN_YEARS = set[int]()
 
     async def check_url(self, url: Optional[str] = None) -> bool:
         """
@@ -118,8 +53,9 @@ class CourseRequest:
             return False
 
         try:
-            async with AsyncClient(headers={"User-Agent": self.__UA.random}) as client:
-                await client.head(url)
+            await HTTP_CLIENTS.get_client(url).head(
+                url, headers={"User-Agent": self.__UA.random}
+            )
 
         except HTTPError:
             return False
@@ -140,8 +76,24 @@ class CourseRequest:
         self.__base_url = ""
         return False
 
-    @cached(TTLCache(maxsize=9, ttl=60 * 60 * 24 * 7))
-    async def get_course_by_uid(self, uid: str) -> Course:
+    def is_frozen(self, uid: str) -> bool:
+        """
+        Check whether the year of a course UID is frozen, so the course dict holds
+        every course of it.
+
+        Args:
+            uid (str): The course UID, year + term + course number.
+
+        Returns:
+            bool: True if the year of the course UID is frozen, False otherwise.
+        """
+
+        year = uid[: 2 + (len(uid) == 9)]
+        return year.isdecimal() and int(year) in self.FROZEN_YEARS
+
+    @cached(LookupCache("get_course_by_uid"))
+    @singleflight("get_course_by_uid")
+    async def get_course_by_uid(self, uid: str) -> Optional[Course]:
         """
         Asynchronously retrieves a course by UID from the specified URL and returns a Course object if found, otherwise returns None.
 
@@ -149,7 +101,8 @@ class CourseRequest:
             uid (str): The unique identifier for the course.
 
         Returns:
-            Course: The Course object if found, otherwise throws an exception.
+            Course | None: The Course object if found, otherwise None. Throws an exception
+                if the upstream fails.
         """
 
         url = self.__base_url + self.__COURSE_QUERY_URL
@@ -168,21 +121,16 @@ class CourseRequest:
         }
 
         try:
-            async with AsyncClient(headers={"User-Agent": self.__UA.random}) as client:
-                res = await client.get(url, params=params)
-                soup = Bs4(res.text, "lxml")
-
-            if table := soup.find("table"):
-                course_infos = table.find("tbody").find("tr")
-                course_field = course_infos.find_all("td")
-
-                title, detail_url, note, location = prase_title_field(course_field[7])
-                teachers, teachers_url = prase_teacher_field(course_field[8])
-                times, locations = prase_time_location_filed(course_field[13])
-
-                if location:
-                    locations.append(location)
-
+            res = await HTTP_CLIENTS.get_client(url).get(
+                url, params=params, headers={"User-Agent": self.__UA.random}
+            )
+            # Only a page that loaded may tell a missing row, which is negative cached
+            res.raise_for_status()
+            with TRACER.span("html", bytes=len(res.content)):
+                row = await PARSER.parse(parse_course, res.content, res.encoding)
+
+            if row:
+                title, detail_url, note, teachers, teachers_url, times, locations = row
                 c = Course(
                     year=int(year),
                     term=int(term),
@@ -200,10 +148,65 @@ class CourseRequest:
 
                 return c
 
-        except HTTPError:
+        except HTTPError as exc:
             self.__base_url = ""
+            raise ValueError("An error occurred while fetching the course.") from exc
+
+        return None
+
+    async def iter_simple_courses(
+        self,
+        url: str,
+        params: dict[str, str],
+        headers: dict[str, str],
+    ) -> AsyncIterator[SimpleCourseRow]:
+        """
+        Asynchronously iterates the courses listed on a course query page. In streaming
+        mode each course is parsed as soon as its row arrives, otherwise once the
+        whole page has arrived.
 
-        raise ValueError("Course not found.")
+        Args:
+            url (str): The URL of the course query.
+            params (dict[str, str]): The parameters of the course query.
+            headers (dict[str, str]): The headers of the request.
+
+        Yields:
+            SimpleCourseRow: The term, no, title, teachers and times of each course, or
+                throws an exception if the request fails.
+        """
+
+        client = HTTP_CLIENTS.get_client(url)
+        if not self.__streaming:
+            res = await client.get(
+                url, params=params, headers=headers, timeout=Timeout(60)
+            )
+            res.raise_for_status()
+            with TRACER.span("html", bytes=len(res.content)):
+                rows = await PARSER.parse(
+                    parse_simple_courses, res.content, res.encoding
+                )
+
+            for row in rows:
+                yield row
+
+            return
+
+        async with client.stream(
+            "GET", url, params=params, headers=headers, timeout=Timeout(60)
+        ) as res:
+            res.raise_for_status()
+            stream = await PARSER.feed(SimpleCourseStream, res.encoding)
+            # Large chunks save round trips to the feeder thread
+            async for chunk in res.aiter_bytes(self.__CHUNK_SIZE):
+                # No span is held across a yield, so each chunk gets its own
+                with TRACER.span("html", bytes=len(chunk)):
+                    rows = await PARSER.feed(stream.feed, chunk)
+
+                for row in rows:
+                    yield row
+
+            for row in await PARSER.feed(stream.close):
+                yield row
 
     async def get_simple_courses_by_year(
         self,
@@ -228,44 +231,40 @@ class CourseRequest:
             "seq2": "M",
         }
 
+        headers = {
+            "User-Agent": self.__UA.random,
+        }
+
         try:
-            async with AsyncClient(
-                timeout=Timeout(60),
-                headers={"User-Agent": self.__UA.random},
-            ) as client:
-                for code in ALL_EDU_CODE:
-                    params["courseno"] = code
-
-                    res = await client.get(url, params=params)
-                    soup = Bs4(res.text, "lxml")
-
-                    if table := soup.find("table"):
-                        for course_info in table.find("tbody").find_all("tr"):
-                            course_field = course_info.find_all("td")
-
-                            term = int(course_field[2].text)
-                            no = course_field[3].text
-                            title = prase_title_field(course_field[7])[0]
-                            teachers = prase_teacher_field(course_field[8])[0]
-                            times = prase_time_location_filed(course_field[13])[0]
-
-                            sc = SimpleCourse(
-                                year=year,
-                                term=term,
-                                no=no,
-                                title=title,
-                                teachers=teachers,
-                                times=times,
-                            )
-
-                            self.COURSE_DICT[sc.uid] = sc
-                            courses[sc.uid] = sc
+            for code in ALL_EDU_CODE:
+                params["courseno"] = code
+
+                async for term, no, title, teachers, times in self.iter_simple_courses(
+                    url, params, headers
+                ):
+                    sc = SimpleCourse(
+                        year=year,
+                        term=term,
+                        no=no,
+                        title=title,
+                        teachers=teachers,
+                        times=times,
+                    )
+
+                    self.COURSE_DICT[sc.uid] = sc
+                    courses[sc.uid] = sc
 
         except HTTPError as exc:
             self.__base_url = ""
             raise ValueError("An error occurred while fetching courses.") from exc
 
+        # Closed years never change, so a fully fetched year is never fetched again.
+        # An empty one may be an error page, so it is fetched again next time.
+        if courses and year < academic_year():
+            self.FROZEN_YEARS.add(year)
+
         return courses
 
 
 COURSE_REQUEST = CourseRequest()
+DICT_ENTRIES.labels("course").set_function(lambda: len(COURSE_REQUEST.COURSE_DICT))
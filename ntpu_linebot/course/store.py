@@ -0,0 +1,193 @@
+# -*- coding:utf-8 -*-
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping, ValuesView
+from heapq import nsmallest
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from .course import SimpleCourse
+from .index import CourseIndex
+
+# Descending year, then term and course number
+RankKey = tuple[int, int, str]
+
+
+class CourseStore(MutableMapping[str, SimpleCourse]):
+    """
+    Mapping of course UIDs to courses, indexing the titles and teachers of the courses
+    as they are added, so a search costs about the size of its result instead of a scan
+    over every course.
+
+    Each course gets its rank key when added, and the UIDs are kept in rank order. New
+    UIDs wait in a short list until a search needs the order, then are inserted in place,
+    or sorted in at once after a bulk load. The searches return the first courses by rank
+    without sorting every match.
+    """
+
+    # Inserting moves the UIDs after the insertion point, beyond this share of new UIDs
+    # a single sort of the whole order is faster
+    __INSERT_RATIO = 16
+
+    def __init__(self) -> None:
+        self.__courses: dict[str, SimpleCourse] = {}
+        self.__ranks: dict[str, RankKey] = {}
+        self.__order: list[str] = []
+        self.__pending: list[str] = []
+        self.__index = CourseIndex()
+
+    @staticmethod
+    def rank(course: SimpleCourse) -> RankKey:
+        """
+        Get the rank key of a course, newest year first, then by term and course number.
+
+        Args:
+            course (SimpleCourse): The course.
+
+        Returns:
+            RankKey: The rank key of the course.
+        """
+
+        return -course.year, course.term, course.no
+
+    def __getitem__(self, uid: str) -> SimpleCourse:
+        return self.__courses[uid]
+
+    def __contains__(self, uid: object) -> bool:
+        return uid in self.__courses
+
+    def __setitem__(self, uid: str, course: SimpleCourse) -> None:
+        old = self.__courses.get(uid)
+        self.__courses[uid] = course
+
+        if old is None:
+            self.__ranks[uid] = self.rank(course)
+            self.__pending.append(uid)
+
+        # The details of a course replace it with the same title and teachers
+        elif old.title == course.title and old.teachers == course.teachers:
+            return
+
+        if old is not None:
+            self.__index.discard(uid, old.title, old.teachers)
+
+        self.__index.add(uid, course.title, course.teachers)
+
+    def __delitem__(self, uid: str) -> None:
+        course = self.__courses.pop(uid)
+        rank = self.__ranks[uid]
+        row = bisect_left(self.__order, rank, key=self.__ranks.__getitem__)
+        if row < len(self.__order) and self.__order[row] == uid:
+            del self.__order[row]
+        else:
+            self.__pending.remove(uid)
+
+        del self.__ranks[uid]
+        self.__index.discard(uid, course.title, course.teachers)
+
+    def __len__(self) -> int:
+        return len(self.__courses)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__courses)
+
+    def get(  # type: ignore[override]
+        self, uid: str, default: Optional[SimpleCourse] = None
+    ) -> Optional[SimpleCourse]:
+        """Get a course by UID, or the default if there is none, without a KeyError."""
+        return self.__courses.get(uid, default)
+
+    def values(self) -> ValuesView[SimpleCourse]:
+        """A view of the courses, straight from the underlying dict."""
+        return self.__courses.values()
+
+    def __ordered(self) -> list[str]:
+        """The UIDs in rank order, with the new UIDs merged in."""
+
+        pending, order, key = self.__pending, self.__order, self.__ranks.__getitem__
+        if len(pending) * self.__INSERT_RATIO < len(order):
+            for uid in pending:
+                insort(order, uid, key=key)
+
+        # The order is one sorted run already, which the sort merges the new UIDs into
+        elif pending:
+            order += pending
+            order.sort(key=key)
+
+        pending.clear()
+        return order
+
+    def __top(self, uids: Iterable[str], limit: int) -> list[SimpleCourse]:
+        """The courses of the first UIDs by rank."""
+
+        return [
+            self.__courses[uid]
+            for uid in nsmallest(limit, uids, key=self.__ranks.__getitem__)
+        ]
+
+    def search_no(self, criteria: str, limit: int) -> list[SimpleCourse]:
+        """
+        Search the courses whose course numbers contain the criteria, stopping at the
+        limit.
+
+        Args:
+            criteria (str): The (partial) course number.
+            limit (int): The maximum number of courses to return.
+
+        Returns:
+            list[SimpleCourse]: The first matching courses by rank.
+        """
+
+        ranks = self.__ranks
+        uids = (uid for uid in self.__ordered() if criteria in ranks[uid][2])
+        return [self.__courses[uid] for uid in islice(uids, limit)]
+
+    def search_title(self, criteria: str, limit: int) -> list[SimpleCourse]:
+        """
+        Search the courses whose titles contain every character of the criteria,
+        ignoring the case.
+
+        Args:
+            criteria (str): The (partial) title.
+            limit (int): The maximum number of courses to return.
+
+        Returns:
+            list[SimpleCourse]: The first matching courses by rank.
+        """
+
+        if not criteria:
+            return [self.__courses[uid] for uid in self.__ordered()[:limit]]
+
+        return self.__top(self.__index.titles(criteria), limit)
+
+    def search_teacher(self, criteria: str, limit: int) -> list[SimpleCourse]:
+        """
+        Search the courses with a teacher whose name contains every character of the
+        criteria, ignoring the case.
+
+        Args:
+            criteria (str): The (partial) teacher name.
+            limit (int): The maximum number of courses to return.
+
+        Returns:
+            list[SimpleCourse]: The first matching courses by rank.
+        """
+
+        if not criteria:
+            courses = (self.__courses[uid] for uid in self.__ordered())
+            return list(islice((c for c in courses if c.teachers), limit))
+
+        return self.__top(self.__index.teachers(criteria), limit)
+
+    def search_strict_teacher(self, name: str, limit: int) -> list[SimpleCourse]:
+        """
+        Search the courses of a teacher by the exact name.
+
+        Args:
+            name (str): The name of the teacher.
+            limit (int): The maximum number of courses to return.
+
+        Returns:
+            list[SimpleCourse]: The first courses of the teacher by rank.
+        """
+
+        return self.__top(self.__index.teacher(name), limit)
@@ -3,9 +3,11 @@ import random
 from asyncio import sleep
 from datetime import datetime
 from enum import Enum, auto, unique
+from typing import Optional
 
 from sanic import Sanic
 
+from ..metrics_util import CRAWL_DONE, CRAWL_TOTAL
 from .course import Course, SimpleCourse
 from .request import COURSE_REQUEST
 
@@ -35,25 +37,61 @@ async def healthz(app: Sanic, force: bool = False) -> bool:
 
 
 async def load_course_dict() -> None:
-    """Updates the course dict for each year."""
+    """Updates the course dict for each year, skipping the closed years already loaded."""
 
     cur_year = datetime.now().year - 1911
+
+    done = CRAWL_DONE.labels("course")
+    done.set(0)
+    CRAWL_TOTAL.labels("course").set(5)
+
     for year in range(cur_year, cur_year - 5, -1):
-        await sleep(random.uniform(15, 25))
-        await COURSE_REQUEST.get_simple_courses_by_year(year)
+        if year not in COURSE_REQUEST.FROZEN_YEARS:
+            await sleep(random.uniform(15, 25))
+            await COURSE_REQUEST.get_simple_courses_by_year(year)
+
+        done.inc()
+
 
+def is_course_uid_local(uid: str) -> bool:
+    """
+    Check whether a course UID lookup is answered without any upstream request.
+
+    Args:
+        uid (str): The unique identifier of the course.
 
-async def search_course_by_uid(uid: str) -> Course:
+    Returns:
+        bool: True if the course dict holds the course details or knows that the
+            course does not exist.
+    """
+
+    course = COURSE_REQUEST.COURSE_DICT.get(uid.upper())
+    return isinstance(course, Course) or (
+        course is None and COURSE_REQUEST.is_frozen(uid)
+    )
+
+
+async def search_course_by_uid(uid: str) -> Optional[Course]:
     """
     Asynchronously searches for course by UID.
+    The course dict is checked first, then the lookup caches, then the upstream.
 
     Args:
         uid (str): The unique identifier of the course to search for.
 
     Returns:
-        Course: The course corresponding to the given UID.
+        Course | None: The course corresponding to the given UID, or None if not found.
     """
 
+    uid = uid.upper()
+    course = COURSE_REQUEST.COURSE_DICT.get(uid)
+    if isinstance(course, Course):
+        return course
+
+    # Every course of a frozen year is in the course dict, only without the details
+    if course is None and COURSE_REQUEST.is_frozen(uid):
+        return None
+
     return await COURSE_REQUEST.get_course_by_uid(uid)
 
 
@@ -82,41 +120,23 @@ def search_simple_courses_by_criteria_and_kind(
         limit (int, optional): The maximum number of results to return. Defaults to 30.
 
     Returns:
-        list[SimpleCourse]: A list of courses matching the criteria, up to the specified limit.
+        list[SimpleCourse]: A list of courses matching the criteria, up to the specified limit,
+            newest year first, then by term and course number.
     """
 
-    criteria_set = set(criteria.lower())
+    store = COURSE_REQUEST.COURSE_DICT
     match kind:
         case SearchKind.NO:
-            courses = [
-                course
-                for course in COURSE_REQUEST.COURSE_DICT.values()
-                if criteria in course.no
-            ]
+            return store.search_no(criteria, limit)
 
         case SearchKind.TITLE:
-            courses = [
-                course
-                for course in COURSE_REQUEST.COURSE_DICT.values()
-                if criteria_set.issubset(course.title.lower())
-            ]
+            return store.search_title(criteria, limit)
 
         case SearchKind.TEACHER:
-            courses = [
-                course
-                for course in COURSE_REQUEST.COURSE_DICT.values()
-                for teacher in course.teachers
-                if criteria_set.issubset(teacher.lower())
-            ]
+            return store.search_teacher(criteria, limit)
 
         case SearchKind.STRICT_TEACHER:
-            courses = [
-                course
-                for course in COURSE_REQUEST.COURSE_DICT.values()
-                if criteria in course.teachers
-            ]
+            return store.search_strict_teacher(criteria, limit)
 
         case _:
             raise ValueError("Invalid SearchArgument")
-
-    return sorted(courses, key=lambda c: (-c.year, c.term, c.no))[:limit]
@@ -0,0 +1,137 @@
+# -*- coding:utf-8 -*-
+from asyncio import TaskGroup, sleep
+from contextvars import ContextVar
+from os import getenv
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+from sanic.log import logger
+
+from .metrics_util import CRAWL_DONE, CRAWL_TOTAL, METRICS
+
+Job = Callable[[], Awaitable[Any]]
+
+CRAWL_RATE = METRICS.gauge(
+    "ntpu_crawl_requests_per_second",
+    "Current request rate budget of the crawlers of an upstream service",
+    ["service"],
+)
+
+
+class RateLimiter:
+    """
+    Requests per second budget of an upstream service, adapting to its latency.
+
+    Requests are paced evenly at the current rate. A fast, successful response adds a
+    small step to the rate, a slow or failed one halves it (AIMD), at most once per
+    round trip so a burst of slow responses only counts once.
+    """
+
+    __max_rps = float(getenv("CRAWL_MAX_RPS", "1"))
+    __target_latency = float(getenv("CRAWL_TARGET_LATENCY", "1"))
+
+    def __init__(self, service: str) -> None:
+        # Start at half the budget and move in steps of a twentieth of it
+        self.rate = self.__max_rps / 2
+        self.__last_slot = 0.0
+        self.__backoff_at = 0.0
+        CRAWL_RATE.labels(service).set_function(lambda: self.rate)
+
+    async def acquire(self) -> None:
+        """Wait for the next request slot, spaced at the current rate."""
+
+        now = perf_counter()
+        slot = self.__last_slot = max(now, self.__last_slot + 1 / self.rate)
+
+        if slot > now:
+            await sleep(slot - now)
+
+    def observe(self, sent_at: float, ok: bool) -> None:
+        """
+        Adapt the rate to the outcome of a request.
+
+        Args:
+            sent_at (float): The perf_counter() value when the request was sent.
+            ok (bool): Whether the request succeeded without a 429 or 5xx status.
+        """
+
+        if ok and perf_counter() - sent_at <= self.__target_latency:
+            self.rate = min(self.rate + self.__max_rps / 20, self.__max_rps)
+
+        elif sent_at >= self.__backoff_at:
+            self.rate = max(self.rate / 2, self.__max_rps / 20)
+            self.__backoff_at = perf_counter()
+
+
+class CrawlUtil:
+    __concurrency = int(getenv("CRAWL_CONCURRENCY", "2"))
+
+    def __init__(self) -> None:
+        self.__limiters: dict[str, RateLimiter] = {}
+        self.__limiter_var: ContextVar[Optional[RateLimiter]] = ContextVar(
+            "crawl_limiter", default=None
+        )
+
+    @property
+    def limiter(self) -> Optional[RateLimiter]:
+        """The rate limiter of the crawl running in the current context, if any."""
+
+        return self.__limiter_var.get()
+
+    def get_limiter(self, service: str) -> RateLimiter:
+        """
+        Get the rate limiter shared by the crawlers of an upstream service.
+
+        Args:
+            service (str): The name of the upstream service.
+
+        Returns:
+            RateLimiter: The rate limiter.
+        """
+
+        if (limiter := self.__limiters.get(service)) is None:
+            limiter = self.__limiters[service] = RateLimiter(service)
+
+        return limiter
+
+    async def run(self, crawler: str, service: str, jobs: Sequence[Job]) -> None:
+        """
+        Run the jobs of a crawl with a few workers, pacing every upstream request they
+        make with the rate limiter of the service. The first failing job stops the crawl.
+
+        Args:
+            crawler (str): The name of the crawl, for the progress metrics.
+            service (str): The name of the upstream service the jobs request.
+            jobs (Sequence[Job]): The async functions to run, in order.
+        """
+
+        done = CRAWL_DONE.labels(crawler)
+        done.set(0)
+        CRAWL_TOTAL.labels(crawler).set(len(jobs))
+
+        limiter = self.get_limiter(service)
+        pending = iter(jobs)
+        start = perf_counter()
+
+        async def work() -> None:
+            self.__limiter_var.set(limiter)
+            for job in pending:
+                await job()
+                done.inc()
+
+        logger.info(f"Crawl {crawler}: {len(jobs)} jobs")
+        try:
+            async with TaskGroup() as group:
+                for _ in range(min(self.__concurrency, len(jobs))):
+                    group.create_task(work())
+
+        except* Exception as exc:
+            logger.warning(
+                f"Crawl {crawler}: stopped after {done.get():.0f} jobs: {exc.exceptions[0]}"
+            )
+
+        else:
+            logger.info(f"Crawl {crawler}: done in {perf_counter() - start:.0f}s")
+
+
+CRAWLER = CrawlUtil()
@@ -0,0 +1,99 @@
+# -*- coding:utf-8 -*-
+from array import array
+from os import getenv
+from time import monotonic
+from typing import Optional
+
+from .metrics_util import METRICS
+
+
+class EventDedupUtil:
+    __size = int(getenv("EVENT_DEDUP_SIZE", "4096"))
+    __ttl = float(getenv("EVENT_DEDUP_TTL", "600"))
+
+    def __init__(self) -> None:
+        # Fixed-size ring of (received time, event ID) plus a set for O(1) lookups
+        self.__ids: list[Optional[str]] = [None] * self.__size
+        self.__times = array("d", [0.0]) * self.__size
+        self.__seen = set[str]()
+        self.__head = 0
+        self.__count = 0
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self) -> int:
+        """Number of duplicate events dropped"""
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """Number of new events let through"""
+        return self.__misses
+
+    def __pop_oldest(self) -> None:
+        """Remove the oldest event ID from the ring."""
+
+        tail = (self.__head - self.__count) % self.__size
+        if (event_id := self.__ids[tail]) is not None:
+            self.__seen.discard(event_id)
+
+        self.__ids[tail] = None
+        self.__count -= 1
+
+    def __expire(self, now: float) -> None:
+        """
+        Remove the event IDs older than the time window.
+
+        Args:
+            now (float): The current monotonic time.
+        """
+
+        while self.__count:
+            tail = (self.__head - self.__count) % self.__size
+            if now - self.__times[tail] <= self.__ttl:
+                break
+
+            self.__pop_oldest()
+
+    def is_duplicate(self, event_id: str, is_redelivery: bool = True) -> bool:
+        """
+        Check whether an event was already received and record it otherwise.
+
+        Args:
+            event_id (str): The webhook event ID.
+            is_redelivery (bool, optional): Whether LINE marked the event as redelivered.
+                First deliveries are recorded without a lookup. Defaults to True.
+
+        Returns:
+            bool: True if the event is a duplicate, False otherwise.
+        """
+
+        now = monotonic()
+        self.__expire(now)
+
+        if is_redelivery and event_id in self.__seen:
+            self.__hits += 1
+            return True
+
+        self.__misses += 1
+        if event_id not in self.__seen:
+            if self.__count == self.__size:
+                self.__pop_oldest()
+
+            self.__ids[self.__head] = event_id
+            self.__times[self.__head] = now
+            self.__seen.add(event_id)
+            self.__head = (self.__head + 1) % self.__size
+            self.__count += 1
+
+        return False
+
+
+EVENT_DEDUP = EventDedupUtil()
+
+__EVENTS = METRICS.counter(
+    "ntpu_webhook_events_total", "Number of received webhook events", ["result"]
+)
+__EVENTS.labels("duplicate").set_function(lambda: EVENT_DEDUP.hits)
+__EVENTS.labels("new").set_function(lambda: EVENT_DEDUP.misses)
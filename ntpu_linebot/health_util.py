@@ -0,0 +1,126 @@
+# -*- coding:utf-8 -*-
+from asyncio import gather, sleep
+from os import getenv
+from typing import Awaitable, Callable, Optional
+
+from sanic import Sanic
+
+from .metrics_util import METRICS
+
+Probe = Callable[[Sanic], Awaitable[bool]]
+
+UPSTREAM_HEALTHY = METRICS.gauge(
+    "ntpu_upstream_healthy",
+    "Cached health status of the upstream services",
+    ["service"],
+)
+
+
+class HealthUtil:
+    __interval = float(getenv("HEALTH_CHECK_INTERVAL", "30"))
+    __fall = int(getenv("HEALTH_FALL_THRESHOLD", "3"))
+    __rise = int(getenv("HEALTH_RISE_THRESHOLD", "2"))
+
+    def __init__(self) -> None:
+        self.__probes: dict[str, Probe] = {}
+        self.__status: dict[str, bool] = {}
+        self.__streak: dict[str, int] = {}
+
+    def register(self, name: str, probe: Probe) -> None:
+        """
+        Register a health probe of an upstream service.
+
+        Args:
+            name (str): The name of the service.
+            probe (Probe): The async function to check the service with.
+        """
+
+        self.__probes[name] = probe
+        UPSTREAM_HEALTHY.labels(name).set_function(lambda: self.is_healthy(name))
+
+    def update(self, name: str, ok: bool) -> None:
+        """
+        Update the status of a service with a probe result.
+        The status only flips after enough consecutive results disagree with it.
+
+        Args:
+            name (str): The name of the service.
+            ok (bool): The result of the probe.
+        """
+
+        if name not in self.__status:
+            self.__status[name] = ok
+            self.__streak[name] = 0
+            return
+
+        if ok == self.__status[name]:
+            self.__streak[name] = 0
+            return
+
+        self.__streak[name] += 1
+        if self.__streak[name] >= (self.__rise if ok else self.__fall):
+            self.__status[name] = ok
+            self.__streak[name] = 0
+
+    def is_healthy(self, name: Optional[str] = None) -> bool:
+        """
+        Get the cached status of a service.
+
+        Args:
+            name (str, optional): The name of the service. Defaults to all services.
+
+        Returns:
+            bool: True if the service (or every service) is healthy, False otherwise.
+        """
+
+        if name is None:
+            return all(self.__status.get(n, False) for n in self.__probes)
+
+        return self.__status.get(name, False)
+
+    def is_any_healthy(self) -> bool:
+        """
+        Check whether any registered service is healthy.
+
+        Returns:
+            bool: True if at least one service is healthy, False otherwise.
+        """
+
+        return any(self.__status.get(n, False) for n in self.__probes)
+
+    async def probe(self, app: Sanic) -> bool:
+        """
+        Run every registered probe once and update the cached status.
+
+        Args:
+            app (Sanic): The Sanic application.
+
+        Returns:
+            bool: True if every service is healthy, False otherwise.
+        """
+
+        names = list(self.__probes)
+        results = await gather(
+            *(self.__probes[name](app) for name in names),
+            return_exceptions=True,
+        )
+
+        for name, result in zip(names, results):
+            self.update(name, result is True)
+
+        return self.is_healthy()
+
+    async def probe_periodically(self, app: Sanic) -> None:
+        """
+        Probe every registered service every interval.
+
+        Args:
+            app (Sanic): The Sanic application.
+        """
+
+        while True:
+            await sleep(self.__interval)
+            await self.probe(app)
+
+
+HEALTH = HealthUtil()
@@ -0,0 +1,136 @@
+# -*- coding:utf-8 -*-
+from asyncio import gather
+from os import getenv
+from time import perf_counter
+
+from httpx import (
+    URL,
+    AsyncClient,
+    AsyncHTTPTransport,
+    HTTPError,
+    Limits,
+    Request,
+    Response,
+    Timeout,
+)
+
+from .crawl_util import CRAWLER
+from .metrics_util import METRICS
+from .trace_util import TRACER
+
+UPSTREAM_LATENCY = METRICS.histogram(
+    "ntpu_upstream_request_duration_seconds",
+    "Latency of the requests to the upstream mirrors until the headers arrive",
+    ["mirror"],
+)
+UPSTREAM_ERRORS = METRICS.counter(
+    "ntpu_upstream_errors_total",
+    "Number of failed or 5xx requests to the upstream mirrors",
+    ["mirror"],
+)
+
+
+class MetricsTransport(AsyncHTTPTransport):
+    """
+    AsyncHTTPTransport recording the latency and errors of each mirror, and pacing the
+    requests of a running crawl.
+    """
+
+    async def handle_async_request(self, request: Request) -> Response:
+        mirror = f"{request.url.scheme}://{request.url.netloc.decode()}"
+        if (limiter := CRAWLER.limiter) is not None:
+            await limiter.acquire()
+
+        start = perf_counter()
+
+        with TRACER.span(
+            "upstream", method=request.method, url=str(request.url)
+        ) as span:
+            try:
+                response = await super().handle_async_request(request)
+
+            except HTTPError:
+                UPSTREAM_ERRORS.labels(mirror).inc()
+                if limiter is not None:
+                    limiter.observe(start, ok=False)
+
+                raise
+
+            finally:
+                UPSTREAM_LATENCY.labels(mirror).observe(perf_counter() - start)
+
+            span.set("status", response.status_code)
+
+        if response.status_code >= 500:
+            UPSTREAM_ERRORS.labels(mirror).inc()
+
+        if limiter is not None:
+            limiter.observe(
+                start, ok=response.status_code < 500 and response.status_code != 429
+            )
+
+        return response
+
+
+class HTTPClientUtil:
+    __max_connections = int(getenv("HTTP_MAX_CONNECTIONS", "10"))
+    __max_keepalive_connections = int(getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "5"))
+    __keepalive_expiry = float(getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    __timeout = float(getenv("HTTP_TIMEOUT", "5"))
+    __http2 = getenv("HTTP_HTTP2", "true").lower() == "true"
+
+    def __init__(self) -> None:
+        self.__clients: dict[str, AsyncClient] = {}
+
+    @staticmethod
+    def origin(url: str) -> str:
+        """
+        Get the origin (scheme, host and port) of a URL.
+
+        Args:
+            url (str): The URL.
+
+        Returns:
+            str: The origin of the URL.
+        """
+
+        u = URL(url)
+        return f"{u.scheme}://{u.netloc.decode()}"
+
+    def get_client(self, url: str) -> AsyncClient:
+        """
+        Get the long-lived pooled client for the origin of a URL.
+
+        Args:
+            url (str): Any URL on the upstream host.
+
+        Returns:
+            AsyncClient: The client shared by every request to that host.
+        """
+
+        origin = self.origin(url)
+        if (client := self.__clients.get(origin)) is None or client.is_closed:
+            client = AsyncClient(
+                transport=MetricsTransport(
+                    http2=self.__http2,
+                    limits=Limits(
+                        max_connections=self.__max_connections,
+                        max_keepalive_connections=self.__max_keepalive_connections,
+                        keepalive_expiry=self.__keepalive_expiry,
+                    ),
+                ),
+                timeout=Timeout(self.__timeout),
+            )
+            self.__clients[origin] = client
+
+        return client
+
+    async def aclose(self) -> None:
+        """Close every pooled client."""
+
+        clients = list(self.__clients.values())
+        self.__clients.clear()
+        await gather(*(client.aclose() for client in clients))
+
+
+HTTP_CLIENTS = HTTPClientUtil()
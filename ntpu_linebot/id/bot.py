@@ -20,7 +20,8 @@ from linebot.v3.messaging.models import (
 )
 
 from ..abs_bot import Bot
-from ..line_bot_util import EMPTY_POSTBACK_ACTION, get_sender
+from ..health_util import HEALTH
+from ..line_bot_util import EMPTY_POSTBACK_ACTION, get_sender, service_unavailable
 from ..normal_util import list_to_regex, partition
 from .util import (
     DEPARTMENT_CODE,
@@ -28,10 +29,13 @@ from .util import (
     FULL_DEPARTMENT_CODE,
     FULL_DEPARTMENT_NAME,
     Order,
+    is_department_local,
+    is_student_uid_local,
     search_student_by_uid,
     search_students_by_name,
     search_students_by_year_and_department,
     student_info_format,
+    student_list_format,
 )
 
 
@@ -93,6 +97,38 @@ class IDBot(Bot):
         "電機資訊學院",
     ]
 
+    @property
+    def keywords(self) -> list[str]:
+        """Leading keywords of the text messages handled by the bot"""
+
+        return [
+            *self.__VALID_DEPARTMENT_STR,
+            *self.__VALID_DEPARTMENT_CODE_STR,
+            *self.__VALID_YEAR_STR,
+            *self.__VALID_STUDENT_STR,
+            self.__ALL_DEPARTMENT_CODE,
+        ]
+
+    def is_local_text_message(self, payload: str) -> bool:
+        """Only student ID lookups the student store can't answer go to the upstream"""
+
+        if match := search(self.__STUDENT_REGEX, payload, IGNORECASE):
+            criteria = match.group()
+            if criteria.isdecimal() and 8 <= len(criteria) <= 9:
+                return is_student_uid_local(criteria)
+
+        return True
+
+    def is_local_postback_event(self, payload: str) -> bool:
+        """Only student listings of a department that aren't frozen go to the upstream"""
+
+        if self.split_char in payload:
+            year, department = payload.split(self.split_char)
+            if year.isdecimal() and department in DEPARTMENT_NAME:
+                return is_department_local(int(year), department)
+
+        return True
+
     async def handle_text_message(
         self,
         payload: str,
@@ -276,6 +312,9 @@ class IDBot(Bot):
             criteria = match.group()
 
             if criteria.isdecimal() and 8 <= len(criteria) <= 9:
+                if not is_student_uid_local(criteria) and not HEALTH.is_healthy("id"):
+                    return [service_unavailable(self.__SENDER_NAME, quote_token)]
+
                 if (student_info := await search_student_by_uid(criteria)) is None:
                     return [
                         TextMessage(
@@ -331,29 +370,24 @@ class IDBot(Bot):
 
                 return messages
 
-            if student_list := search_students_by_name(criteria):
-                student_list = sorted(student_list, key=lambda s: int(s[0]))[-500:]
+            student_list, total = search_students_by_name(criteria)
+            if student_list:
+                texts = [
+                    student_list_format(student_list[i * 100 : (i + 1) * 100])
+                    for i in range(0, ceil(len(student_list) / 100))
+                ]
 
-                messages: list[Message] = []
-                for i in range(0, ceil(len(student_list) / 100)):
-                    students_info = "\n".join(
-                        [
-                            student_info_format(student_id, student_name)
-                            for student_id, student_name in student_list[
-                                i * 100 : (i + 1) * 100
-                            ]
-                        ]
-                    )
+                if total > (shown := len(student_list)):
+                    texts[-1] += f"\n\n共有{total}位學生，僅顯示最相關的{shown}位"
 
-                    messages.append(
-                        TextMessage(
-                            text=students_info,
-                            sender=get_sender(self.__SENDER_NAME),
-                            quoteToken=quote_token,
-                        )
+                return [
+                    TextMessage(
+                        text=text,
+                        sender=get_sender(self.__SENDER_NAME),
+                        quoteToken=quote_token,
                     )
-
-                return messages
+                    for text in texts
+                ]
 
             return [
                 TextMessage(
@@ -464,11 +498,18 @@ class IDBot(Bot):
                     )
                 ]
 
-            if data in DEPARTMENT_NAME:
+            # The department buttons send the year before the department code
+            if data.isdecimal() and year in DEPARTMENT_NAME:
+                department_year, department = int(data), year
+                if not is_department_local(
+                    department_year, department
+                ) and not HEALTH.is_healthy("id"):
+                    return [service_unavailable(self.__SENDER_NAME)]
+
                 return [
                     TextMessage(
                         text=await search_students_by_year_and_department(
-                            int(year), data
+                            department_year, department
                         ),
                         sender=get_sender(self.__SENDER_NAME),
                     )
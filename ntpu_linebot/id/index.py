@@ -0,0 +1,117 @@
+# -*- coding:utf-8 -*-
+from array import array
+
+
+class StudentNameIndex:
+    """
+    Inverted index from the characters of the student names to integer keys.
+
+    The names are also indexed by their first character and length, so that the names
+    starting with a given one can be found without reading them.
+    """
+
+    def __init__(self) -> None:
+        self.__postings: dict[str, array] = {}
+        self.__heads: dict[tuple[str, int], array] = {}
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sum(
+            posting.__sizeof__()
+            for postings in (self.__postings, self.__heads)
+            for posting in postings.values()
+        )
+
+    def add(self, key: int, name: str) -> None:
+        """
+        Add a name to the index.
+
+        Args:
+            key (int): The key of the name, e.g. a row or a packed student ID.
+            name (str): The name.
+        """
+
+        for char in set(name):
+            if (posting := self.__postings.get(char)) is None:
+                posting = self.__postings[char] = array("I")
+
+            posting.append(key)
+
+        if (posting := self.__heads.get(head := (name[:1], len(name)))) is None:
+            posting = self.__heads[head] = array("I")
+
+        posting.append(key)
+
+    def discard(self, key: int, name: str) -> None:
+        """
+        Remove a name from the index.
+
+        Args:
+            key (int): The key the name was added with.
+            name (str): The name.
+        """
+
+        for char in set(name):
+            if (posting := self.__postings.get(char)) is not None and key in posting:
+                posting.remove(key)
+
+        posting = self.__heads.get((name[:1], len(name)))
+        if posting is not None and key in posting:
+            posting.remove(key)
+
+    def remap(self, keys: array) -> None:
+        """
+        Replace every key with a new one, e.g. when rows move.
+
+        Args:
+            keys (array): The new key of each old key.
+        """
+
+        for postings in (self.__postings, self.__heads):
+            for term, posting in postings.items():
+                postings[term] = array("I", map(keys.__getitem__, posting))
+
+    def candidates(self, name: str) -> set[int]:
+        """
+        Get the keys whose names contain every character of the given name.
+
+        Args:
+            name (str): The (partial) name to search for, with at least one character.
+
+        Returns:
+            set[int]: The matching keys.
+        """
+
+        postings: list[array] = []
+        for char in set(name):
+            if (posting := self.__postings.get(char)) is None:
+                return set()
+
+            postings.append(posting)
+
+        # Intersect from the rarest character, so the candidate set only shrinks
+        postings.sort(key=len)
+        return set(postings[0]).intersection(*postings[1:])
+
+    def heads(self, name: str, exact: bool = False) -> set[int]:
+        """
+        Get the keys whose names may start with the given name, as they start with its
+        first character and are at least as long.
+
+        Args:
+            name (str): The (partial) name, with at least one character.
+            exact (bool, optional): Whether to only get the names of the same length.
+                Defaults to False.
+
+        Returns:
+            set[int]: The matching keys.
+        """
+
+        if exact:
+            return set(self.__heads.get((name[0], len(name)), ()))
+
+        keys: set[int] = set()
+        for (char, length), posting in self.__heads.items():
+            if char == name[0] and length >= len(name):
+                keys.update(posting)
+
+        return keys
@@ -0,0 +1,35 @@
+# -*- coding:utf-8 -*-
+from lxml.etree import HTML, XPath
+
+__STUDENTS = XPath(
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' bloglistTitle ')]"
+    "/descendant::a[1]"
+)
+__PAGER_ITEMS = XPath(
+    "count(//span[contains(concat(' ', normalize-space(@class), ' '), ' item ')])"
+)
+__TEXT = XPath("string()")
+
+
+def parse_students(content: bytes, encoding: str) -> tuple[list[tuple[str, str]], int]:
+    """
+    Parse the students listed on a student search page.
+
+    Args:
+        content (bytes): The page.
+        encoding (str): The encoding of the page.
+
+    Returns:
+        tuple[list[tuple[str, str]], int]: The (ID, name) of the students, and the
+            number of pages of the search.
+    """
+
+    if (root := HTML(content.decode(encoding, "replace"))) is None:
+        return [], 0
+
+    students = [
+        (link.get("href").split("/")[-1], __TEXT(link)) for link in __STUDENTS(root)
+    ]
+
+    # The last pager item is the "next page" link
+    return students, max(int(__PAGER_ITEMS(root)) - 1, 0)
@@ -1,23 +1,55 @@
 # -*- coding:utf-8 -*-
-from typing import Optional
+from asyncio import Semaphore, TaskGroup
+from itertools import chain
+from os import getenv
+from typing import Iterable, Optional
 
-from httpx import AsyncClient, HTTPError
 from asyncache import cached
-from bs4 import BeautifulSoup as Bs4
-from cachetools import TTLCache
 from fake_useragent import UserAgent
+from httpx import HTTPError
+
+from ..http_util import HTTP_CLIENTS
+from ..metrics_util import DICT_ENTRIES, LookupCache, MetricsTTLCache
+from ..normal_util import academic_year
+from ..parse_util import PARSER
+from ..singleflight_util import singleflight
+from ..trace_util import TRACER
+from .parser import parse_students
+from .store import StudentStore
 
 
 class IDRequest:
     __base_url = ""
-    __URLS = [
-        "http://120.126.197.52",
-        "https://120.126.197.52",
-        "https://lms.ntpu.edu.tw",
-    ]
+    __URLS = getenv(
+        "NTPU_LMS_URLS",
+        "http://120.126.197.52,https://120.126.197.52,https://lms.ntpu.edu.tw",
+    ).split(",")
     __STUDENT_SEARCH_URL = "/portfolio/search.php"
     __UA = UserAgent(min_percentage=0.01)
-    STUDENT_DICT = dict[str, str]()
+    __page_concurrency = int(getenv("STUDENT_PAGE_CONCURRENCY", "8"))
+    STUDENT_DICT = StudentStore()
+    FROZEN_KEYWORDS = set[str]()
+
+    def add_student(self, uid: str, name: str) -> None:
+        """
+        Add a student to the student store.
+
+        Args:
+            uid (str): The ID of the student.
+            name (str): The name of the student.
+        """
+
+        self.STUDENT_DICT[uid] = name
+
+    def add_students(self, students: Iterable[tuple[str, str]]) -> None:
+        """
+        Add many students to the student store at once.
+
+        Args:
+            students (Iterable[tuple[str, str]]): The (ID, name) of the students.
+        """
+
+        self.STUDENT_DICT.update_many(students)
 
     async def check_url(self, url: Optional[str] = None) -> bool:
         """
@@ -37,8 +69,9 @@ class IDRequest:
             return False
 
         try:
-            async with AsyncClient(headers={"User-Agent": self.__UA.random}) as client:
-                await client.head(url)
+            await HTTP_CLIENTS.get_client(url).head(
+                url, headers={"User-Agent": self.__UA.random}
+            )
 
         except HTTPError:
             return False
@@ -59,8 +92,24 @@ class IDRequest:
         self.__base_url = ""
         return False
 
-    @cached(TTLCache(maxsize=9, ttl=60 * 60 * 24 * 7))
-    async def get_student_by_uid(self, uid: str) -> str:
+    def is_frozen(self, uid: str) -> bool:
+        """
+        Check whether the listing a student ID belongs to is frozen, so the student
+        store holds every student of it.
+
+        Args:
+            uid (str): The student ID.
+
+        Returns:
+            bool: True if the listing of the student ID is frozen, False otherwise.
+        """
+
+        # Keywords are "4" + year + department code, which is 5 to 7 characters long
+        return any(uid[:n] in self.FROZEN_KEYWORDS for n in range(5, 8))
+
+    @cached(LookupCache("get_student_by_uid"))
+    @singleflight("get_student_by_uid")
+    async def get_student_by_uid(self, uid: str) -> Optional[str]:
         """
         Asynchronously gets a student by their ID.
 
@@ -68,7 +117,8 @@ class IDRequest:
             uid (str): The unique ID of the student.
 
         Returns:
-            str: The name of the student, if found. Otherwise, throws an exception.
+            str | None: The name of the student, or None if not found. Throws an exception
+                if the upstream fails.
         """
 
         url = self.__base_url + self.__STUDENT_SEARCH_URL
@@ -80,21 +130,33 @@ class IDRequest:
         }
 
         try:
-            async with AsyncClient(headers={"User-Agent": self.__UA.random}) as client:
-                res = await client.get(url, params=params)
-                soup = Bs4(res.text, "lxml")
-
-            if student := soup.find("div", {"class": "bloglistTitle"}):
-                name = student.find("a").text
-                self.STUDENT_DICT[uid] = name
-                return name
+            res = await HTTP_CLIENTS.get_client(url).get(
+                url, params=params, headers={"User-Agent": self.__UA.random}
+            )
+            # Only a page that loaded may tell a missing row, which is negative cached
+            res.raise_for_status()
+            with TRACER.span("html", bytes=len(res.content)):
+                students, _ = await PARSER.parse(
+                    parse_students, res.content, res.encoding
+                )
 
-        except HTTPError:
+        except HTTPError as exc:
             self.__base_url = ""
+            raise ValueError("An error occurred while fetching the student.") from exc
 
-        raise ValueError("Student not found.")
+        if students:
+            name = students[0][1]
+            self.add_student(uid, name)
+            return name
 
-    @cached(TTLCache(maxsize=9, ttl=60 * 60 * 24 * 7))
+        return None
+
+    @cached(
+        MetricsTTLCache(
+            "get_students_by_year_and_department", maxsize=9, ttl=60 * 60 * 24 * 7
+        )
+    )
+    @singleflight("get_students_by_year_and_department")
     async def get_students_by_year_and_department(
         self,
         year: int,
@@ -122,28 +184,48 @@ class IDRequest:
             "User-Agent": self.__UA.random,
         }
 
+        client = HTTP_CLIENTS.get_client(url)
+        semaphore = Semaphore(self.__page_concurrency)
+
+        async def get_page(page: int) -> list[tuple[str, str]]:
+            async with semaphore:
+                res = await client.get(
+                    url, params=params | {"page": str(page)}, headers=headers
+                )
+
+            res.raise_for_status()
+            with TRACER.span("html", bytes=len(res.content)):
+                students, _ = await PARSER.parse(
+                    parse_students, res.content, res.encoding
+                )
+                return students
+
         try:
-            async with AsyncClient(headers={"User-Agent": self.__UA.random}) as client:
-                res = await client.get(url, params=params)
-                data = Bs4(res.text, "lxml")
-                pages = len(data.find_all("span", {"class": "item"}))
-
-                for i in range(1, pages):
-                    params["page"] = str(i)
-                    res = await client.get(url, params=params)
-                    data = Bs4(res.text, "lxml")
-
-                    for item in data.find_all("div", {"class": "bloglistTitle"}):
-                        name = item.find("a").text
-                        number = item.find("a").get("href").split("/")[-1]
-                        self.STUDENT_DICT[number] = name
-                        students[number] = name
+            res = await client.get(url, params=params, headers=headers)
+            res.raise_for_status()
+            with TRACER.span("html", bytes=len(res.content)):
+                first_page, pages = await PARSER.parse(
+                    parse_students, res.content, res.encoding
+                )
 
-        except HTTPError as exc:
+            async with TaskGroup() as group:
+                tasks = [group.create_task(get_page(i)) for i in range(2, pages + 1)]
+
+        except* HTTPError as exc:
             self.__base_url = ""
             raise ValueError("An error occurred while fetching students.") from exc
 
+        for uid, name in chain(first_page, *(task.result() for task in tasks)):
+            self.add_student(uid, name)
+            students[uid] = name
+
+        # Past years never change, so a fully fetched listing is never fetched again.
+        # An empty one may be an error page, so it is fetched again next time.
+        if students and year < academic_year():
+            self.FROZEN_KEYWORDS.add(params["fmKeyword"])
+
         return students
 
 
 ID_REQUEST = IDRequest()
+DICT_ENTRIES.labels("student").set_function(lambda: len(ID_REQUEST.STUDENT_DICT))
@@ -0,0 +1,381 @@
+# -*- coding:utf-8 -*-
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
+from heapq import nlargest
+from os import getenv
+from typing import Iterable, Iterator, Optional
+
+from sanic.log import logger
+
+from .index import StudentNameIndex
+
+MAX_UID_LENGTH = 9
+
+
+class StudentStore(MutableMapping[str, str]):
+    """
+    Compact mapping of student IDs to names.
+
+    The IDs are packed as integers in a sorted array and the names are UTF-8 encoded
+    back to back in one byte arena, so a student costs about a dozen bytes instead of
+    three Python objects and a dict slot. New students wait in a small dict until they
+    are merged into the arrays in bulk, which also moves the rows in the name index.
+    """
+
+    __compact_threshold = int(getenv("STUDENT_STORE_PENDING", "1024"))
+
+    def __init__(self) -> None:
+        self.__ids = array("I")
+        self.__offsets = array("I", [0])
+        self.__arena = bytearray()
+        self.__pending: dict[int, str] = {}
+        self.__index = StudentNameIndex()
+        self.__pending_index = StudentNameIndex()
+        self.__runs: Optional[list[tuple[int, int]]] = None
+
+    @staticmethod
+    def pack(uid: str) -> Optional[int]:
+        """
+        Pack a student ID into an integer.
+
+        Args:
+            uid (str): The student ID.
+
+        Returns:
+            int | None: The packed ID, or None if the ID can't be a student ID.
+        """
+
+        if not uid.isdecimal() or not 0 < len(uid) <= MAX_UID_LENGTH or uid[0] == "0":
+            return None
+
+        return int(uid)
+
+    def __name_at(self, row: int) -> str:
+        """Decode the name at a row of the arrays."""
+
+        return self.__arena[self.__offsets[row] : self.__offsets[row + 1]].decode()
+
+    def __in_rows(self, uid: int) -> bool:
+        """Check whether a packed ID is in the sorted arrays."""
+
+        row = bisect_left(self.__ids, uid)
+        return row < len(self.__ids) and self.__ids[row] == uid
+
+    def __find(self, uid: int) -> Optional[str]:
+        """Find the name of a packed ID."""
+
+        if (name := self.__pending.get(uid)) is not None:
+            return name
+
+        row = bisect_left(self.__ids, uid)
+        if row < len(self.__ids) and self.__ids[row] == uid:
+            return self.__name_at(row)
+
+        return None
+
+    def __getitem__(self, uid: str) -> str:
+        if (packed := self.pack(uid)) is None or (name := self.__find(packed)) is None:
+            raise KeyError(uid)
+
+        return name
+
+    def __contains__(self, uid: object) -> bool:
+        return (
+            isinstance(uid, str)
+            and (packed := self.pack(uid)) is not None
+            and self.__find(packed) is not None
+        )
+
+    def __setitem__(self, uid: str, name: str) -> None:
+        # An odd ID from an upstream link must not stop the crawl
+        if (packed := self.pack(uid)) is None:
+            logger.warning(f"Skipped invalid student ID {uid!r}")
+            return
+
+        if self.__find(packed) == name:
+            return
+
+        self.__pending[packed] = name
+        self.__pending_index.add(packed, name)
+
+        if len(self.__pending) >= self.__compact_threshold:
+            self.compact()
+
+    def __delitem__(self, uid: str) -> None:
+        if uid not in self:
+            raise KeyError(uid)
+
+        packed = int(uid)
+        self.compact()
+        row = bisect_left(self.__ids, packed)
+        start, end = self.__offsets[row], self.__offsets[row + 1]
+        self.__index.discard(row, self.__name_at(row))
+
+        del self.__ids[row]
+        self.__runs = None
+        del self.__arena[start:end]
+        del self.__offsets[row + 1]
+        self.__offsets[row + 1 :] = array(
+            "I", map((start - end).__add__, self.__offsets[row + 1 :])
+        )
+
+        rows = array("I", range(len(self.__ids) + 1))
+        rows[row + 1 :] = array("I", range(row, len(self.__ids)))
+        self.__index.remap(rows)
+
+    def __len__(self) -> int:
+        # Counted without a merge, as the metrics scrape calls this
+        return len(self.__ids) + sum(not self.__in_rows(uid) for uid in self.__pending)
+
+    def __iter__(self) -> Iterator[str]:
+        for uid, _ in self.items():
+            yield uid
+
+    def items(self) -> Iterator[tuple[str, str]]:  # type: ignore[override]
+        """
+        Iterate over the students in ID order.
+
+        Returns:
+            Iterator[tuple[str, str]]: The (ID, name) of each student.
+        """
+
+        self.compact()
+        for row, uid in enumerate(self.__ids):
+            yield str(uid), self.__name_at(row)
+
+    def update_many(self, students: Iterable[tuple[str, str]]) -> None:
+        """
+        Add many students with a single merge.
+
+        Args:
+            students (Iterable[tuple[str, str]]): The (ID, name) of the students.
+        """
+
+        for uid, name in students:
+            if (packed := self.pack(uid)) is not None:
+                self.__pending[packed] = name
+
+        self.compact()
+
+    def compact(self) -> None:
+        """Merge the pending students into the sorted arrays."""
+
+        if not self.__pending:
+            return
+
+        pending = sorted(self.__pending.items())
+        self.__pending = {}
+        self.__pending_index = StudentNameIndex()
+
+        ids, offsets, arena = array("I"), array("I", [0]), bytearray()
+        rows = array("I")  # The new row of each old row, for the name index
+        row, size = 0, len(self.__ids)
+
+        def copy_rows(end: int) -> None:
+            nonlocal row
+            if row < end:
+                start = self.__offsets[row]
+                rows.extend(range(len(ids), len(ids) + end - row))
+                ids.extend(self.__ids[row:end])
+                arena.extend(self.__arena[start : self.__offsets[end]])
+                base = len(arena) - self.__offsets[end]
+                offsets.extend(map(base.__add__, self.__offsets[row + 1 : end + 1]))
+                row = end
+
+        added: list[tuple[int, str]] = []
+        for uid, name in pending:
+            copy_rows(bisect_left(self.__ids, uid, row, size))
+            if row < size and self.__ids[row] == uid:
+                self.__index.discard(row, self.__name_at(row))
+                rows.append(0)
+                row += 1
+
+            added.append((len(ids), name))
+            ids.append(uid)
+            arena.extend(name.encode())
+            offsets.append(len(arena))
+
+        copy_rows(size)
+        self.__ids, self.__offsets, self.__arena = ids, offsets, arena
+        self.__runs = None
+        self.__index.remap(rows)
+        for new_row, name in added:
+            self.__index.add(new_row, name)
+
+    def __prefix_ranges(self, prefix: str) -> Iterator[range]:
+        """Yield the rows of the IDs starting with a prefix, a range per ID length."""
+
+        if not prefix.isdecimal() or prefix[0] == "0":
+            return
+
+        self.compact()
+        for length in range(len(prefix), MAX_UID_LENGTH + 1):
+            pad = length - len(prefix)
+            lo = bisect_left(self.__ids, int(prefix + "0" * pad))
+            yield range(lo, bisect_right(self.__ids, int(prefix + "9" * pad), lo))
+
+    def prefix_items(self, prefix: str) -> list[tuple[str, str]]:
+        """
+        Get the students whose ID starts with a prefix.
+
+        Args:
+            prefix (str): The ID prefix, e.g. "4" + year + department code.
+
+        Returns:
+            list[tuple[str, str]]: The (ID, name) of the matching students in ID order.
+        """
+
+        return [
+            (str(self.__ids[row]), self.__name_at(row))
+            for rows in self.__prefix_ranges(prefix)
+            for row in rows
+        ]
+
+    def search_name(self, name: str) -> list[tuple[str, str]]:
+        """
+        Search the students whose name contains every character of the given name.
+
+        Args:
+            name (str): The (partial) name to search for.
+
+        Returns:
+            list[tuple[str, str]]: The (ID, name) of the matching students, the merged
+                ones in ID order followed by the pending ones.
+        """
+
+        chars = set(name)
+        if not chars:
+            return list(self.items())
+
+        students: list[tuple[str, str]] = []
+        for row in sorted(self.__index.candidates(name)):
+            # Skip the rows renamed since the last merge, the pending names win
+            if (uid := self.__ids[row]) not in self.__pending:
+                students.append((str(uid), self.__name_at(row)))
+
+        for uid in self.__pending_index.candidates(name):
+            # Students renamed twice before a merge leave stale postings behind
+            if chars.issubset(current := self.__pending[uid]):
+                students.append((str(uid), current))
+
+        return students
+
+    def __year_runs(self) -> list[tuple[int, int]]:
+        """
+        Split the rows into runs of IDs sharing the digits before the last five, so the
+        same enrollment year, best first: from the latest year, then from the largest
+        ID. The rows of a run rank in reverse row order.
+        """
+
+        if self.__runs is None:
+            ids = self.__ids
+            runs: list[tuple[int, int]] = []
+            lo = 0
+            while lo < len(ids):
+                hi = bisect_left(ids, (ids[lo] // 100000 + 1) * 100000, lo)
+                runs.append((lo, hi))
+                lo = hi
+
+            runs.sort(key=lambda run: (self.__year(ids[run[0]]), run[0]), reverse=True)
+            self.__runs = runs
+
+        return self.__runs
+
+    def __ranked_rows(self, rows: set[int], n: int) -> list[int]:
+        """Get the best n rows, from the latest enrollment year, then the largest ID."""
+
+        rows_in_order = sorted(rows)
+        ranked: list[int] = []
+        for lo, hi in self.__year_runs():
+            if len(ranked) >= n:
+                break
+
+            end = bisect_left(rows_in_order, hi)
+            start = bisect_left(rows_in_order, lo, 0, end)
+            ranked += reversed(rows_in_order[max(start, end - n + len(ranked)) : end])
+
+        return ranked
+
+    def rank_name(self, name: str, k: int) -> tuple[list[tuple[str, str]], int]:
+        """
+        Rank the students whose name contains every character of the given name.
+        A name equal to the given one ranks first, then the names starting with it, then
+        the rest, each from the latest enrollment year.
+
+        Args:
+            name (str): The (partial) name to search for.
+            k (int): The number of students to return.
+
+        Returns:
+            tuple[list[tuple[str, str]], int]: The (ID, name) of the best k students,
+                best first, and the number of matching students.
+        """
+
+        chars = set(name)
+        ids, offsets, arena = self.__ids, self.__offsets, self.__arena
+
+        # The rows renamed since the last merge, the pending names win
+        stale = set()
+        for uid in self.__pending:
+            row = bisect_left(ids, uid)
+            if row < len(ids) and ids[row] == uid:
+                stale.add(row)
+
+        # Only the rows starting with the first character are read, to check the rest
+        if chars:
+            matches = self.__index.candidates(name) - stale
+            heads = self.__index.heads(name) & matches
+            exact = self.__index.heads(name, exact=True) & heads
+            if len(name) > 1:
+                query = name.encode()
+                heads = {
+                    row
+                    for row in heads
+                    if arena.startswith(query, offsets[row], offsets[row + 1])
+                }
+                exact &= heads
+
+            tiers = [(3, exact), (2, heads - exact), (1, matches - heads)]
+
+        else:
+            matches = set(range(len(ids))) - stale
+            tiers = [(2, matches)]
+
+        # Each tier stops at the k-th row, the rest of its matches are never ranked
+        ranked_rows: list[tuple[int, int]] = []
+        for score, rows in tiers:
+            if len(ranked_rows) >= k:
+                break
+
+            ranked_rows += (
+                (score, row) for row in self.__ranked_rows(rows, k - len(ranked_rows))
+            )
+
+        # Pending students are few, they are ranked with the best rows
+        pending: list[tuple[int, int, int, str]] = []
+        for uid in self.__pending_index.candidates(name) if chars else self.__pending:
+            # Students renamed twice before a merge leave stale postings behind
+            if chars.issubset(current := self.__pending[uid]):
+                score = 3 if current == name else 2 if current.startswith(name) else 1
+                pending.append((score, self.__year(uid), uid, current))
+
+        total = len(matches) + len(pending)
+        if not pending:
+            return [
+                (str(ids[row]), self.__name_at(row)) for _, row in ranked_rows
+            ], total
+
+        ranked = [
+            (score, self.__year(uid := ids[row]), uid, self.__name_at(row))
+            for score, row in ranked_rows
+        ]
+        ranked = nlargest(k, ranked + pending)
+
+        return [(str(uid), name) for *_, uid, name in ranked], total
+
+    @staticmethod
+    def __year(uid: int) -> int:
+        """Get the enrollment year of a packed ID, the digits before the last five."""
+
+        return uid // 100000 % (1000 if uid >= 100000000 else 100)
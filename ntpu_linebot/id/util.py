@@ -1,12 +1,12 @@
 # -*- coding:utf-8 -*-
-import random
-from asyncio import sleep
 from datetime import datetime
 from enum import Enum, auto, unique
-from typing import Optional
+from functools import lru_cache, partial
+from typing import Callable, Iterable, Optional
 
 from sanic import Sanic
 
+from ..crawl_util import CRAWLER
 from .request import ID_REQUEST
 
 # 科系名稱 -> 科系代碼
@@ -184,15 +184,21 @@ async def healthz(app: Sanic, force: bool = False) -> bool:
 
 
 async def load_student_dict() -> None:
-    """Updates the student dict for each department and year."""
+    """Updates the student dict for each department and year that is not frozen yet."""
 
     cur_year = datetime.now().year - 1911
     from_year = min(112, cur_year)
 
-    for year in range(from_year, 100, -1):
-        for dep in DEPARTMENT_CODE.values():
-            await sleep(random.uniform(15, 25))
-            await ID_REQUEST.get_students_by_year_and_department(year, dep)
+    await CRAWLER.run(
+        "student",
+        "id",
+        [
+            partial(ID_REQUEST.get_students_by_year_and_department, year, dep)
+            for year in range(from_year, 100, -1)
+            for dep in DEPARTMENT_CODE.values()
+            if f"4{year}{dep}" not in ID_REQUEST.FROZEN_KEYWORDS
+        ],
+    )
 
 
 @unique
@@ -206,6 +212,101 @@ class Order(Enum):
     FULL_DEPARTMENT = auto()
 
 
+def __department_table() -> dict[str, tuple[str, tuple[str, ...]]]:
+    """
+    Build the table decoding the department of a student ID.
+
+    Returns:
+        dict: The degree digit and the three digits after the year of a student ID
+            -> the department name and the parts of the full department name.
+    """
+
+    table: dict[str, tuple[str, tuple[str, ...]]] = {}
+    for digit in "0123456789":
+        for code, name in MASTER_DEPARTMENT_NAME.items():
+            table[f"7{code}{digit}"] = (name, (FULL_MASTER_DEPARTMENT_NAME[code],))
+
+        for code, name in PHD_DEPARTMENT_NAME.items():
+            table[f"8{code}{digit}"] = (name, (FULL_PHD_DEPARTMENT_NAME[code],))
+
+        for code in {code[:2] for code in DEPARTMENT_NAME}:
+            # 法律系 and 社學系 share the first two digits with their groups
+            group = DEPARTMENT_NAME.get(code + digit)
+            if code == DEPARTMENT_CODE["社學"][:2]:
+                if group is not None:
+                    table[f"4{code}{digit}"] = (group + "系", (group + "系",))
+
+            elif code == DEPARTMENT_CODE["法律"]:
+                table[f"4{code}{digit}"] = (
+                    DEPARTMENT_NAME[code] + "系",
+                    ("法律系", group + "組") if group else ("法律系",),
+                )
+
+            else:
+                name = DEPARTMENT_NAME[code] + "系"
+                table[f"4{code}{digit}"] = (name, (name,))
+
+    return table
+
+
+__DEPARTMENT_TABLE = __department_table()
+
+
+@lru_cache
+def __student_formatter(
+    order: tuple[Order, ...],
+    space: int,
+) -> Callable[[str, str], str]:
+    """
+    Build the function formatting the information of a student in the given order.
+
+    Args:
+        order (tuple[Order, ...]): The order of the information.
+        space (int): The space between the formatted information.
+
+    Returns:
+        Callable[[str, str], str]: The function taking the ID and the name of a student.
+    """
+
+    separator = " " * space
+    if order == (Order.ID, Order.NAME):
+        return f"{{}}{separator}{{}}".format
+
+    # The year takes the digits between the degree and the last five digits
+    fields: list[Callable[[str, str], str]] = []
+    for o in order:
+        match o:
+            case Order.ID:
+                fields.append(lambda student_id, name: student_id)
+
+            case Order.NAME:
+                fields.append(lambda student_id, name: name)
+
+            case Order.YEAR:
+                fields.append(lambda student_id, name: student_id[1:-5])
+
+            case Order.DEPARTMENT:
+                fields.append(
+                    lambda student_id, name: __DEPARTMENT_TABLE[
+                        student_id[0] + student_id[-5:-2]
+                    ][0]
+                )
+
+            case Order.FULL_DEPARTMENT:
+                fields.append(
+                    lambda student_id, name: separator.join(
+                        __DEPARTMENT_TABLE[student_id[0] + student_id[-5:-2]][1]
+                    )
+                )
+
+            case _:
+                raise ValueError("Invalid Order")
+
+    return lambda student_id, name: separator.join(
+        [field(student_id, name) for field in fields]
+    )
+
+
 def student_info_format(
     student_id: str,
     name: str,
@@ -229,100 +330,108 @@ def student_info_format(
     if order is None:
         order = [Order.YEAR, Order.DEPARTMENT, Order.ID, Order.NAME]
 
-    message = []
-    is_over_99 = len(student_id) == 9
-    is_master = student_id[0] == "7"
-    is_phd = student_id[0] == "8"
-
-    # Format the student information based on the order
-    for o in order:
-        match o:
-            case Order.ID:
-                message.append(student_id)
-
-            case Order.NAME:
-                message.append(name)
+    return __student_formatter(tuple(order), space)(student_id, name)
 
-            case Order.YEAR:
-                year = student_id[1 : is_over_99 + 3]
-                message.append(year)
 
-            case Order.DEPARTMENT:
-                department = student_id[is_over_99 + 3 : is_over_99 + 5]
-                if is_master:
-                    message.append(MASTER_DEPARTMENT_NAME[department])
-                    continue
-
-                if is_phd:
-                    message.append(PHD_DEPARTMENT_NAME[department])
-                    continue
+def student_list_format(
+    students: Iterable[tuple[str, str]],
+    order: Optional[list[Order]] = None,
+    space: int = 1,
+) -> str:
+    """
+    Format the information of many students, one student per line.
 
-                if department == DEPARTMENT_CODE["社學"][0:2]:
-                    department += student_id[is_over_99 + 5]
+    Args:
+        students (Iterable[tuple[str, str]]): The IDs and the names of the students.
+        order (list[Order], optional): The order of the information. Defaults to None.
+        space (int, optional): The space between the formatted information. Defaults to 1.
 
-                message.append(DEPARTMENT_NAME[department] + "系")
+    Returns:
+        str: The formatted student information.
+    """
 
-            case Order.FULL_DEPARTMENT:
-                department = student_id[is_over_99 + 3 : is_over_99 + 5]
-                if is_master:
-                    message.append(FULL_MASTER_DEPARTMENT_NAME[department])
-                    continue
+    if order is None:
+        order = [Order.YEAR, Order.DEPARTMENT, Order.ID, Order.NAME]
 
-                if is_phd:
-                    message.append(FULL_PHD_DEPARTMENT_NAME[department])
-                    continue
+    formatter = __student_formatter(tuple(order), space)
+    return "\n".join([formatter(student_id, name) for student_id, name in students])
 
-                if department in [DEPARTMENT_CODE["法律"], DEPARTMENT_CODE["社學"][:2]]:
-                    department += student_id[is_over_99 + 5]
 
-                if department[0:2] == DEPARTMENT_CODE["法律"]:
-                    message.append("法律系")
-                    message.append(DEPARTMENT_NAME[department] + "組")
+def is_student_uid_local(uid: str) -> bool:
+    """
+    Check whether a student ID lookup is answered without any upstream request.
 
-                else:
-                    message.append(DEPARTMENT_NAME[department] + "系")
+    Args:
+        uid (str): The student ID.
 
-            case _:
-                raise ValueError("Invalid Order")
+    Returns:
+        bool: True if the student store knows the student or that it does not exist.
+    """
 
-    return (" " * space).join(message)
+    return uid in ID_REQUEST.STUDENT_DICT or ID_REQUEST.is_frozen(uid)
 
 
-async def search_student_by_uid(uid: str) -> str:
+async def search_student_by_uid(uid: str) -> Optional[str]:
     """
     Async function to search for a student by ID.
+    The student store is checked first, then the lookup caches, then the upstream.
 
     Args:
         uid (str): The unique identifier of the student.
 
     Returns:
-        str: The information of the student if found.
+        str | None: The information of the student if found, otherwise None.
     """
 
+    if (name := ID_REQUEST.STUDENT_DICT.get(uid)) is not None:
+        return name
+
+    # Every student of a frozen listing is in the store
+    if ID_REQUEST.is_frozen(uid):
+        return None
+
     return await ID_REQUEST.get_student_by_uid(uid)
 
 
-def search_students_by_name(name: str) -> list[tuple[str, str]]:
+def search_students_by_name(
+    name: str,
+    k: int = 500,
+) -> tuple[list[tuple[str, str]], int]:
     """
-    Searches for students by name.
+    Searches for students by name, the most relevant ones first.
 
     Args:
         name (str): The name of the student to search for.
+        k (int, optional): The number of students to return. Defaults to 500.
+
+    Returns:
+        tuple: A list of tuples containing the IDs and names of the best matching
+            students, and the number of matching students.
+    """
+
+    return ID_REQUEST.STUDENT_DICT.rank_name(name, k)
+
+
+def is_department_local(year: int, department: str) -> bool:
+    """
+    Check whether a student listing of a department is answered without any upstream
+    request.
+
+    Args:
+        year (int): The year of the listing.
+        department (str): The department code of the listing.
 
     Returns:
-        list: A list of tuples containing the names and IDs of the matching students.
+        bool: True if the listing is frozen in the student store.
     """
 
-    return [
-        (key, value)
-        for key, value in ID_REQUEST.STUDENT_DICT.items()
-        if set(name).issubset(value)
-    ]
+    return ID_REQUEST.is_frozen(f"4{year}{department}")
 
 
 async def search_students_by_year_and_department(year: int, department: str) -> str:
     """
     Asynchronously search for students by year and department.
+    Frozen listings are answered from the student store, the others from the upstream.
 
     Args:
         year (int): The year to search for.
@@ -335,16 +444,17 @@ async def search_students_by_year_and_department(year: int, department: str) ->
     department_name = DEPARTMENT_NAME.get(department, "")
     department_type = "組" if department.startswith(DEPARTMENT_CODE["法律"]) else "系"
 
-    if students := await ID_REQUEST.get_students_by_year_and_department(
-        year, department
-    ):
-        students_info = "\n".join(
-            [
-                student_info_format(student_id, student_name, [Order.ID, Order.NAME], 3)
-                for student_id, student_name in students.items()
-            ]
+    if is_department_local(year, department):
+        students = dict(ID_REQUEST.STUDENT_DICT.prefix_items(f"4{year}{department}"))
+
+    else:
+        students = await ID_REQUEST.get_students_by_year_and_department(
+            year, department
         )
 
+    if students:
+        students_info = student_list_format(students.items(), [Order.ID, Order.NAME], 3)
+
         students_info += f"\n\n{year}學年度{department_name}{department_type}共有{len(students)}位學生"
 
     else:
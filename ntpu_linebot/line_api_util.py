@@ -1,8 +1,10 @@
 # -*- coding:utf-8 -*-
 import sys
+from asyncio import Task, create_task, gather
 from os import getenv
 from typing import Optional
 
+from cachetools import TTLCache
 from linebot.v3 import WebhookParser
 from linebot.v3.messaging import (
     AsyncApiClient,
@@ -13,10 +15,17 @@ from linebot.v3.messaging import (
     ShowLoadingAnimationRequest,
 )
 
+from .trace_util import TRACER
+
 
 class LineAPIUtil:
     __parser: Optional[WebhookParser] = None
     __line_bot_api: Optional[AsyncMessagingApi] = None
+    __loading_users = TTLCache(
+        maxsize=4096, ttl=float(getenv("LOADING_DEDUP_WINDOW", "5"))
+    )
+    # Loading animations by the reply token of the event they are shown for
+    __loading_replies: TTLCache[str, Task] = TTLCache(maxsize=4096, ttl=60)
 
     @property
     def line_bot_api(self) -> AsyncMessagingApi:
@@ -31,7 +40,10 @@ class LineAPIUtil:
             if channel_access_token := getenv("LINE_CHANNEL_ACCESS_TOKEN"):
                 self.__line_bot_api = AsyncMessagingApi(
                     AsyncApiClient(
-                        Configuration(access_token=channel_access_token),
+                        Configuration(
+                            host=getenv("LINE_API_ENDPOINT", "https://api.line.me"),
+                            access_token=channel_access_token,
+                        ),
                         pool_threads=2,
                     )
                 )
@@ -68,24 +80,46 @@ class LineAPIUtil:
             messages (list[Message]): The list of messages to be sent as a reply.
         """
 
-        await self.line_bot_api.reply_message(
-            ReplyMessageRequest(
-                replyToken=reply_token,
-                messages=messages,
+        # An animation arriving after the reply would spin on past the answer
+        if (loading := self.__loading_replies.pop(reply_token, None)) is not None:
+            await gather(loading, return_exceptions=True)
+
+        with TRACER.span("reply", messages=len(messages)):
+            await self.line_bot_api.reply_message(
+                ReplyMessageRequest(
+                    replyToken=reply_token,
+                    messages=messages,
+                )
             )
-        )
 
     async def loading_message(self, user_id: str) -> None:
         """
         Send a loading message in the Line messaging platform.
+        Messages to the same user within a short window are sent only once.
 
         Args:
             user_id (str): The user ID of the message sender.
         """
 
+        if user_id in self.__loading_users:
+            return
+
+        self.__loading_users[user_id] = True
         await self.line_bot_api.show_loading_animation(
             ShowLoadingAnimationRequest(chatId=user_id, loadingSeconds=10)
         )
 
+    def start_loading(self, user_id: str, reply_token: str) -> None:
+        """
+        Start sending a loading message for an event, which the reply to the event waits
+        for, so the animation never outlasts the answer.
+
+        Args:
+            user_id (str): The user ID of the message sender.
+            reply_token (str): The reply token of the event.
+        """
+
+        self.__loading_replies[reply_token] = create_task(self.loading_message(user_id))
+
 
 LINE_API_UTIL = LineAPIUtil()
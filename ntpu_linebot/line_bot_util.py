@@ -30,6 +30,28 @@ def get_sender(name: Optional[str] = None) -> Sender:
     )
 
 
+def service_unavailable(
+    name: Optional[str] = None,
+    quote_token: Optional[str] = None,
+) -> TextMessage:
+    """
+    Get the message replied when the upstream service of a bot is unavailable.
+
+    Args:
+        name (str, optional): The name of the sender.
+        quote_token (str, optional): The quote token of the message to reply.
+
+    Returns:
+        A TextMessage telling the user to try again later.
+    """
+
+    return TextMessage(
+        text="學校網站目前無法連線，請稍後再試",
+        sender=get_sender(name),
+        quoteToken=quote_token,
+    )
+
+
 def instruction() -> list[TextMessage]:
     """Provides instructions on how to use a Line messaging platform bot."""
 
@@ -0,0 +1,354 @@
+# -*- coding:utf-8 -*-
+from asyncio import sleep
+from bisect import bisect_left
+from math import inf
+from os import getenv
+from time import perf_counter
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+from cachetools import TTLCache
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def escape_label_value(value: str) -> str:
+    """
+    Escape a label value for the Prometheus text exposition format.
+
+    Args:
+        value (str): The label value.
+
+    Returns:
+        str: The escaped label value.
+    """
+
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Value:
+    """A counter or gauge value, optionally read from a function on scrape."""
+
+    def __init__(self) -> None:
+        self.__value = 0.0
+        self.__function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the value"""
+        self.__value += amount
+
+    def set(self, value: float) -> None:
+        """Set the value"""
+        self.__value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from a function on scrape"""
+        self.__function = function
+
+    def get(self) -> float:
+        """Getter for value"""
+        return float(self.__function()) if self.__function else self.__value
+
+
+class HistogramValue:
+    """A histogram of observed values."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.__buckets = buckets
+        self.__counts = [0] * (len(buckets) + 1)
+        self.__sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Observe a value"""
+        self.__counts[bisect_left(self.__buckets, value)] += 1
+        self.__sum += value
+
+    def get(self) -> tuple[list[tuple[float, int]], float, int]:
+        """Getter for the cumulative buckets, sum and count"""
+
+        cumulative: list[tuple[float, int]] = []
+        total = 0
+        for bound, cnt in zip((*self.__buckets, inf), self.__counts):
+            total += cnt
+            cumulative.append((bound, total))
+
+        return cumulative, self.__sum, total
+
+
+class Metric:
+    """A metric family with a fixed set of label names."""
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.__kind = kind
+        self.__name = name
+        self.__documentation = documentation
+        self.__labelnames = tuple(labelnames)
+        self.__buckets = tuple(sorted(buckets))
+        self.__children: dict[tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any) -> Any:
+        """
+        Get the child of the metric for the given label values.
+
+        Args:
+            *values (Any): The label values, in the order of the label names.
+
+        Returns:
+            Value | HistogramValue: The child holding the value.
+        """
+
+        key = tuple(str(value) for value in values)
+        if (child := self.__children.get(key)) is None:
+            if len(key) != len(self.__labelnames):
+                raise ValueError(
+                    f"Expected labels {self.__labelnames} for {self.__name}"
+                )
+
+            child = (
+                HistogramValue(self.__buckets)
+                if self.__kind == "histogram"
+                else Value()
+            )
+            self.__children[key] = child
+
+        return child
+
+    def __format(self, suffix: str, labels: dict[str, str], value: float) -> str:
+        """Format a sample line of the text exposition format."""
+
+        if labels:
+            label_str = ",".join(
+                f'{k}="{escape_label_value(v)}"' for k, v in labels.items()
+            )
+            return f"{self.__name}{suffix}{{{label_str}}} {value!r}"
+
+        return f"{self.__name}{suffix} {value!r}"
+
+    def render(self) -> Iterator[str]:
+        """
+        Render the metric family in the Prometheus text exposition format.
+
+        Returns:
+            Iterator[str]: The lines of the metric family.
+        """
+
+        yield f"# HELP {self.__name} {self.__documentation}"
+        yield f"# TYPE {self.__name} {self.__kind}"
+
+        for key, child in list(self.__children.items()):
+            labels = dict(zip(self.__labelnames, key))
+
+            if isinstance(child, HistogramValue):
+                buckets, total_sum, count = child.get()
+                for bound, cnt in buckets:
+                    le = "+Inf" if bound == inf else repr(float(bound))
+                    yield self.__format("_bucket", {**labels, "le": le}, float(cnt))
+
+                yield self.__format("_sum", labels, total_sum)
+                yield self.__format("_count", labels, float(count))
+
+            else:
+                yield self.__format("", labels, child.get())
+
+
+class MetricsUtil:
+    def __init__(self) -> None:
+        self.__metrics: dict[str, Metric] = {}
+
+    def __register(self, kind: str, name: str, *args: Any, **kwargs: Any) -> Metric:
+        """Register a metric family, or return the one registered with the name."""
+
+        if (metric := self.__metrics.get(name)) is None:
+            metric = Metric(kind, name, *args, **kwargs)
+            self.__metrics[name] = metric
+
+        return metric
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> Metric:
+        """
+        Register a counter.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labelnames (Sequence[str], optional): The label names. Defaults to no labels.
+
+        Returns:
+            Metric: The counter.
+        """
+
+        return self.__register("counter", name, documentation, labelnames)
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> Metric:
+        """
+        Register a gauge.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labelnames (Sequence[str], optional): The label names. Defaults to no labels.
+
+        Returns:
+            Metric: The gauge.
+        """
+
+        return self.__register("gauge", name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Metric:
+        """
+        Register a histogram.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labelnames (Sequence[str], optional): The label names. Defaults to no labels.
+            buckets (Sequence[float], optional): The upper bounds of the buckets.
+
+        Returns:
+            Metric: The histogram.
+        """
+
+        return self.__register(
+            "histogram", name, documentation, labelnames, buckets=buckets
+        )
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+
+        return (
+            "\n".join(
+                line for metric in self.__metrics.values() for line in metric.render()
+            )
+            + "\n"
+        )
+
+
+METRICS = MetricsUtil()
+
+CACHE_HITS = METRICS.counter("ntpu_cache_hits_total", "Number of cache hits", ["cache"])
+CACHE_MISSES = METRICS.counter(
+    "ntpu_cache_misses_total", "Number of cache misses", ["cache"]
+)
+DICT_ENTRIES = METRICS.gauge(
+    "ntpu_dict_entries", "Number of entries in the in-memory dicts", ["dict"]
+)
+CRAWL_DONE = METRICS.gauge(
+    "ntpu_crawl_done", "Number of finished steps of the running crawl", ["crawler"]
+)
+CRAWL_TOTAL = METRICS.gauge(
+    "ntpu_crawl_total", "Number of steps of the running crawl", ["crawler"]
+)
+EVENT_LOOP_LAG = METRICS.histogram(
+    "ntpu_event_loop_lag_seconds",
+    "Delay of the event loop waking up a sleeping task",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+).labels()
+
+
+class MetricsTTLCache(TTLCache):
+    """TTLCache counting its hits and misses."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.__hits = CACHE_HITS.labels(name)
+        self.__misses = CACHE_MISSES.labels(name)
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            value = super().__getitem__(key)
+
+        except KeyError:
+            self.__misses.inc()
+            raise
+
+        self.__hits.inc()
+        return value
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        # Evictions pop the entries, which are no lookups
+        if key in self:
+            value = super().__getitem__(key)
+            del self[key]
+            return value
+
+        if default:
+            return default[0]
+
+        raise KeyError(key)
+
+
+class LookupCache(MetricsTTLCache):
+    """
+    MetricsTTLCache of lookup results, keeping the not found (None) results apart in
+    a negative cache with its own size and TTL.
+    """
+
+    __maxsize = int(getenv("LOOKUP_CACHE_SIZE", "1024"))
+    __ttl = float(getenv("LOOKUP_CACHE_TTL", str(60 * 60 * 24 * 7)))
+    __negative_maxsize = int(getenv("LOOKUP_NEGATIVE_CACHE_SIZE", "1024"))
+    __negative_ttl = float(getenv("LOOKUP_NEGATIVE_CACHE_TTL", str(60 * 60)))
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name, maxsize=self.__maxsize, ttl=self.__ttl)
+        self.__negative = TTLCache(
+            maxsize=self.__negative_maxsize, ttl=self.__negative_ttl
+        )
+        self.__negative_hits = CACHE_HITS.labels(f"{name}_negative")
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            value = self.__negative[key]
+
+        except KeyError:
+            return super().__getitem__(key)
+
+        self.__negative_hits.inc()
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        if value is None:
+            self.__negative[key] = value
+
+        else:
+            super().__setitem__(key, value)
+
+
+async def monitor_event_loop_lag(interval: float = 0.1) -> None:
+    """
+    Measure how late the event loop wakes up a sleeping task, forever.
+
+    Args:
+        interval (float, optional): The sleep interval in seconds. Defaults to 0.1.
+    """
+
+    while True:
+        start = perf_counter()
+        await sleep(interval)
+        EVENT_LOOP_LAG.observe(max(perf_counter() - start - interval, 0))
@@ -1,5 +1,6 @@
 # -*- coding:utf-8 -*-
-from typing import Iterator, Sequence
+from datetime import datetime
+from typing import Iterator, Optional, Sequence
 
 from annotated_types import T
 
@@ -19,6 +20,7 @@ def partition(arr: Sequence[T], size: int) -> Iterator[Sequence[T]]:
     for i in range(0, len(arr), size):
         yield arr[i : i + size]
 
+
 def list_to_regex(arr: Sequence[str]) -> str:
     """
     Generates a regular expression pattern that matches any string
@@ -33,3 +35,18 @@ def list_to_regex(arr: Sequence[str]) -> str:
     """
 
     return r"(?<=(" + r"|".join(rf"(?<={c})" for c in arr) + r")[ +]).*"
+
+
+def academic_year(now: Optional[datetime] = None) -> int:
+    """
+    Get the ROC academic year, which starts in August.
+
+    Args:
+        now (datetime, optional): The time to get the academic year of. Defaults to now.
+
+    Returns:
+        int: The academic year, e.g. 113 from August 2024 to July 2025.
+    """
+
+    now = now or datetime.now()
+    return now.year - 1911 if now.month >= 8 else now.year - 1912
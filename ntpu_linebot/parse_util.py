@@ -0,0 +1,183 @@
+# -*- coding:utf-8 -*-
+import sys
+from asyncio import gather, get_running_loop
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from importlib import import_module
+from multiprocessing import current_process, get_context
+from os import getenv
+from typing import Any, Callable, Optional, TypeVar
+
+from sanic.log import logger
+
+T = TypeVar("T")
+
+
+class ParserUtil:
+    __kind = getenv("PARSER_EXECUTOR", "auto").lower()
+    __workers = int(getenv("PARSER_WORKERS", "2"))
+    __inline_bytes = int(getenv("PARSER_INLINE_BYTES", "32768"))
+
+    def __init__(self) -> None:
+        self.__executor: Optional[Executor] = None
+        self.__feeder: Optional[ThreadPoolExecutor] = None
+        self.__failed = False
+
+    @property
+    def kind(self) -> str:
+        """Where the pages are parsed, "process", "thread" or "inline"."""
+
+        if self.__failed:
+            return "inline"
+
+        kind = self.__kind
+        if kind == "auto":
+            # Threads only parse in parallel without the GIL
+            gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+            kind = "process" if gil_enabled else "thread"
+
+        # Sanic workers are daemonic processes, which may not have children
+        if kind == "process" and current_process().daemon:
+            return "thread"
+
+        return kind
+
+    def __get_executor(self) -> Optional[Executor]:
+        """Get the executor of the pages, creating it on first use."""
+
+        if self.__executor is None and self.kind == "process":
+            # Spawned workers import the parsers once, forking a running server is unsafe
+            self.__executor = ProcessPoolExecutor(
+                self.__workers,
+                mp_context=get_context("spawn"),
+                initializer=import_module,
+                initargs=(__package__,),
+            )
+
+        elif self.__executor is None and self.kind == "thread":
+            self.__executor = ThreadPoolExecutor(
+                self.__workers, thread_name_prefix="parser"
+            )
+
+        return self.__executor
+
+    async def start(self) -> None:
+        """Start the workers ahead of the first page, so it does not wait for them."""
+
+        loop = get_running_loop()
+        try:
+            if (executor := self.__get_executor()) is None:
+                return
+
+            await gather(
+                *(loop.run_in_executor(executor, abs, 0) for _ in range(self.__workers))
+            )
+
+        except BrokenExecutor:
+            logger.warning("Parser executor failed to start, retrying on first page")
+            self.shutdown()
+
+        except Exception as e:
+            logger.error(f"Parser executor cannot start, parsing inline: {e!r}")
+            self.__fail()
+
+    async def parse(
+        self,
+        parser: Callable[[bytes, str], T],
+        content: bytes,
+        encoding: str,
+    ) -> T:
+        """
+        Parse a page off the event loop. Pages too small to be worth the round trip to
+        a worker are parsed right away.
+
+        Args:
+            parser (Callable[[bytes, str], T]): The module-level parser of the page,
+                returning plain picklable rows.
+            content (bytes): The page.
+            encoding (str): The encoding of the page.
+
+        Returns:
+            T: The rows the parser returns.
+        """
+
+        if len(content) < self.__inline_bytes:
+            return parser(content, encoding)
+
+        try:
+            executor = self.__get_executor()
+            future = (
+                None
+                if executor is None
+                else get_running_loop().run_in_executor(
+                    executor, parser, content, encoding
+                )
+            )
+
+        # Submitting starts the workers, which the platform may refuse
+        except Exception as e:
+            logger.error(f"Parser executor cannot start, parsing inline: {e!r}")
+            self.__fail()
+            future = None
+
+        if future is None:
+            return parser(content, encoding)
+
+        try:
+            return await future
+
+        # A crashed worker breaks the pool, so replace it for the next pages
+        except BrokenExecutor:
+            logger.warning("Parser executor is broken, restarting it")
+            self.shutdown()
+            return parser(content, encoding)
+
+    async def feed(self, step: Callable[..., T], *args: Any) -> T:
+        """
+        Run a step of an incremental parser off the event loop, from creating it to
+        closing it.
+
+        An lxml push parser must stay in the thread it was created in, and it cannot be
+        sent to a worker process, so every step of every incremental parser runs in one
+        feeder thread of its own.
+
+        Args:
+            step (Callable[..., T]): The incremental parser class, or a bound method of
+                the parser.
+            *args (Any): The arguments of the step, such as the next chunk of the page.
+
+        Returns:
+            T: What the step returns.
+        """
+
+        if self.__kind == "inline":
+            return step(*args)
+
+        if self.__feeder is None:
+            self.__feeder = ThreadPoolExecutor(1, thread_name_prefix="feeder")
+
+        return await get_running_loop().run_in_executor(self.__feeder, step, *args)
+
+    def __fail(self) -> None:
+        """Stop the workers for good, parsing every page inline from now on."""
+
+        self.shutdown()
+        self.__failed = True
+
+    def shutdown(self) -> None:
+        """Stop the workers, dropping the pages still waiting for them."""
+
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+        if self.__feeder is not None:
+            self.__feeder.shutdown(wait=False, cancel_futures=True)
+            self.__feeder = None
+
+
+PARSER = ParserUtil()
@@ -1,23 +1,191 @@
 # -*- coding:utf-8 -*-
-from re import sub
+from asyncio import gather
+from re import IGNORECASE, compile, escape, sub
+from time import perf_counter
+from typing import Awaitable, Optional, Sequence
 
 from linebot.v3.messaging import ImageMessage, Message, TextMessage
 from linebot.v3.webhooks import (
+    Event,
     FollowEvent,
     JoinEvent,
     MemberJoinedEvent,
     MessageEvent,
     PostbackEvent,
+    TextMessageContent,
 )
 
+from .abs_bot import Bot
 from .contact import CONTACT_BOT
 from .course import COURSE_BOT
 from .id import ID_BOT
 from .line_api_util import LINE_API_UTIL
 from .line_bot_util import get_sender, instruction
+from .metrics_util import METRICS
+from .trace_util import TRACER
 
 __HELP_COMMANDS = ["使用說明", "help"]
 __PUNCTUATION_REGEX = r"[][!\"#$%&'()*+,./:;<=>?@\\^_`{|}~-]"
+__BOT_REQUESTS = METRICS.counter(
+    "ntpu_bot_requests_total",
+    "Number of payloads handled by the bots",
+    ["bot", "handler"],
+)
+__BOT_LATENCY = METRICS.histogram(
+    "ntpu_bot_request_duration_seconds",
+    "Latency of the bots handling a payload",
+    ["bot", "handler"],
+)
+
+
+async def __measure(
+    bot: Bot, handler: str, messages: Awaitable[list[Message]]
+) -> list[Message]:
+    """
+    Await the messages of a bot and record the request count and latency.
+
+    Args:
+        bot (Bot): The bot handling the payload.
+        handler (str): The name of the handler of the bot.
+        messages (Awaitable[list[Message]]): The pending messages of the bot.
+
+    Returns:
+        list[Message]: The messages of the bot.
+    """
+
+    name = type(bot).__name__
+    start = perf_counter()
+
+    try:
+        with TRACER.span("bot", bot=name, handler=handler):
+            return await messages
+
+    finally:
+        __BOT_REQUESTS.labels(name, handler).inc()
+        __BOT_LATENCY.labels(name, handler).observe(perf_counter() - start)
+
+
+class KeywordRouter:
+    """Routes a text message to the bots owning its leading keyword."""
+
+    def __init__(self, bots: Sequence[Bot]) -> None:
+        self.__bots = list(bots)
+        self.__owners: dict[str, list[Bot]] = {}
+        for bot in self.__bots:
+            for keyword in bot.keywords:
+                owners = self.__owners.setdefault(keyword.lower(), [])
+                if bot not in owners:
+                    owners.append(bot)
+
+        # Longer keywords come first, so the first alternative matched is the longest.
+        # The bots only take a keyword followed by a separator, as list_to_regex does.
+        self.__regex = compile(
+            r"(?:"
+            + r"|".join(
+                escape(keyword)
+                for keyword in sorted(self.__owners, key=len, reverse=True)
+            )
+            + r")(?=[ +])",
+            IGNORECASE,
+        )
+
+    @property
+    def bots(self) -> list[Bot]:
+        """Every bot of the router"""
+
+        return self.__bots
+
+    def route(self, payload: str) -> list[Bot]:
+        """
+        Classify a text message by its leading keyword.
+
+        Args:
+            payload (str): The text message.
+
+        Returns:
+            list[Bot]: The bots owning the leading keyword, or every bot if no keyword leads the message.
+        """
+
+        if m := self.__regex.match(payload):
+            return self.__owners[m.group().lower()]
+
+        return self.__bots
+
+
+__ROUTER = KeywordRouter([ID_BOT, CONTACT_BOT, COURSE_BOT])
+
+
+async def __ask(
+    bots: Sequence[Bot], payload: str, quote_token: Optional[str]
+) -> list[Message]:
+    """
+    Let the bots handle a text message concurrently.
+
+    Args:
+        bots (Sequence[Bot]): The bots to handle the message.
+        payload (str): The normalized text of the message.
+        quote_token (Optional[str]): The quote token of the message.
+
+    Returns:
+        list[Message]: The messages of the bots, in the order of the bots.
+    """
+
+    messages: list[Message] = []
+    for bot_messages in await gather(
+        *(
+            __measure(bot, "text", bot.handle_text_message(payload, quote_token))
+            for bot in bots
+        )
+    ):
+        messages += bot_messages
+
+    return messages
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize the text of a message before routing it.
+
+    Args:
+        text (str): The text of the message.
+
+    Returns:
+        str: The text with whitespace changed to spaces and punctuation characters removed.
+    """
+
+    payload = sub(r"\s", " ", text)
+    return sub(__PUNCTUATION_REGEX, "", payload)
+
+
+def needs_loading_animation(event: Event) -> bool:
+    """
+    Check whether the user should see a loading animation while the event is handled.
+
+    Args:
+        event (Event): The webhook event.
+
+    Returns:
+        bool: False if the event is answered from memory, True otherwise.
+    """
+
+    if isinstance(event, PostbackEvent):
+        payload = event.postback.data
+        return payload not in __HELP_COMMANDS and not all(
+            bot.is_local_postback_event(payload) for bot in __ROUTER.bots
+        )
+
+    if isinstance(event, MessageEvent) and isinstance(
+        event.message, TextMessageContent
+    ):
+        payload = normalize_text(event.message.text)
+        if payload == "" or payload in __HELP_COMMANDS:
+            return False
+
+        return not all(
+            bot.is_local_text_message(payload) for bot in __ROUTER.route(payload)
+        )
+
+    return False
 
 
 async def handle_text_message(event: MessageEvent) -> None:
@@ -28,9 +196,7 @@ async def handle_text_message(event: MessageEvent) -> None:
         event (MessageEvent): The event triggered by a text message.
     """
 
-    # Change whitespace and remove punctuation characters from the message text
-    payload = sub(r"\s", " ", event.message.text)
-    payload = sub(__PUNCTUATION_REGEX, "", payload)
+    payload = normalize_text(event.message.text)
     if payload == "":
         return
 
@@ -39,13 +205,16 @@ async def handle_text_message(event: MessageEvent) -> None:
         messages += instruction()
 
     else:
-        messages += await ID_BOT.handle_text_message(payload, event.message.quote_token)
-        messages += await CONTACT_BOT.handle_text_message(
-            payload, event.message.quote_token
-        )
-        messages += await COURSE_BOT.handle_text_message(
-            payload, event.message.quote_token
-        )
+        with TRACER.span("route") as span:
+            bots = __ROUTER.route(payload)
+            span.set("bots", ",".join(type(bot).__name__ for bot in bots))
+
+        messages += await __ask(bots, payload, event.message.quote_token)
+
+        # A keyword may also start another kind of query, so ask the other bots too
+        if not messages and bots is not __ROUTER.bots:
+            others = [bot for bot in __ROUTER.bots if bot not in bots]
+            messages += await __ask(others, payload, event.message.quote_token)
 
     if messages:
         await LINE_API_UTIL.reply_message(event.reply_token, messages[:5])
@@ -66,9 +235,10 @@ async def handle_postback_event(event: PostbackEvent) -> None:
         messages += instruction()
 
     else:
-        messages += await ID_BOT.handle_postback_event(payload)
-        messages += await CONTACT_BOT.handle_postback_event(payload)
-        messages += await COURSE_BOT.handle_postback_event(payload)
+        for bot in (ID_BOT, CONTACT_BOT, COURSE_BOT):
+            messages += await __measure(
+                bot, "postback", bot.handle_postback_event(payload)
+            )
 
     if messages:
         await LINE_API_UTIL.reply_message(event.reply_token, messages[:5])
@@ -93,6 +263,26 @@ async def handle_sticker_message(event: MessageEvent) -> None:
     await LINE_API_UTIL.reply_message(event.reply_token, [image_message])
 
 
+async def handle_overloaded_event(event: Event) -> None:
+    """
+    Reply politely to an event dropped because too many events are being handled.
+
+    Args:
+        event (Event): The dropped event.
+    """
+
+    if reply_token := getattr(event, "reply_token", None):
+        await LINE_API_UTIL.reply_message(
+            reply_token,
+            [
+                TextMessage(
+                    text="目前查詢的人太多了，請稍後再試一次 🙏",
+                    sender=get_sender(),
+                )
+            ],
+        )
+
+
 async def handle_follow_join_event(
     event: FollowEvent | JoinEvent | MemberJoinedEvent,
 ) -> None:
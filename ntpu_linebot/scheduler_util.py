@@ -0,0 +1,109 @@
+# -*- coding:utf-8 -*-
+from asyncio import PriorityQueue, QueueFull, Task, create_task, gather
+from enum import IntEnum, unique
+from itertools import count
+from os import getenv
+from typing import Any, Awaitable, Callable, Optional
+
+from sanic.log import logger
+
+from .metrics_util import METRICS
+from .trace_util import TRACER, Span
+
+Handler = Callable[[Any], Awaitable[None]]
+
+HANDLER_SHED = METRICS.counter(
+    "ntpu_handler_shed_total", "Number of events rejected by the saturated queue"
+).labels()
+
+
+@unique
+class Priority(IntEnum):
+    """Enumeration representing the priority of a handler, lower runs first."""
+
+    CHEAP = 0
+    EXPENSIVE = 1
+
+
+class HandlerSchedulerUtil:
+    __concurrency = int(getenv("HANDLER_CONCURRENCY", "16"))
+    __queue_size = int(getenv("HANDLER_QUEUE_SIZE", "256"))
+
+    def __init__(self) -> None:
+        self.__queue: Optional[
+            PriorityQueue[tuple[int, int, Handler, Any, Optional[Span]]]
+        ] = None
+        self.__workers: list[Task] = []
+        self.__seq = count()
+
+    @property
+    def queue_size(self) -> int:
+        """Number of handlers waiting for a worker"""
+        return self.__queue.qsize() if self.__queue else 0
+
+    async def __work(self) -> None:
+        """Run the queued handlers one at a time."""
+
+        assert self.__queue is not None
+        while True:
+            _, _, handler, event, parent = await self.__queue.get()
+
+            try:
+                # Resume the trace of the webhook request that queued the handler
+                with TRACER.child(parent, handler.__name__):
+                    await handler(event)
+
+            except Exception:
+                logger.exception(f"Handler {handler.__name__} failed")
+
+            finally:
+                self.__queue.task_done()
+
+    def start(self) -> None:
+        """Create the queue and the workers on the running event loop."""
+
+        self.__queue = PriorityQueue(maxsize=self.__queue_size)
+        self.__workers = [create_task(self.__work()) for _ in range(self.__concurrency)]
+
+    async def stop(self) -> None:
+        """Cancel the workers."""
+
+        for worker in self.__workers:
+            worker.cancel()
+
+        await gather(*self.__workers, return_exceptions=True)
+        self.__workers = []
+
+    def submit(self, priority: Priority, handler: Handler, event: Any) -> bool:
+        """
+        Queue a handler for an event.
+
+        Args:
+            priority (Priority): The priority of the handler.
+            handler (Handler): The async function handling the event.
+            event (Any): The event passed to the handler.
+
+        Returns:
+            bool: True if the handler is queued, False if the queue is saturated.
+        """
+
+        if self.__queue is None:
+            return False
+
+        try:
+            self.__queue.put_nowait(
+                (priority, next(self.__seq), handler, event, TRACER.current_span)
+            )
+
+        except QueueFull:
+            HANDLER_SHED.inc()
+            return False
+
+        return True
+
+
+HANDLER_SCHEDULER = HandlerSchedulerUtil()
+
+METRICS.gauge(
+    "ntpu_handler_queue_size", "Number of handlers waiting for a worker"
+).labels().set_function(lambda: HANDLER_SCHEDULER.queue_size)
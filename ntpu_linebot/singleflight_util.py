@@ -0,0 +1,65 @@
+# -*- coding:utf-8 -*-
+from asyncio import Task, create_task, shield
+from functools import wraps
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from cachetools.keys import hashkey
+
+from .metrics_util import METRICS
+
+T = TypeVar("T")
+
+COALESCED_CALLS = METRICS.counter(
+    "ntpu_coalesced_calls_total",
+    "Number of calls that joined an identical call already in flight",
+    ["call"],
+)
+
+
+def singleflight(
+    name: str,
+    key: Callable[..., Hashable] = hashkey,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Decorator sharing one in-flight call of an async function among the concurrent
+    callers with the same arguments, so they cause a single upstream fetch and parse.
+    Place it under `cached`, which only remembers finished calls.
+
+    Args:
+        name (str): The name of the call, for the coalesced call metric.
+        key (Callable[..., Hashable], optional): The function making the key of the
+            arguments. Defaults to hashkey, as `cached` uses.
+
+    Returns:
+        Callable: The decorator.
+    """
+
+    def decorator(
+        func: Callable[..., Awaitable[T]],
+    ) -> Callable[..., Awaitable[T]]:
+        in_flight: dict[Hashable, Task[T]] = {}
+        coalesced = COALESCED_CALLS.labels(name)
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            k = key(*args, **kwargs)
+            if (task := in_flight.get(k)) is None:
+                task = in_flight[k] = create_task(func(*args, **kwargs))
+
+                def done(task: Task[T]) -> None:
+                    del in_flight[k]
+                    # Callers may all be gone, so mark the exception as retrieved
+                    if not task.cancelled():
+                        task.exception()
+
+                task.add_done_callback(done)
+
+            else:
+                coalesced.inc()
+
+            # A cancelled caller must not cancel the call the others wait for
+            return await shield(task)
+
+        return wrapper
+
+    return decorator
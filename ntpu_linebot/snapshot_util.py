@@ -0,0 +1,220 @@
+# -*- coding:utf-8 -*-
+import gzip
+import json
+from asyncio import sleep, to_thread
+from os import getenv, makedirs, replace
+from os.path import dirname, exists
+from time import time
+from typing import Any
+
+from sanic.log import logger
+
+from .contact.contact import Individual, Organization
+from .contact.request import CONTACT_REQUEST
+from .course.course import SimpleCourse
+from .course.request import COURSE_REQUEST
+from .id.request import ID_REQUEST
+
+
+class SnapshotUtil:
+    VERSION = 2
+    __path = getenv("SNAPSHOT_PATH", "data/snapshot.json.gz")
+    __interval = float(getenv("SNAPSHOT_INTERVAL", str(60 * 30)))
+
+    def __serialize(self) -> dict[str, Any]:
+        """
+        Serialize the in-memory dictionaries into a JSON compatible dict.
+
+        Returns:
+            dict[str, Any]: The snapshot payload.
+        """
+
+        individuals: list[list[str]] = []
+        organizations: list[list[Any]] = []
+        for contact in list(CONTACT_REQUEST.CONTACT_DICT.values()):
+            # Contact falls back to uid when name is empty, so recover the raw name
+            if isinstance(contact, Individual):
+                prefix = contact.organization + contact.title
+                name = contact.name if prefix + contact.name == contact.uid else ""
+                individuals.append(
+                    [
+                        name,
+                        contact.organization,
+                        contact.title,
+                        contact.extension,
+                        contact.email,
+                    ]
+                )
+
+            elif isinstance(contact, Organization):
+                name = (
+                    contact.name
+                    if contact.superior + contact.name == contact.uid
+                    else ""
+                )
+                organizations.append(
+                    [
+                        name,
+                        contact.superior,
+                        contact.location,
+                        contact.website,
+                        [member.uid for member in contact.members],
+                    ]
+                )
+
+        return {
+            "version": self.VERSION,
+            "saved_at": time(),
+            "students": dict(ID_REQUEST.STUDENT_DICT.items()),
+            "courses": [
+                [c.year, c.term, c.no, c.title, c.teachers, c.times]
+                for c in list(COURSE_REQUEST.COURSE_DICT.values())
+            ],
+            "individuals": individuals,
+            "organizations": organizations,
+            "frozen": {
+                "students": sorted(ID_REQUEST.FROZEN_KEYWORDS),
+                "courses": sorted(COURSE_REQUEST.FROZEN_YEARS),
+            },
+        }
+
+    def __deserialize(self, data: dict[str, Any]) -> None:
+        """
+        Fill the in-memory dictionaries from a snapshot payload.
+        Entries that already exist in memory are kept as they are newer.
+
+        Args:
+            data (dict[str, Any]): The snapshot payload.
+        """
+
+        ID_REQUEST.add_students(
+            (uid, name)
+            for uid, name in data["students"].items()
+            if uid not in ID_REQUEST.STUDENT_DICT
+        )
+        ID_REQUEST.FROZEN_KEYWORDS.update(data["frozen"]["students"])
+        COURSE_REQUEST.FROZEN_YEARS.update(data["frozen"]["courses"])
+
+        for year, term, no, title, teachers, times in data["courses"]:
+            sc = SimpleCourse(
+                year=year,
+                term=term,
+                no=no,
+                title=title,
+                teachers=teachers,
+                times=times,
+            )
+            COURSE_REQUEST.COURSE_DICT.setdefault(sc.uid, sc)
+
+        individuals: dict[str, Individual] = {}
+        for name, organization, title, extension, email in data["individuals"]:
+            individual = Individual(
+                name=name,
+                organization=organization,
+                title=title,
+                extension=extension,
+                email=email,
+            )
+            individuals[individual.uid] = individual
+            CONTACT_REQUEST.CONTACT_DICT.setdefault(individual.uid, individual)
+
+        for name, superior, location, website, members in data["organizations"]:
+            organization = Organization(
+                name=name,
+                superior=superior,
+                location=location,
+                website=website,
+                members=[individuals[uid] for uid in members if uid in individuals],
+            )
+            CONTACT_REQUEST.CONTACT_DICT.setdefault(organization.uid, organization)
+
+    def __write(self, data: dict[str, Any]) -> None:
+        """
+        Atomically write the snapshot payload to disk.
+
+        Args:
+            data (dict[str, Any]): The snapshot payload.
+        """
+
+        if directory := dirname(self.__path):
+            makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.__path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+        replace(tmp_path, self.__path)
+
+    def __read(self) -> dict[str, Any]:
+        """
+        Read the snapshot payload from disk.
+
+        Returns:
+            dict[str, Any]: The snapshot payload.
+        """
+
+        with gzip.open(self.__path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    async def load(self) -> bool:
+        """
+        Load the snapshot from disk into the in-memory dictionaries.
+
+        Returns:
+            bool: True if a snapshot is loaded, False otherwise.
+        """
+
+        if not exists(self.__path):
+            return False
+
+        try:
+            data = await to_thread(self.__read)
+
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Failed to read snapshot {self.__path}: {exc}")
+            return False
+
+        if data.get("version") != self.VERSION:
+            logger.warning(f"Ignore snapshot with version {data.get('version')}")
+            return False
+
+        self.__deserialize(data)
+        logger.info(
+            f"Loaded snapshot saved at {data['saved_at']:.0f}: "
+            f"{len(ID_REQUEST.STUDENT_DICT)} students, "
+            f"{len(COURSE_REQUEST.COURSE_DICT)} courses, "
+            f"{len(CONTACT_REQUEST.CONTACT_DICT)} contacts, "
+            f"{len(ID_REQUEST.FROZEN_KEYWORDS)} frozen student listings, "
+            f"{len(COURSE_REQUEST.FROZEN_YEARS)} frozen course years"
+        )
+
+        return True
+
+    async def dump(self) -> bool:
+        """
+        Dump the in-memory dictionaries to disk.
+
+        Returns:
+            bool: True if the snapshot is written, False otherwise.
+        """
+
+        data = self.__serialize()
+
+        try:
+            await to_thread(self.__write, data)
+
+        except OSError as exc:
+            logger.warning(f"Failed to write snapshot {self.__path}: {exc}")
+            return False
+
+        return True
+
+    async def dump_periodically(self) -> None:
+        """Dump the snapshot to disk every interval."""
+
+        while True:
+            await sleep(self.__interval)
+            await self.dump()
+
+
+SNAPSHOT = SnapshotUtil()
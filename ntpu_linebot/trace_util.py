@@ -0,0 +1,278 @@
+# -*- coding:utf-8 -*-
+import sys
+from asyncio import sleep, to_thread
+from collections import deque
+from contextvars import ContextVar
+from json import dumps
+from os import getenv, urandom
+from random import random
+from time import time_ns
+from types import TracebackType
+from typing import Any, Optional
+
+from httpx import AsyncClient, HTTPError
+from sanic.log import logger
+
+
+class Span:
+    """A timed operation of a trace, used as a context manager."""
+
+    def __init__(
+        self,
+        tracer: "TracerUtil",
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: dict[str, Any],
+    ) -> None:
+        self.__tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = 0
+        self.end = 0
+        self.error: Optional[str] = None
+        self.__token = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Set an attribute of the span"""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start = time_ns()
+        self.__token = self.__tracer.current_span_var.set(self)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.end = time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+
+        self.__tracer.current_span_var.reset(self.__token)
+        self.__tracer.export(self)
+
+    def to_json(self) -> dict[str, Any]:
+        """
+        Convert the span to a JSON log record.
+
+        Returns:
+            dict[str, Any]: The JSON log record of the span.
+        """
+
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": (self.end - self.start) / 1e6,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> dict[str, Any]:
+        """
+        Convert the span to the OTLP/JSON span format.
+
+        Returns:
+            dict[str, Any]: The OTLP span of the span.
+        """
+
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [
+                {"key": k, "value": {"stringValue": str(v)}}
+                for k, v in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+
+        return span
+
+
+class NoopSpan:
+    """The span returned when the trace is not sampled, doing nothing."""
+
+    def set(self, key: str, value: Any) -> None:
+        """Ignore the attribute"""
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class TracerUtil:
+    __sample_rate = float(getenv("TRACE_SAMPLE_RATE", "0"))
+    __exporter = getenv("TRACE_EXPORTER", "json").lower()
+    __json_path = getenv("TRACE_JSON_PATH", "-")
+    __otlp_endpoint = getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    __service_name = getenv("TRACE_SERVICE_NAME", "ntpu-linebot")
+    __interval = float(getenv("TRACE_EXPORT_INTERVAL", "5"))
+
+    def __init__(self) -> None:
+        self.current_span_var: ContextVar[Optional[Span]] = ContextVar(
+            "current_span", default=None
+        )
+        self.__buffer: deque[Span] = deque(maxlen=4096)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any trace is sampled"""
+        return self.__sample_rate > 0
+
+    @property
+    def current_span(self) -> Optional[Span]:
+        """The span running in the current context"""
+        return self.current_span_var.get()
+
+    def trace(self, name: str, **attributes: Any) -> Span | NoopSpan:
+        """
+        Start a new trace if it is sampled.
+
+        Args:
+            name (str): The name of the root span.
+            **attributes (Any): The attributes of the root span.
+
+        Returns:
+            Span | NoopSpan: The root span, or a no-op span if the trace is not sampled.
+        """
+
+        if not self.enabled or random() >= self.__sample_rate:
+            return NOOP_SPAN
+
+        return Span(self, name, urandom(16).hex(), None, attributes)
+
+    def child(
+        self, parent: Optional[Span], name: str, **attributes: Any
+    ) -> Span | NoopSpan:
+        """
+        Start a child span of a span, e.g. one captured in another task.
+
+        Args:
+            parent (Span, optional): The parent span.
+            name (str): The name of the span.
+            **attributes (Any): The attributes of the span.
+
+        Returns:
+            Span | NoopSpan: The child span, or a no-op span without a parent.
+        """
+
+        if parent is None:
+            return NOOP_SPAN
+
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    def span(self, name: str, **attributes: Any) -> Span | NoopSpan:
+        """
+        Start a child span of the current span.
+
+        Args:
+            name (str): The name of the span.
+            **attributes (Any): The attributes of the span.
+
+        Returns:
+            Span | NoopSpan: The child span, or a no-op span outside of a sampled trace.
+        """
+
+        return self.child(self.current_span_var.get(), name, **attributes)
+
+    def export(self, span: Span) -> None:
+        """
+        Buffer a finished span for the next export.
+
+        Args:
+            span (Span): The finished span.
+        """
+
+        self.__buffer.append(span)
+
+    def __write_json(self, spans: list[Span]) -> None:
+        """Write the spans as JSON lines to the log file or stdout."""
+
+        lines = "".join(
+            dumps(span.to_json(), ensure_ascii=False, default=str) + "\n"
+            for span in spans
+        )
+
+        if self.__json_path == "-":
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+
+        else:
+            with open(self.__json_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    async def __post_otlp(self, spans: list[Span]) -> None:
+        """Post the spans to the OTLP/HTTP collector."""
+
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.__service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "ntpu_linebot"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+        async with AsyncClient() as client:
+            await client.post(self.__otlp_endpoint, json=payload)
+
+    async def flush(self) -> None:
+        """Export the buffered spans."""
+
+        if not self.__buffer:
+            return
+
+        spans = list(self.__buffer)
+        self.__buffer.clear()
+
+        try:
+            if self.__exporter == "otlp":
+                await self.__post_otlp(spans)
+
+            else:
+                await to_thread(self.__write_json, spans)
+
+        except (HTTPError, OSError) as exc:
+            logger.warning(f"Failed to export {len(spans)} spans: {exc}")
+
+    async def flush_periodically(self) -> None:
+        """Export the buffered spans on an interval."""
+
+        while True:
+            await sleep(self.__interval)
+            await self.flush()
+
+
+TRACER = TracerUtil()